@@ -1,4 +1,5 @@
 # imports
+import queue
 import tkinter
 from tkinter import ttk, messagebox, filedialog
 import constants as C
@@ -65,6 +66,7 @@ class DialogueBox:
         applied_filters = self.main_app.selected_filters if isinstance(
             self.main_app.selected_filters, dict) else {}
         resultvalues = {}  # to hold StringVar for each filter
+        range_ends = {}  # second StringVar ("to" value) for range filters
 
         # Determine filters based on selected table but only include filters
         # whose configured column actually exists for the selected table.
@@ -105,7 +107,7 @@ class DialogueBox:
                 if selected_filters[j][0] == i:
                     var = tkinter.StringVar(scroll_frame)
                     # Fill values of applied filters (safely)
-                    if applied_filters and j in applied_filters:
+                    if applied_filters and j in applied_filters and not isinstance(applied_filters[j], tuple):
                         var.set(applied_filters[j])
                     resultvalues[j] = var
                     filterlabel = ttk.Label(
@@ -155,12 +157,40 @@ class DialogueBox:
                                   sticky="ew", padx=5, pady=5)
                         # for scrolling on top of entry
                         bind_mousewheel(date, canvas)
+                    elif selected_filters[j][1] == 'list':
+                        # comma separated values entry
+                        valuelist = ttk.Entry(scroll_frame, textvariable=var)
+                        valuelist.grid(row=count, column=1,
+                                       sticky="ew", padx=5, pady=5)
+                        # for scrolling on top of entry
+                        bind_mousewheel(valuelist, canvas)
+                    elif selected_filters[j][1] == 'range':
+                        # from and to entries, either can be left empty
+                        high_var = tkinter.StringVar(scroll_frame)
+                        if applied_filters and isinstance(applied_filters.get(j), tuple):
+                            var.set(applied_filters[j][0])
+                            high_var.set(applied_filters[j][1])
+                        range_ends[j] = high_var
+                        range_frame = ttk.Frame(scroll_frame)
+                        low_entry = ttk.Entry(range_frame, textvariable=var, width=9)
+                        low_entry.pack(side='left')
+                        ttk.Label(range_frame, text=' to ').pack(side='left')
+                        high_entry = ttk.Entry(range_frame, textvariable=high_var, width=9)
+                        high_entry.pack(side='left')
+                        range_frame.grid(row=count, column=1,
+                                         sticky="ew", padx=5, pady=5)
+                        # for scrolling on top of entries
+                        bind_mousewheel(low_entry, canvas)
+                        bind_mousewheel(high_entry, canvas)
                     count += 1
 
         def submit():
             for i in resultvalues.keys():
                 # get the value from StringVar
                 result[i] = resultvalues[i].get()
+                if i in range_ends:  # (from, to), or empty if neither was filled in
+                    low, high = result[i], range_ends[i].get()
+                    result[i] = (low, high) if low.strip() or high.strip() else ''
             try:
                 self.dialog.destroy()
             except Exception:
@@ -237,6 +267,25 @@ class DialogueBox:
             entry.grid(row=row, column=1, sticky="ew", padx=5, pady=5)
             entries.append(entry)
 
+        if selected_table == "routes":  # suggest the distances once both airports are entered
+            distances = []  # the airports' distance matrix, read on first use
+
+            def suggest_distance(event=None):
+                dep, arr = (entries[C.routes_columns.index(c)].get().strip().upper() for c in ('dep', 'arr'))
+                if not dep or not arr:
+                    return
+                if not distances:
+                    distances.append(self.main_app.db.distance_matrix(build=False))  # never built from here
+                distance = distances[0].distance(dep, arr)
+                if distance is None:
+                    return  # unknown airport, or one without coordinates
+                for column in ('dist', 'greatcircledist'):
+                    entry = entries[C.routes_columns.index(column)]
+                    if not entry.get().strip():
+                        entry.insert(0, f"{distance:.2f}")
+            for column in ('dep', 'arr'):
+                entries[C.routes_columns.index(column)].bind("<FocusOut>", suggest_distance)
+
         def submit():
             self.result = [entry.get() for entry in entries]
             if all(i.strip() == "" for i in self.result):  # all fields empty
@@ -267,6 +316,52 @@ class DialogueBox:
             return None
         return self.result
 
+    def bulk_edit_dialog(self, selected_table, columns, count):  # -> (column, new value) or None
+        main_frame = ttk.Frame(self.dialog)
+        main_frame.pack(fill="both", expand=True)
+        self.result = None
+        self.dialog.title('Edit Selected Rows')
+        all_columns = C.columns[C.tables.index(selected_table)]
+        all_titles = C.titles[C.tables.index(selected_table)]
+        # the primary key can't be set to one value in several rows
+        columns = [i for i in columns if i != C.primarykeys[selected_table]]
+        titles = [all_titles[all_columns.index(i)] for i in columns]
+
+        ttk.Label(main_frame, text=f"{count} rows selected").grid(
+            row=0, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
+        ttk.Label(main_frame, text="Column:").grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+        column_input = ttk.Combobox(main_frame, values=titles, state='readonly')
+        column_input.grid(row=1, column=1, sticky="ew", padx=5, pady=5)
+        ttk.Label(main_frame, text="New value:").grid(row=2, column=0, sticky="ew", padx=5, pady=5)
+        value_input = ttk.Combobox(main_frame)
+        value_input.grid(row=2, column=1, sticky="ew", padx=5, pady=5)
+
+        def column_changed(event=None):  # offer the column's options, if it has a fixed set
+            full_index = all_columns.index(columns[column_input.current()])  # dtypes may not cover every column
+            dtype = C.dtypes[selected_table][full_index] if full_index < len(
+                C.dtypes[selected_table]) else ('entry',)
+            value_input.set("")
+            value_input.config(values=dtype[1] if dtype[0] == 'combobox' else [],
+                               state='readonly' if dtype[0] == 'combobox' else 'normal')
+        column_input.bind("<<ComboboxSelected>>", column_changed)
+
+        def submit():
+            if column_input.current() < 0:
+                messagebox.showwarning(parent=self.dialog, title="No Column",
+                                       message="Please choose a column.")
+                return
+            self.result = (columns[column_input.current()], value_input.get())
+            self.dialog.destroy()
+
+        Buttonframe = ttk.Frame(main_frame)
+        Buttonframe.grid(row=3, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
+        OKbutton = ttk.Button(Buttonframe, text='Apply to selected rows', command=submit)
+        OKbutton.pack(pady=1, side='left')
+        Cancelbutton = ttk.Button(Buttonframe, text='Cancel', command=self.dialog.destroy)
+        Cancelbutton.pack(pady=1, side='left')
+        self.dialog.wait_window()   # pauses until dialog is closed
+        return self.result
+
 
     def SettingsDialog(self, settingslist):
         # Similar to the other input dialogs
@@ -275,7 +370,7 @@ class DialogueBox:
         self.dialog.title('Settings')
         tabs = ttk.Notebook(main_frame)  # tabbed view
         tabs.pack(expand=True, fill='both')
-        settingstabs = ['App', 'Database']
+        settingstabs = ['App', 'Database', 'Planning']
         settings_result = {}
         for i in settingstabs:
             frame = ttk.Frame(tabs)
@@ -329,8 +424,40 @@ class DialogueBox:
                     frame, values=C.supported_character_sets, state='normal')
                 charsetinput.set(settingslist['charset'])
                 charsetinput.grid(row=4, column=1, sticky="ew", padx=5, pady=5)
+            elif i == 'Planning':
+                Dayslabel = ttk.Label(frame, text='Days to plan ahead:')
+                Dayslabel.grid(row=0, column=0, sticky="ew", padx=5, pady=5)
+                plandaysinput = ttk.Spinbox(frame, from_=1, to=365)
+                plandaysinput.set(settingslist.get('plan_days', C.plan_days))
+                plandaysinput.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
+                Turnlabel = ttk.Label(frame, text='Minimum turnaround (minutes):')
+                Turnlabel.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+                turnaroundinput = ttk.Spinbox(frame, from_=0, to=720, increment=5)
+                turnaroundinput.set(settingslist.get('turnaround_min', C.turnaround_min))
+                turnaroundinput.grid(row=1, column=1, sticky="ew", padx=5, pady=5)
+                Costlabel = ttk.Label(frame, text='Prefer cheaper routes (0 = no preference):')
+                Costlabel.grid(row=2, column=0, sticky="ew", padx=5, pady=5)
+                costweightinput = ttk.Spinbox(frame, from_=0, to=5, increment=0.5)
+                costweightinput.set(settingslist.get('cost_weight', C.cost_weight))
+                costweightinput.grid(row=2, column=1, sticky="ew", padx=5, pady=5)
 
         def submit():
+            try:
+                plan_days, turnaround = int(plandaysinput.get()), int(turnaroundinput.get())
+                cost_weight = float(costweightinput.get())
+            except ValueError:
+                messagebox.showwarning(parent=self.dialog, title="Planning",
+                                       message="Days to plan and turnaround must be whole numbers, "
+                                               "the cheaper route preference a number.")
+                return
+            if plan_days <= 0 or turnaround < 0 or cost_weight < 0:
+                messagebox.showwarning(parent=self.dialog, title="Planning",
+                                       message="Days to plan must be positive, turnaround and "
+                                               "cheaper route preference not negative.")
+                return
+            settings_result.update(settingslist)  # keep settings this dialog doesn't show
+            settings_result.update({'plan_days': plan_days, 'turnaround_min': turnaround,
+                                    'cost_weight': cost_weight})
             settings_result.update({'user': settingslist['user'], 'pass': settingslist['pass'], 'user_db': usernameinput.get(), 'host': hostinput.get(), 'passwd_db': passwordinput.get(
             ), 'charset': charsetinput.get(), 'defaultsave': defaultsaveinput.get(), 'app_theme': app_theme_input.get(), 'database': C.database})
             self.dialog.destroy()
@@ -347,6 +474,9 @@ class DialogueBox:
             defaultsaveinput.insert(0, C.defaultsettingslist['defaultsave'])
             app_theme_input.set(C.defaultsettingslist['app_theme'])
             charsetinput.set(C.defaultsettingslist['charset'])
+            plandaysinput.set(C.plan_days)
+            turnaroundinput.set(C.turnaround_min)
+            costweightinput.set(C.cost_weight)
 
         Buttonframe = ttk.Frame(main_frame)
         Buttonframe.pack(expand=True)
@@ -478,11 +608,228 @@ class DialogueBox:
 
     def admin_panel(self, users_tree):
         self.dialog.title('Admin Panel')
-        users = self.main_app.db.fetch_data('accounts', [], [])
-        users_tree.load_table('accounts', users)
+        columns = C.view_columns('accounts')  # no password hashes
+        users = self.main_app.db.fetch_data('accounts', [], [], columns)
+        users_tree.load_table('accounts', users, columns=columns)
         # Ensure the frame is packed
         users_tree.frame.pack(expand=True, fill='both')
 
+    def query_stats_dialog(self, stats):
+        main_frame = ttk.Frame(self.dialog)
+        main_frame.pack(fill="both", expand=True)
+        self.dialog.title('Query Statistics')
+        self.dialog.geometry("1000x400")
+        columns = ('calls', 'total', 'mean', 'p95', 'max', 'rows', 'shape')
+        titles = ('Calls', 'Total (ms)', 'Mean (ms)', 'p95 (ms)', 'Max (ms)', 'Rows', 'Statement')
+        widths = (60, 90, 80, 80, 80, 70, 520)
+        tree = ttk.Treeview(main_frame, columns=columns, show="headings")
+        for column, title, width in zip(columns, titles, widths):
+            tree.heading(column, text=title)
+            tree.column(column, width=width, anchor="w" if column == 'shape' else "center",
+                        stretch=column == 'shape')
+        vsb = ttk.Scrollbar(main_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        main_frame.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+
+        sort_by = tkinter.StringVar(main_frame, value='total')
+
+        def refresh():  # reload the top offenders
+            tree.delete(*tree.get_children())
+            for s in stats.top(50, sort_by.get()):
+                tree.insert("", "end", values=(s.calls, f"{s.total_ms:.1f}", f"{s.mean_ms():.1f}",
+                                               f"{s.percentile_ms(95):.1f}", f"{s.max_ms:.1f}", s.rows, s.shape))
+
+        def reset():
+            stats.reset()
+            refresh()
+
+        Buttonframe = ttk.Frame(main_frame)
+        Buttonframe.grid(row=1, column=0, sticky="ew", padx=5, pady=5)
+        ttk.Label(Buttonframe, text=f"Sort by (slow query log threshold {stats.threshold_ms} ms):").pack(side='left')
+        sorter = ttk.Combobox(Buttonframe, values=('total', 'mean', 'max'),
+                              textvariable=sort_by, state='readonly', width=8)
+        sorter.pack(side='left', padx=5)
+        sorter.bind("<<ComboboxSelected>>", lambda e: refresh())
+        ttk.Button(Buttonframe, text='Refresh', command=refresh).pack(pady=1, side='left')
+        ttk.Button(Buttonframe, text='Reset', command=reset).pack(pady=1, side='left')
+        refresh()
+
+    def plan_compare_dialog(self, days, turnaround_min, cost_weight, run):  # -> (scenario name, legs) to commit, or None
+        # run(scenarios, incremental) -> queue that gets ([(legs, summary)], None) or (None, error) when
+        # the scenarios are planned, see planner.compare_into; polled, so the window stays responsive
+        main_frame = ttk.Frame(self.dialog)
+        main_frame.pack(fill="both", expand=True)
+        self.result = None
+        self.dialog.title('Compare Plans')
+        statuses = C.enum_values[('aircraft', 'status')]
+        names = [f"Scenario {chr(ord('A') + i)}" for i in range(C.plan_scenarios)]
+        inputs = []  # (days entry, turnaround entry, cost weight entry, {status: BooleanVar}) per scenario
+
+        ttk.Label(main_frame, text="Days:").grid(row=1, column=0, sticky="w", padx=5, pady=2)
+        ttk.Label(main_frame, text="Turnaround (min):").grid(row=2, column=0, sticky="w", padx=5, pady=2)
+        ttk.Label(main_frame, text="Prefer cheaper routes:").grid(row=3, column=0, sticky="w", padx=5, pady=2)
+        ttk.Label(main_frame, text="Aircraft status:").grid(row=4, column=0, sticky="nw", padx=5, pady=2)
+        for i, name in enumerate(names):
+            ttk.Label(main_frame, text=name).grid(row=0, column=i + 1, padx=5, pady=2)
+            days_input = ttk.Entry(main_frame, width=10)
+            days_input.insert(0, str(days))
+            days_input.grid(row=1, column=i + 1, padx=5, pady=2)
+            turnaround_input = ttk.Entry(main_frame, width=10)
+            turnaround_input.insert(0, str(turnaround_min))
+            turnaround_input.grid(row=2, column=i + 1, padx=5, pady=2)
+            cost_input = ttk.Entry(main_frame, width=10)
+            cost_input.insert(0, str(cost_weight))
+            cost_input.grid(row=3, column=i + 1, padx=5, pady=2)
+            status_frame = ttk.Frame(main_frame)
+            status_frame.grid(row=4, column=i + 1, padx=5, pady=2, sticky="w")
+            chosen = {}
+            for status in statuses:
+                chosen[status] = tkinter.BooleanVar(status_frame, value=status == 'ACTV')
+                ttk.Checkbutton(status_frame, text=status, variable=chosen[status]).pack(anchor="w")
+            inputs.append((days_input, turnaround_input, cost_input, chosen))
+        incremental = tkinter.BooleanVar(main_frame, value=False)
+        ttk.Checkbutton(main_frame, text="Extend the existing plan", variable=incremental).grid(
+            row=5, column=0, columnspan=len(names) + 1, sticky="w", padx=5, pady=2)
+
+        rows = (('Flights', lambda s: s['flights']),
+                ('Aircraft', lambda s: s['aircraft']),
+                ('Idle aircraft', lambda s: len(s['idle'])),
+                ('Flights per aircraft (min)', lambda s: s['per_tail_min']),
+                ('Flights per aircraft (mean)', lambda s: f"{s['per_tail_mean']:.1f}"),
+                ('Flights per aircraft (max)', lambda s: s['per_tail_max']),
+                ('Routes flown', lambda s: f"{s['routes_flown']} / {s['routes_scheduled']}"),
+                ('Route coverage', lambda s: f"{s['coverage']:.0%}"),
+                ('Distance (nm)', lambda s: f"{s['distance_nm']:,.0f}"),
+                ('Fuel cost', lambda s: f"{s['fuel_cost']:,.0f}"))
+        tree = ttk.Treeview(main_frame, columns=names, height=len(rows))
+        tree.heading("#0", text="")
+        tree.column("#0", width=180, stretch=False)
+        for name in names:
+            tree.heading(name, text=name)
+            tree.column(name, width=120, anchor="center")
+        tree.grid(row=6, column=0, columnspan=len(names) + 1, sticky="nsew", padx=5, pady=5)
+        main_frame.rowconfigure(6, weight=1)
+        results = []
+
+        def compare():  # plan every scenario, nothing is written yet
+            scenarios = []
+            for name, (days_input, turnaround_input, cost_input, chosen) in zip(names, inputs):
+                try:
+                    scenario = {'name': name, 'days': int(days_input.get()),
+                                'turnaround_min': int(turnaround_input.get()),
+                                'cost_weight': float(cost_input.get() or 0),
+                                'statuses': tuple(s for s, var in chosen.items() if var.get())}
+                except ValueError:
+                    messagebox.showwarning(parent=self.dialog, title="Invalid Scenario",
+                                           message=f"{name}: days and turnaround must be whole numbers, "
+                                                   f"the cheaper route preference a number.")
+                    return
+                if scenario['days'] <= 0 or scenario['turnaround_min'] < 0 or scenario['cost_weight'] < 0:
+                    messagebox.showwarning(parent=self.dialog, title="Invalid Scenario",
+                                           message=f"{name}: days must be positive, turnaround and "
+                                                   f"cheaper route preference not negative.")
+                    return
+                scenarios.append(scenario)
+            self.dialog.config(cursor="watch")
+            compare_button.config(state='disabled')
+            poll(run(scenarios, incremental.get()))
+
+        def poll(pending):  # show the comparison once the background planning is done
+            if not self.dialog.winfo_exists():
+                return  # closed meanwhile, the result is dropped
+            try:
+                planned, error = pending.get_nowait()
+            except queue.Empty:
+                self.dialog.after(C.plan_poll_ms, poll, pending)
+                return
+            self.dialog.config(cursor="")
+            compare_button.config(state='normal')
+            if error is not None:
+                messagebox.showerror(parent=self.dialog, title="Compare Plans",
+                                     message=f"Planning failed.\n\nError: {error}")
+                return
+            results[:] = planned
+            tree.delete(*tree.get_children())
+            for title, figure in rows:
+                tree.insert("", "end", text=title, values=[figure(summary) for legs, summary in results])
+            commit_input.config(state='readonly')
+
+        def commit():
+            if not results or commit_input.current() < 0:
+                messagebox.showwarning(parent=self.dialog, title="No Scenario",
+                                       message="Please compare the scenarios and choose one to commit.")
+                return
+            self.result = (names[commit_input.current()], results[commit_input.current()][0])
+            self.dialog.destroy()
+
+        Buttonframe = ttk.Frame(main_frame)
+        Buttonframe.grid(row=7, column=0, columnspan=len(names) + 1, sticky="ew", padx=5, pady=5)
+        compare_button = ttk.Button(Buttonframe, text='Compare', command=compare)
+        compare_button.pack(pady=1, side='left')
+        commit_input = ttk.Combobox(Buttonframe, values=names, state='disabled', width=12)
+        commit_input.pack(side='left', padx=5)
+        ttk.Button(Buttonframe, text='Commit', command=commit).pack(pady=1, side='left')
+        ttk.Button(Buttonframe, text='Cancel', command=self.dialog.destroy).pack(pady=1, side='left')
+        self.dialog.wait_window()   # pauses until dialog is closed
+        return self.result
+
+    def route_search_dialog(self, search):  # connections between two airports over the route network
+        # search(dep, arr, reg_no, max_legs) -> (shortest path or None, itineraries), see database.route_search
+        main_frame = ttk.Frame(self.dialog)
+        main_frame.pack(fill="both", expand=True)
+        self.dialog.title('Route Search')
+        self.dialog.geometry("900x450")
+        inputs = {}
+        for column, (key, title) in enumerate((('dep', 'From (ICAO)'), ('arr', 'To (ICAO)'),
+                                               ('reg_no', 'Aircraft (optional)'), ('legs', 'Max legs'))):
+            ttk.Label(main_frame, text=title).grid(row=0, column=column, sticky="w", padx=5, pady=2)
+            inputs[key] = ttk.Entry(main_frame, width=14)
+            inputs[key].grid(row=1, column=column, sticky="w", padx=5, pady=2)
+        inputs['legs'].insert(0, str(C.route_hops))
+        shortest = ttk.Label(main_frame, text="")
+        shortest.grid(row=2, column=0, columnspan=5, sticky="w", padx=5, pady=5)
+        columns = ('elapsed', 'legs')
+        tree = ttk.Treeview(main_frame, columns=columns, show="headings")
+        tree.heading('elapsed', text='Elapsed')
+        tree.heading('legs', text='Legs (departure and arrival, day + time)')
+        tree.column('elapsed', width=80, anchor="center", stretch=False)
+        tree.column('legs', width=760, anchor="w")
+        tree.grid(row=3, column=0, columnspan=5, sticky="nsew", padx=5, pady=5)
+        main_frame.rowconfigure(3, weight=1)
+        main_frame.columnconfigure(4, weight=1)
+
+        def clock(seconds):  # seconds from the first day's midnight -> 'd+1 14:05'
+            day, rest = divmod(int(seconds), 24 * 3600)
+            return f"{'d+' + str(day) + ' ' if day else ''}{rest // 3600:02d}:{rest % 3600 // 60:02d}"
+
+        def find():
+            dep, arr = inputs['dep'].get().strip().upper(), inputs['arr'].get().strip().upper()
+            try:
+                legs = int(inputs['legs'].get())
+            except ValueError:
+                legs = 0
+            if not 1 <= legs <= C.route_search_max_legs:
+                messagebox.showwarning(parent=self.dialog, title="Route Search",
+                                       message=f"Max legs must be a number from 1 to {C.route_search_max_legs}.")
+                return
+            try:
+                path, itineraries = search(dep, arr, inputs['reg_no'].get().strip() or None, legs)
+            except ValueError as error:  # unknown aircraft
+                messagebox.showwarning(parent=self.dialog, title="Route Search", message=str(error))
+                return
+            shortest.config(text="No connection in range." if path is None else
+                            f"Shortest: {path[0]:,.0f} nm via " + " - ".join(leg.flight for leg in path[1]))
+            tree.delete(*tree.get_children())
+            for elapsed, steps in itineraries:
+                tree.insert("", "end", values=(f"{elapsed // 3600}h {elapsed % 3600 // 60:02d}m", "   ".join(
+                    f"{leg.flight} {leg.dep} {clock(departure)} - {leg.arr} {clock(arrival)}"
+                    for leg, departure, arrival in steps)))
+
+        ttk.Button(main_frame, text='Search', command=find).grid(row=1, column=4, sticky="w", padx=5)
+
     def profile_dialog(self):
         main_frame = ttk.Frame(self.dialog)
         main_frame.pack(fill="both", expand=True)
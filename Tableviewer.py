@@ -1,7 +1,15 @@
 # imports
 import tkinter
+from datetime import datetime
+from decimal import Decimal
 from tkinter import ttk, messagebox
 import constants as C
+from tracing import span, traced
+from searchindex import SearchIndex
+from rowstore import ColumnStore
+from editjournal import EditJournal
+import localfilter
+import filterexpr
 
 
 class TreeViewer:
@@ -12,7 +20,8 @@ class TreeViewer:
         self.frame.pack(fill="both", expand=True)
 
         # Create the Treeview
-        self.tree = ttk.Treeview(self.frame, show="tree headings", height=20)
+        self.tree = ttk.Treeview(self.frame, show="tree headings", height=20,
+                                 selectmode="extended")  # ctrl/shift click to pick several rows
 
         # Create scrollbars
         self.vsb = ttk.Scrollbar(
@@ -21,9 +30,19 @@ class TreeViewer:
         self.hsb = ttk.Scrollbar(
             self.frame, orient="horizontal", command=self.tree.xview)  # for X axis
 
-        self.tree.configure(yscrollcommand=self.vsb.set,
+        self.tree.configure(yscrollcommand=self.on_scroll,
                             xscrollcommand=self.hsb.set)  # link scrollbars to treeview
 
+        # Quick search bar above the tree, narrows the shown rows as you type
+        self.search_frame = ttk.Frame(self.frame)
+        ttk.Label(self.search_frame, text="Search:").pack(side="left", padx=(5, 2))
+        self.search_text = tkinter.StringVar(self.frame)
+        self.search_entry = ttk.Entry(self.search_frame, textvariable=self.search_text)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=(0, 5), pady=2)
+        self.search_count = ttk.Label(self.search_frame)  # "n of m rows"
+        self.search_count.pack(side="left", padx=5)
+        self.search_text.trace_add("write", lambda *args: self.apply_search())
+
         # Initially hide tree and scrollbars, show placeholder
         self.tree.grid_remove()
         self.vsb.grid_remove()
@@ -32,18 +51,40 @@ class TreeViewer:
         self.placeholder_label = ttk.Label(
             self.frame, text="•••", font=("Arial", 21), anchor="center")
         # Placeholder in center, before tree is loaded
-        self.placeholder_label.grid(row=0, column=0, sticky="nsew")
+        self.placeholder_label.grid(row=1, column=0, sticky="nsew")
 
         # Configure frame grid weights
-        self.frame.rowconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
         self.frame.columnconfigure(0, weight=1)
 
         # Bind events like double-click(edit) and delete key(delete row)
         self.tree.bind("<Double-1>", self.on_double_click)
         self.tree.bind("<Delete>", self.delete_row)
+        # buffered edits (Edit > Buffer Edits)
+        self.tree.bind("<Control-z>", lambda e: self.undo_edit())
+        self.tree.bind("<Control-y>", lambda e: self.redo_edit())
+        self.tree.bind("<Control-s>", lambda e: self.save_edits())
 
         self.active_editor = None  # active cell editor selection
 
+        # sorting and paging state, reset by load_table
+        self.item_ids = []  # Treeview item id of each row in main_app.selected_rows (None once deleted)
+        self.row_index = {}  # Treeview item id -> index in main_app.selected_rows
+        self.query = (None, [], [])  # table, filter keys and values the rows were fetched with
+        self.total = 0  # rows matching the query in the database
+        self.complete = True  # all matching rows are loaded, so sorting happens in memory
+        self.sort_column = None
+        self.sort_desc = False
+        self.sort_orders = {}  # column -> row indexes in ascending order, cached until the rows change
+        self.order = None  # row indexes in display order, None for the order they were loaded in
+        self.rank = None  # row index -> position in self.order
+        self.loading_page = False
+        self.search_index = None  # built on the first search after each load
+        self.matches = None  # row indexes matching the search box, None when it's empty
+        self.filtered = None  # row indexes passing filters applied locally, None when not filtering
+        self.local_filters = None  # (keys, values) of the filters behind self.filtered
+        self.journal = EditJournal()  # edits not yet written to the database (buffered mode)
+
         # Destroy editor when scrolling
         def destroy_editor(event=None):
             if self.active_editor:
@@ -60,33 +101,78 @@ class TreeViewer:
         # scrollbar release horizontal
         self.hsb.bind("<ButtonRelease-1>", destroy_editor)
 
-    def delete_row(self, event=None):  # delete selected row
-        selected = self.tree.selection()  # selected row
+    def delete_row(self, event=None):  # delete selected rows
+        selected = self.tree.selection()  # selected rows
         if not selected:
             return
+        what = "account" if self.main_app.selected_table == "accounts" else "row"
 
-        row_id = selected[0]  # get first selected row
-        values = self.tree.item(row_id, "values")
-
-        # confirm deletion
-        if self.main_app.selected_table == "accounts":
-            messagebox.showwarning(parent=self.root, title="Confirm Deletion",
-                                   message="Are you sure you want to delete this account?")
+        # confirm deletion, once for the whole selection
+        if len(selected) == 1:
+            message = f"Are you sure you want to delete this {what}?\n\n{self.tree.item(selected[0], 'values')}"
         else:
-            confirm = messagebox.askyesno(parent=self.root, title="Confirm Deletion",
-                                          message=f"Are you sure you want to delete this row?\n\n{values}")
+            message = f"Are you sure you want to delete these {len(selected)} {what}s?"
+        confirm = messagebox.askyesno(parent=self.root, title="Confirm Deletion", message=message,
+                                      icon="warning" if what == "account" else "question")
         if not confirm:
             return
         else:
-            pk_value = values[self.pk_index]
-            self.main_app.db.delete_row(self.main_app.selected_table, pk_value)
-            self.tree.delete(row_id)
-
-    def on_double_click(self, event):
-
-        if not self.main_app.editmode.get() and self.root == self.main_app.root:   # only in edit mode
+            pk_values = [self.tree.item(row_id, "values")[self.pk_index] for row_id in selected]
+            with span('treeview.delete_rows', 'ui', rows=len(selected)):
+                self.main_app.db.delete_rows(self.main_app.selected_table, pk_values,
+                                             [self.row_values(row_id) for row_id in selected])
+                self.tree.delete(*selected)
+                for row_id in selected:
+                    self.forget_row(row_id)
+                self.journal.saved(selected)  # nothing left to write for deleted rows
+                self.edits_changed()
+
+    def update_selected(self, col_name, new_value):  # set one column to the same value in every selected row
+        selected = self.tree.selection()
+        if not selected:
+            return
+        table = self.main_app.selected_table
+        title = C.titles[C.tables.index(table)][C.columns[C.tables.index(table)].index(col_name)]
+        try:  # a value the column can't hold is refused here, not by MySQL
+            filterexpr.parse_value(table, col_name, new_value)
+        except filterexpr.FilterError as error:
+            messagebox.showwarning(parent=self.root, title="Invalid Value", message=str(error))
             return
+        if table == 'flights' and col_name in C.booking_columns and not self.bookings_ok(
+                [dict(zip(self.tree["columns"], self.tree.item(row_id, "values")), **{col_name: new_value})
+                 for row_id in selected]):
+            return
+        confirm = messagebox.askyesno(parent=self.root, title="Confirm Modification",
+                                      message=f"Set {title} to '{new_value}' in {len(selected)} rows?")
+        if not confirm:
+            return
+        pk_values = [self.tree.item(row_id, "values")[self.pk_index] for row_id in selected]
+        with span('treeview.update_rows', 'ui', rows=len(selected)):
+            if self.buffering():  # saved later with the other buffered edits
+                for row_id, pk_value in zip(selected, pk_values):
+                    self.journal.record(row_id, pk_value, col_name, self.cell_value(row_id, col_name), new_value)
+                self.edits_changed()
+            else:
+                self.main_app.db.update_rows(table, col_name, new_value, pk_values,
+                                             [self.cell_value(row_id, col_name) for row_id in selected])
+            for row_id in selected:
+                self.tree.set(row_id, col_name, new_value)
+                self.update_row(row_id, col_name, new_value)
+
+    def expand_cell(self, row_id, col_name, show=True):  # fetch the full text of a lazy (preview only) cell
+        table = self.main_app.selected_table
+        pk_index = self.tree["columns"].index(C.primarykeys[table])
+        pk_value = self.tree.item(row_id, "values")[pk_index]
+        value = self.main_app.db.fetch_cell(table, col_name, pk_value)
+        value = "" if value is None else value
+        self.tree.set(row_id, col_name, value)
+        self.update_row(row_id, col_name, value)
+        if show:
+            title = C.titles[C.tables.index(table)][C.columns[C.tables.index(table)].index(col_name)]
+            messagebox.showinfo(parent=self.root, title=title, message=value)
+        return value
 
+    def on_double_click(self, event):
         # identify clicked region
         region = self.tree.identify("region", event.x, event.y)
         if region != "cell":  # if it is not a cell, do nothing
@@ -96,17 +182,25 @@ class TreeViewer:
         col_id = self.tree.identify_column(
             event.x)  # get column ID for column name
 
+        if col_id == "#0" or not row_id:
+            return  # editing tree column not supported
+
         # get column index
         # convert to 0-based index from #1-based index
         col_index = int(col_id.replace("#", "")) - 1
         # find column name from index
         col_name = self.tree["columns"][col_index]
+        # only a preview of wide columns is loaded
+        lazy = col_name in C.lazy_columns.get(self.main_app.selected_table, [])
 
-        if col_id == "#0":
-            return  # editing tree column not supported
+        if not self.main_app.editmode.get() and self.root == self.main_app.root:   # only in edit mode
+            if lazy:  # in view mode, double click shows the full text
+                self.expand_cell(row_id, col_name)
+            return
 
         # get current cell value
-        old_value = self.tree.set(row_id, col_name)
+        old_value = self.expand_cell(row_id, col_name, show=False) if lazy else self.tree.set(row_id, col_name)
+        stored_value = self.cell_value(row_id, col_name)  # as loaded, not as displayed
 
         # get cell bounding box to place entry
         bbox = self.tree.bbox(row_id, col_id)
@@ -129,15 +223,19 @@ class TreeViewer:
         self.original_pk_value = pk_value  # store original PK value in case it is edited
 
         # Determine editor type based on column data type
-        if C.dtypes[selected_table][col_index][0] == 'entry':  # text entry
+        # (dtypes follow the full column list, the grid may show fewer columns)
+        full_index = C.columns[C.tables.index(selected_table)].index(col_name)
+        dtype = C.dtypes[selected_table][full_index] if full_index < len(
+            C.dtypes[selected_table]) else ('entry',)
+        if dtype[0] == 'entry':  # text entry
             entry = ttk.Entry(self.tree)
             entry.insert(0, old_value)
-        elif C.dtypes[selected_table][col_index][0] == 'spinbox':  # numeric spinbox
-            r1, r2 = C.dtypes[selected_table][col_index][1]
+        elif dtype[0] == 'spinbox':  # numeric spinbox
+            r1, r2 = dtype[1]
             entry = ttk.Spinbox(self.tree, from_=r1, to=r2)
             entry.insert(0, old_value)
-        elif C.dtypes[selected_table][col_index][0] == 'combobox':  # dropdown combobox
-            options = C.dtypes[selected_table][col_index][1]
+        elif dtype[0] == 'combobox':  # dropdown combobox
+            options = dtype[1]
             entry = ttk.Combobox(self.tree, values=options, state='readonly')
             entry.set(old_value)
         else:
@@ -159,6 +257,17 @@ class TreeViewer:
                 self.active_editor = None
                 return
             self.tree.set(row_id, col_name, new_value)  # update treeview cell
+            if not self.booking_ok(row_id, col_name):  # the aircraft is already flying then
+                self.tree.set(row_id, col_name, old_value)
+                return
+
+            if self.buffering():  # keep the edit locally until the user saves
+                entry.destroy()
+                self.active_editor = None
+                self.journal.record(row_id, self.original_pk_value, col_name, stored_value, new_value)
+                self.update_row(row_id, col_name, new_value)
+                self.edits_changed()
+                return
 
             # database update confirmation
             confirm = messagebox.askyesno(parent=self.root, title="Confirm Modification",
@@ -185,42 +294,384 @@ class TreeViewer:
 
                 else:
                     self.main_app.db.update_cell(
-                        table, col_name, new_value, pk_value)
+                        table, col_name, new_value, pk_value, stored_value)
+                self.update_row(row_id, col_name, new_value)
 
         entry.bind("<Return>", save_edit)  # Enter key to save edit
         entry.bind("<FocusOut>", lambda e: (
             # click outside to cancel edit
             entry.destroy(), setattr(self, 'active_editor', None)))
 
-    def load_table(self, table_name, rows):
+    def booking_ok(self, item, col_name):  # flights: warn before an edit double books the aircraft
+        if self.query[0] != 'flights' or col_name not in C.booking_columns:
+            return True
+        return self.bookings_ok([dict(zip(self.tree["columns"], self.tree.item(item, "values")))])
+
+    def bookings_ok(self, rows):  # flights rows ({column: value}) about to be saved -> False if the user backs out
+        flights = []
+        for row in rows:
+            if row.get('status') == 'Cancelled' or not row.get('reg_no'):
+                continue  # can't clash with anything
+            try:
+                dept = filterexpr.parse_value('flights', 'dept', row['dept'])
+                arrt = filterexpr.parse_value('flights', 'arrt', row['arrt'])
+            except (filterexpr.FilterError, KeyError):
+                continue  # incomplete row, nothing to compare
+            if isinstance(dept, datetime) and isinstance(arrt, datetime):
+                flights.append((row.get('flightnumber') or None, row['reg_no'], dept, arrt))
+        clashes = self.main_app.db.flight_conflicts(flights) if flights else []
+        if not clashes:
+            return True
+        lines = "\n".join(f"{reg_no}, flight {number or 'new'} and flight {other}: "
+                          f"{start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}"
+                          for number, reg_no, other, start, end in clashes[:10])
+        more = f"\n... and {len(clashes) - 10} more" if len(clashes) > 10 else ""
+        return messagebox.askyesno(parent=self.root, title="Double Booking", icon="warning",
+                                   message=f"Aircraft already flying then:\n\n{lines}{more}\n\nSave anyway?")
+
+    def buffering(self):  # edits are buffered in the main window when Edit > Buffer Edits is on
+        return self.root == self.main_app.root and self.main_app.buffer_edits.get()
+
+    def cell_value(self, item, col_name):  # loaded (typed) value of a cell
+        idx = self.row_index.get(item)
+        if idx is None:
+            return self.tree.set(item, col_name)
+        return self.main_app.selected_rows.get(idx, list(self.tree["columns"]).index(col_name))
+
+    def row_values(self, item):  # {column: loaded value} for a row
+        idx = self.row_index.get(item)
+        if idx is None:
+            return dict(zip(self.tree["columns"], self.tree.item(item, "values")))
+        return dict(zip(self.tree["columns"], self.main_app.selected_rows[idx]))
+
+    def edits_changed(self):  # show how many edits are waiting to be saved
+        if self.root == self.main_app.root:
+            count = len(self.journal)
+            self.main_app.set_status(f"{count} unsaved edit{'s' if count != 1 else ''}  |  "
+                                     "Ctrl+S saves, Ctrl+Z undoes" if count else "")
+
+    def show_edit(self, edit, value):  # put an undone/redone value back in the grid
+        if self.tree.exists(edit.item):
+            self.tree.set(edit.item, edit.column, "" if value is None else value)
+            self.update_row(edit.item, edit.column, value)
+
+    def undo_edit(self):
+        edit = self.journal.undo()
+        if edit is not None:
+            self.show_edit(edit, edit.old)
+            self.edits_changed()
+
+    def redo_edit(self):
+        edit = self.journal.redo()
+        if edit is not None:
+            self.show_edit(edit, edit.new)
+            self.edits_changed()
+
+    def discard_edits(self):  # undo every buffered edit
+        while len(self.journal):
+            self.undo_edit()
+        self.journal.clear()
+        self.edits_changed()
+
+    @traced('treeview.save_edits', 'ui')
+    def save_edits(self):  # write every buffered edit in one transaction; False if some weren't saved
+        pending = self.journal.pending()
+        if pending:
+            try:
+                conflicts = self.main_app.db.apply_edits(self.query[0], pending)
+            except Exception as error:
+                messagebox.showerror(parent=self.root, title="Edits Not Saved",
+                                     message=f"Nothing was saved, the database refused the changes:\n\n{error}")
+                return False
+        else:
+            conflicts = {}
+        self.journal.saved({edit.item for edit in self.journal.done} - set(conflicts))
+        self.edits_changed()
+        if conflicts:
+            lines = [f"{self.tree.item(item, 'values')[self.pk_index]}: {reason}"
+                     for item, reason in list(conflicts.items())[:20]]
+            messagebox.showwarning(parent=self.root, title="Some Edits Not Saved",
+                                   message=f"{len(pending) - len(conflicts)} rows saved. These rows were changed "
+                                           f"by someone else since they were loaded, their edits are still "
+                                           f"unsaved:\n\n" + "\n".join(lines) +
+                                           ("\n..." if len(conflicts) > 20 else "") +
+                                           "\n\nReload the table to see the current values, or discard the edits.")
+            return False
+        return True
+
+    def settle_edits(self):  # before the rows are replaced: save or discard buffered edits, False to stay
+        if not len(self.journal):
+            return True
+        answer = messagebox.askyesnocancel(parent=self.root, title="Unsaved Edits",
+                                           message=f"Save {len(self.journal)} unsaved edits first?")
+        if answer is None:
+            return False
+        if answer and not self.save_edits():
+            return False  # not saved (error or conflicts), keep the edits and stay
+        self.journal.clear()
+        self.edits_changed()
+        return True
+
+    def on_scroll(self, first, last):  # scrollbar update; fetch the next page near the bottom
+        self.vsb.set(first, last)
+        if not self.complete and not self.loading_page and float(last) > 0.9:
+            self.loading_page = True
+            self.tree.after_idle(self.load_next_page)
+
+    @traced('treeview.load_next_page', 'ui')
+    def load_next_page(self):
+        try:
+            table, filterkeys, filtervalues = self.query
+            pk_column = C.primarykeys[table]
+            columns = list(self.tree["columns"])
+            last_row = self.main_app.selected_rows[-1]
+            order_by = self.sort_column or pk_column
+            after = (last_row[columns.index(order_by)], last_row[columns.index(pk_column)])
+            rows = self.main_app.db.fetch_page(table, filterkeys, filtervalues,
+                                               order_by, self.sort_desc, after, columns=columns)
+            self.insert_rows(rows)
+            if self.matches is not None:  # new rows are shown only if they match the search
+                self.apply_search()
+            if len(rows) < C.page_size:  # ran out of rows before the count said so (table changed)
+                self.total = len(self.main_app.selected_rows)
+            self.complete = len(self.main_app.selected_rows) >= self.total
+        finally:
+            self.loading_page = False
+
+    def insert_rows(self, rows):  # append rows below the ones already shown
+        if not isinstance(self.main_app.selected_rows, ColumnStore):
+            self.main_app.selected_rows = ColumnStore(self.query[0], self.tree["columns"], self.main_app.selected_rows)
+        start = len(self.main_app.selected_rows)
+        with span('treeview.insert', 'ui', rows=len(rows)):
+            for idx, row in enumerate(rows, start=start):
+                item = self.tree.insert("", "end", text=str(idx + 1), values=row)
+                self.item_ids.append(item)
+                self.row_index[item] = idx
+        self.main_app.selected_rows.extend(rows)
+        self.sort_orders = {}
+        if self.search_index is not None:
+            self.search_index.add(rows, start)
+
+    def forget_row(self, item):  # row deleted from the tree
+        idx = self.row_index.pop(item, None)
+        if idx is not None:
+            self.item_ids[idx] = None
+            if self.search_index is not None:
+                self.search_index.remove(idx, self.main_app.selected_rows[idx])
+
+    def table_rows(self, table):  # every row of table from memory, or None if only part of it is loaded
+        loaded_table, filterkeys, filtervalues = self.query
+        store = self.main_app.selected_rows
+        if table != loaded_table or filterkeys or not self.complete or not isinstance(store, ColumnStore) \
+                or store.columns != C.columns[C.tables.index(table)]:
+            return None
+        if len(self.journal) or set(store.columns) & set(C.lazy_columns.get(table, [])):
+            return None  # unsaved edits, or lazy columns holding only a preview: not what the database has
+        return [row for idx, row in enumerate(store) if self.item_ids[idx] is not None]  # skip deleted rows
+
+    def update_row(self, item, col_name, new_value):  # keep selected_rows in step with an edited cell
+        idx = self.row_index.get(item)
+        if idx is None:
+            return
+        col_index = list(self.tree["columns"]).index(col_name)
+        store = self.main_app.selected_rows
+        old_value = store.get(idx, col_index)
+        if isinstance(old_value, (int, float, Decimal)):  # keep numbers numeric so they still sort as numbers
+            try:
+                new_value = type(old_value)(new_value)
+            except (ValueError, ArithmeticError):
+                pass
+        if self.search_index is not None:
+            row = list(store[idx])
+            row[col_index] = new_value
+            self.search_index.replace(idx, store[idx], row)
+        store.set(idx, col_index, new_value)
+        self.sort_orders.pop(col_name, None)
+
+    def show_rows(self):  # attach the rows that pass the search and local filters, in the current order
+        visible = self.matches
+        if self.filtered is not None:
+            visible = self.filtered if visible is None else visible & self.filtered
+        if visible is None:
+            shown = self.order if self.order is not None else range(len(self.item_ids))
+        elif self.order is None:
+            shown = sorted(visible)
+        else:
+            if self.rank is None:
+                self.rank = [0] * len(self.order)
+                for position, idx in enumerate(self.order):
+                    self.rank[idx] = position
+            shown = sorted(visible, key=self.rank.__getitem__)
+        # one call; items left out are detached (hidden), not deleted
+        shown = [self.item_ids[i] for i in shown if self.item_ids[i] is not None]
+        self.tree.set_children("", *shown)
+        self.search_count.config(text="" if visible is None else f"{len(shown)} of {len(self.row_index)} rows")
+
+    def apply_filters(self, table, filterkeys, filtervalues):
+        # Filter the loaded rows in memory when they include every row the filters could match.
+        # Returns False if the filters have to go to the server instead.
+        loaded_table, loaded_keys, loaded_values = self.query
+        if table != loaded_table or not self.complete:
+            return False
+        new_filters = dict(zip(filterkeys, filtervalues))
+        if any(new_filters.get(k) != v for k, v in zip(loaded_keys, loaded_values)):
+            return False  # the loaded rows were narrowed by a filter that is now relaxed
+        if any(C.filterslist[k]['column'] in C.lazy_columns.get(table, []) for k in filterkeys):
+            return False  # only previews of wide columns are loaded
+        columns = list(self.tree["columns"])
+        with span('treeview.local_filter', 'ui', filters=len(filterkeys)):
+            try:
+                compiled = localfilter.compile_filters(columns, filterkeys, filtervalues)
+                filtered = localfilter.evaluate(compiled, self.main_app.selected_rows) \
+                    if compiled else None
+            except (ValueError, TypeError):  # e.g. an edited cell holding text in a number column
+                return False
+            self.filtered = filtered
+            self.local_filters = (list(filterkeys), list(filtervalues)) if compiled else None
+            self.show_rows()
+        return True
+
+    @traced('treeview.apply_changes', 'ui')
+    def apply_changes(self, keys):  # rows other clients changed (see changefeed): refetch just those
+        table, filterkeys, filtervalues = self.query
+        columns = list(self.tree["columns"])
+        store = self.main_app.selected_rows
+        pk_col = columns.index(C.primarykeys[table])
+        items = {str(pk): item for pk, item in zip(store.column(pk_col), self.item_ids) if item is not None}
+        edited = {edit.item for edit in self.journal.done}  # buffered edits win, conflicts show up on save
+        rows = {str(row[pk_col]): row for row in self.main_app.db.fetch_rows(table, keys, filterkeys,
+                                                                              filtervalues, columns)}
+        added = []
+        for key in keys:
+            item, row = items.get(key), rows.get(key)
+            if item in edited:
+                continue
+            if item is None:  # new row, or one that now passes the filters
+                if row is not None and self.complete:  # a paged view gets it from its next pages
+                    added.append(row)
+            elif row is None:  # deleted, or no longer passes the filters
+                self.tree.delete(item)
+                self.forget_row(item)
+                self.total -= 1
+            else:
+                idx = self.row_index[item]
+                if self.search_index is not None:
+                    self.search_index.replace(idx, store[idx], row)
+                for col_index, value in enumerate(row):
+                    store.set(idx, col_index, value)
+                self.tree.item(item, values=row)
+        if added:
+            self.insert_rows(added)
+            self.total += len(added)
+        self.sort_orders = {}
+        if self.sort_column is not None and self.complete:  # keep the order the user picked
+            order = self.sorted_order(self.sort_column)
+            self.order, self.rank = (order[::-1] if self.sort_desc else order), None
+        if self.local_filters is not None:
+            compiled = localfilter.compile_filters(columns, *self.local_filters)
+            self.filtered = localfilter.evaluate(compiled, store)
+        if self.matches is not None:
+            self.matches = self.search_index.search(self.search_text.get())
+        if self.order is not None or self.filtered is not None or self.matches is not None:
+            self.show_rows()
+
+    def apply_search(self):  # search box changed
+        text = self.search_text.get()
+        if not text.strip() and self.matches is None:
+            return  # nothing typed and nothing hidden
+        with span('treeview.search', 'ui'):
+            if self.search_index is None:
+                self.search_index = SearchIndex()
+                self.search_index.add(self.main_app.selected_rows)
+            self.matches = self.search_index.search(text)
+            self.show_rows()
+
+    def update_headings(self):  # show an arrow on the sorted column
+        table = self.query[0]
+        if table not in C.tables:
+            return
+        all_columns = C.columns[C.tables.index(table)]
+        for column in self.tree["columns"]:
+            title = C.titles[C.tables.index(table)][all_columns.index(column)]
+            if column == self.sort_column:
+                title += " \u25bc" if self.sort_desc else " \u25b2"
+            self.tree.heading(column, text=title)
+
+    def sorted_order(self, column):  # row indexes sorted by column (ascending), cached
+        if column not in self.sort_orders:
+            col_index = list(self.tree["columns"]).index(column)
+            self.sort_orders[column] = self.main_app.selected_rows.sort_order(col_index)
+        return self.sort_orders[column]
+
+    @traced('treeview.sort', 'ui')
+    def sort_by(self, column):  # heading clicked
+        if self.active_editor:
+            self.active_editor.destroy()
+            self.active_editor = None
+        if not self.complete and column in C.lazy_columns.get(self.query[0], []):
+            # only a preview is loaded, so it can't be used to fetch the following pages
+            messagebox.showinfo(parent=self.root, title="Sort",
+                                message="This column can only be sorted when the whole table is loaded.")
+            return
+        if not self.complete and not self.settle_edits():  # the rows will be fetched again
+            return
+        if column == self.sort_column:
+            self.sort_desc = not self.sort_desc
+        else:
+            self.sort_column, self.sort_desc = column, False
+        self.update_headings()
+        if self.complete:  # everything is loaded, just reorder the items
+            order = self.sorted_order(column)
+            self.order = order[::-1] if self.sort_desc else order
+            self.rank = None
+            self.show_rows()
+        else:  # too big to hold, let the server sort it using its indexes
+            table, filterkeys, filtervalues = self.query
+            rows = self.main_app.db.fetch_page(table, filterkeys, filtervalues,
+                                               column, self.sort_desc, columns=list(self.tree["columns"]))
+            self.tree.delete(*self.tree.get_children())
+            self.main_app.selected_rows = ColumnStore(table, self.tree["columns"])
+            self.item_ids, self.row_index = [], {}
+            self.order, self.rank, self.search_index, self.filtered = None, None, None, None
+            self.local_filters = None
+            self.insert_rows(rows)
+            if self.matches is not None:
+                self.apply_search()
+            self.tree.yview_moveto(0)
+
+    @traced('treeview.load_table', 'ui')
+    def load_table(self, table_name, rows, filterkeys=(), filtervalues=(), total=None, columns=None):
+        # filterkeys/filtervalues: the filters rows were fetched with (needed to fetch more pages)
+        # total: number of matching rows in the database when rows is only the first page
+        # columns: the columns in rows, when only some were fetched (see C.view_columns)
         # Hide the placeholder and bring back scrollbars
         self.placeholder_label.grid_remove()
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        self.vsb.grid(row=0, column=1, sticky="ns")
-        self.hsb.grid(row=1, column=0, sticky="ew")
-        if table_name == "aircraft":
-            columns = C.aircraft_columns
-            titles = C.aircraft_titles
-        elif table_name == "airports":
-            columns = C.airports_columns
-            titles = C.airports_titles
-        elif table_name == "routes":
-            columns = C.routes_columns
-            titles = C.routes_titles
-        elif table_name == "flights":
-            columns = C.flights_columns
-            titles = C.flights_titles
-        elif table_name == "maintenance":
-            columns = C.maintenance_columns
-            titles = C.maintenance_titles
-        elif table_name == "accounts":
-            columns = C.accounts_columns
-            titles = C.accounts_titles
+        self.search_frame.grid(row=0, column=0, columnspan=2, sticky="ew")
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.vsb.grid(row=1, column=1, sticky="ns")
+        self.hsb.grid(row=2, column=0, sticky="ew")
+        if table_name in C.tables:
+            all_columns = C.columns[C.tables.index(table_name)]
+            all_titles = C.titles[C.tables.index(table_name)]
+            columns = list(all_columns if columns is None else columns)
+            titles = [all_titles[all_columns.index(i)] for i in columns]
         else:
             columns, titles = [], []
 
         # clear old data
-        self.tree.delete(*self.tree.get_children())  # Remove all items
+        with span('treeview.clear', 'ui'):
+            self.tree.delete(*self.tree.get_children())  # Remove all items
+        self.query = (table_name, list(filterkeys), list(filtervalues))
+        self.total = len(rows) if total is None else total
+        self.complete = len(rows) >= self.total
+        self.sort_column, self.sort_desc = None, False
+        self.item_ids, self.row_index = [], {}
+        self.order, self.rank, self.search_index, self.matches = None, None, None, None
+        self.filtered, self.local_filters = None, None
+        self.journal.clear()
+        self.search_text.set("")  # a new table starts unfiltered
+        self.search_count.config(text="")
+        self.main_app.selected_rows = ColumnStore(table_name, columns)  # compact copy of the loaded rows
 
         # input data
         self.tree["columns"] = columns
@@ -228,17 +679,15 @@ class TreeViewer:
         self.tree.column("#0", width=50, anchor="center", stretch=False)
         # put each column heading and set width
         for i in columns:
-            self.tree.heading(i, text=titles[columns.index(i)])
+            self.tree.heading(i, text=titles[columns.index(i)],
+                              command=lambda column=i: self.sort_by(column))  # click to sort
             self.tree.column(i, anchor="center", minwidth=60,
                              width=C.column_widths[i], stretch=False)
 
         # Add rows from SQL DB after fetching data and filtering, with numbering
-        # enumerate rows starting from 1, giving each row an index
-        for idx, row in enumerate(rows, start=1):
-            self.tree.insert("", "end", text=str(idx), values=row)
+        self.insert_rows(rows)
 
-        # Store the current table and selected rows
+        # Store the current table
         self.main_app.selected_table = table_name
-        self.main_app.selected_rows = rows
         pk_column = C.primarykeys[table_name]
         self.pk_index = columns.index(pk_column)
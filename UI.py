@@ -3,11 +3,20 @@ import tkinter
 from tkinter import ttk, messagebox, filedialog
 import constants as C
 import Tableviewer as TV
-import Dialogueboxes as dbox
+import tracing
+from tracing import traced
+from filterexpr import FilterError, build_all
+from responsiveness import UIMonitor
+from changefeed import ChangeFeed
+
+
+def dialogs():  # Dialogueboxes is imported the first time a dialog is opened, not at startup
+    import Dialogueboxes
+    return Dialogueboxes
 
 
 class Flyts:
-    def __init__(self, root, db, user=None, passwd=None):
+    def __init__(self, root, db=None, user=None, passwd=None):
 
         self.root = root  # window root
         self.db = db  # database object
@@ -18,23 +27,63 @@ class Flyts:
         self.selected_rows = []  # used for editing
         self.selected_filters = {}  # currently applied filters
         self.menubar = MenuBar(self.root, self)  # menu bar object
+        self.status = ttk.Label(self.root, anchor="w", padding=(5, 1))  # status bar
+        self.status.pack(side="bottom", fill="x")
         self.tree = TV.TreeViewer(self.root, self)  # treeview object
         self.editmode = tkinter.BooleanVar(value=False)  # edit mode variable
+        self.buffer_edits = tkinter.BooleanVar(value=False)  # keep edits until saved, see TreeViewer.save_edits
+        self.monitor = UIMonitor(self.root)  # measures how long the window is frozen
+        self.monitor.start()
 
-        if user is None or passwd is None:
-            self.session = None
-            self.signed_in = False
-        else:
-            self.session = self.db.login_user(user, passwd)
-            self.signed_in = self.session is not None
+        self.session = None
+        self.signed_in = False
+        self.feed = None  # other clients' changes, polled once connected
         self.style = ttk.Style()
 
         # set theme on startup
         self.styleset()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
+        # without a database the window is shown empty and attach() is called once connected
+        if db is not None:
+            session = None if user is None or passwd is None else db.login_user(user, passwd)
+            self.attach(db, session)
+
+    def attach(self, db, session):  # database connected (and saved user logged in, if any)
+        self.db = db
+        self.session = session
+        self.signed_in = session is not None
         # menu initialization
         self.menubar.menu()
-
+        self.feed = ChangeFeed(db)
+        self.root.after(C.poll_ms, self.poll_changes)
+
+    def poll_changes(self):  # keep the open table in step with writes made by other clients
+        try:
+            with tracing.span('changes.poll', 'db'):
+                changes = self.feed.poll()
+            if 'routes' in changes:  # the route network changed under the cached graph
+                self.db.graph = None
+            table = self.tree.query[0]
+            if self.signed_in and table in changes:
+                if changes[table] is not None:
+                    self.tree.apply_changes(changes[table])
+                elif len(self.tree.journal) or self.tree.active_editor:  # don't pull rows from under the user
+                    self.set_status(f"{table} was changed by another user, reopen it to see the changes")
+                else:  # many rows changed at once (e.g. flights planned), fetch the view again
+                    self.menubar.load(*self.tree.query)
+        except Exception as error:  # e.g. connection lost; try again next time
+            self.set_status(f"Could not check for changes: {error}")
+        self.root.after(C.poll_ms, self.poll_changes)
+
+    def set_status(self, text):
+        self.status.config(text=text)
+
+    def close(self):  # window closed, unsaved edits are saved or discarded first
+        if self.tree.settle_edits():
+            self.root.destroy()
+
+    @traced('menu.import')
     def importer(self):
         from csvlogic import CSVmanager
         file_path = filedialog.askopenfilename(title="Select a file to import", filetypes=(
@@ -53,6 +102,7 @@ class Flyts:
             self.menubar.show_table(rows[1])
         messagebox.showinfo("Export Complete", f"Imported from {file_path}")
 
+    @traced('menu.export')
     def exporter(self):
         from csvlogic import CSVmanager
         if not self.selected_table:
@@ -65,7 +115,9 @@ class Flyts:
         if not folder_path:
             return
 
-        rows = self.db.fetch_data(self.selected_table, [], [])
+        rows = self.tree.table_rows(self.selected_table)  # no query if the whole table is already loaded
+        if rows is None:
+            rows = self.db.fetch_data(self.selected_table, [], [])
         if self.selected_table == "aircraft":
             columns = C.aircraft_columns
         elif self.selected_table == "airports":
@@ -96,18 +148,40 @@ class MenuBar:
         self.menubar.focus_set()
 
     def open_settings_dialog(self):  # open settings dialog menu action
-        dialog = dbox.DialogueBox(
+        dialog = dialogs().DialogueBox(
             self.main_app.root, self.main_app, "Settings")
         settings = dialog.SettingsDialog(C.load_settings())
         if settings:
             C.save_settings(settings)
             self.main_app.styleset()
 
+    def export_trace(self):  # save recorded spans for a flame graph viewer
+        path = tracing.export()
+        messagebox.showinfo("Trace Exported",
+                            f"Trace saved to {path}\n\nOpen it in chrome://tracing or ui.perfetto.dev.")
+
+    def ui_report(self):  # UI latency so far this session
+        report = self.main_app.monitor.report()
+        latency = report['latency_ms']
+        worst = report['worst_stalls'][0]['stack'] if report['worst_stalls'] else None
+        messagebox.showinfo("UI Responsiveness",
+                            f"Session length: {report['duration_s']} s\n"
+                            f"Event loop delay p50/p95/p99/max: {latency['p50']} / {latency['p95']} / "
+                            f"{latency['p99']} / {latency['max']} ms\n"
+                            f"Stalls over {report['stall_threshold_ms']:.0f} ms: {report['stall_count']} "
+                            f"({report['stalled_s']} s frozen)\n\n"
+                            f"Worst stall was in:\n{worst[-1].strip() if worst else '-'}\n\n"
+                            f"The full report is saved to {C.RESPONSIVENESS_DIR} when Flyts closes.")
+
     def filemenu(self):  # define file menu buttons and actions
         FileMenu = tkinter.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="File", menu=FileMenu)
         FileMenu.add_command(
             label='Settings', command=self.open_settings_dialog)
+        FileMenu.add_command(
+            label='Export Performance Trace', command=self.export_trace)
+        FileMenu.add_command(
+            label='UI Responsiveness', command=self.ui_report)
         if self.main_app.session is None or not (self.main_app.session.is_admin() or self.main_app.session.is_staff()):
             return
         FileMenu.add_separator()  # separator
@@ -124,18 +198,58 @@ class MenuBar:
             return
         EditMenu.add_checkbutton(
             label="Edit Mode", variable=self.main_app.editmode, onvalue=True, offvalue=False)
+        EditMenu.add_checkbutton(
+            label="Buffer Edits", variable=self.main_app.buffer_edits, onvalue=True, offvalue=False,
+            command=self.buffer_toggled)
+        EditMenu.add_command(label="Undo Edit", accelerator="Ctrl+Z",
+                             command=self.main_app.tree.undo_edit)
+        EditMenu.add_command(label="Redo Edit", accelerator="Ctrl+Y",
+                             command=self.main_app.tree.redo_edit)
+        EditMenu.add_command(label="Save Edits", accelerator="Ctrl+S",
+                             command=self.main_app.tree.save_edits)
+        EditMenu.add_command(label="Discard Edits",
+                             command=self.main_app.tree.discard_edits)
         EditMenu.add_separator()
         EditMenu.add_command(label="Add Row", command=self.add_row)
-        EditMenu.add_command(label="Delete Row",
+        EditMenu.add_command(label="Edit Selected Rows",
+                             command=self.edit_rows)
+        EditMenu.add_command(label="Delete Selected Rows",
                              command=self.main_app.tree.delete_row)
 
+    def buffer_toggled(self):  # edits made while buffering are saved or dropped when it is turned off
+        if not self.main_app.buffer_edits.get() and not self.main_app.tree.settle_edits():
+            self.main_app.buffer_edits.set(True)
+
+    @traced('menu.edit_rows')
+    def edit_rows(self):  # set a column in every selected row at once
+        tree = self.main_app.tree
+        selected = tree.tree.selection()
+        if not self.main_app.editmode.get():
+            messagebox.showinfo(parent=self.main_app.root, title="View mode",
+                                message="You are in View mode.\nPlease switch to edit mode to edit records.")
+            return
+        if not self.main_app.selected_table or not selected:
+            messagebox.showinfo(parent=self.main_app.root, title="No Rows Selected",
+                                message="Select the rows to edit first (Ctrl/Shift + click).")
+            return
+        dialogue = dialogs().DialogueBox(
+            self.main_app.root, self.main_app, "Edit Selected Rows")
+        result = dialogue.bulk_edit_dialog(
+            self.main_app.selected_table, tree.tree["columns"], len(selected))
+        if result is not None:
+            tree.update_selected(*result)
+
+    @traced('menu.add_row')
     def add_row(self):  # open add row dialog and insert into database
-        dialogue = dbox.DialogueBox(
+        dialogue = dialogs().DialogueBox(
             self.main_app.root, self.main_app, "Add Record")
         result = dialogue.add_record_dialog()
         if result is None:  # User closed the dialog without action
             return
         else:  # Insert into SQL (or apply filters)
+            if self.main_app.selected_table == 'flights' and \
+                    not self.main_app.tree.bookings_ok([dict(zip(C.flights_columns, result))]):
+                return  # the aircraft is already flying then
             self.main_app.db.insert_row(self.main_app.selected_table, result)
             self.show_table(self.main_app.selected_table)
 
@@ -160,9 +274,21 @@ class MenuBar:
             # if not signed in, disable view menu
             self.menubar.entryconfig("View", state="disabled")
 
+    def load(self, table_name, filterkeys, filtervalues):  # fetch rows and show them in the treeview
+        if not self.main_app.tree.settle_edits():
+            return
+        columns = C.view_columns(table_name)  # only what the grid shows, wide columns as previews
+        total = self.main_app.db.count_rows(table_name, filterkeys, filtervalues)
+        if total > C.server_sort_threshold:  # big table, load the first page and fetch more on scroll
+            rows = self.main_app.db.fetch_page(table_name, filterkeys, filtervalues,
+                                               C.primarykeys[table_name], columns=columns)
+        else:
+            rows = self.main_app.db.fetch_data(table_name, filterkeys, filtervalues, columns)
+        self.main_app.tree.load_table(table_name, rows, filterkeys, filtervalues, total, columns)
+
+    @traced('menu.show_table')
     def show_table(self, table_name):  # load and display table in treeview
-        rows = self.main_app.db.fetch_data(table_name, [], [])
-        self.main_app.tree.load_table(table_name, rows)
+        self.load(table_name, [], [])
         self.main_app.selected_table = table_name
         self.main_app.selected_filters = {}
 
@@ -174,19 +300,148 @@ class MenuBar:
             return  # only admin/staff can plan flights
         PlanningMenu.add_command(label='Plan Flights',
                                  command=self.plan_flights)
+        PlanningMenu.add_command(label='Extend Plan',
+                                 command=lambda: self.plan_flights(incremental=True))
+        PlanningMenu.add_command(label='Compare Plans...',
+                                 command=self.compare_plans)
+        PlanningMenu.add_command(
+            label='Check Double Bookings', command=self.double_bookings)
+        PlanningMenu.add_command(
+            label='Planned Flight Costs', command=self.flight_costs)
+        PlanningMenu.add_command(
+            label='Compute Great Circle Distances', command=self.update_greatcircle)
+        PlanningMenu.add_command(
+            label='Airports in Range...', command=self.airports_in_range)
+        PlanningMenu.add_command(
+            label='Route Search...', command=self.route_search)
+        PlanningMenu.add_command(
+            label='Fleet Reachability', command=self.fleet_reachability)
         PlanningMenu.add_command(
             label='Clear All Flights', command=self.clear_flights)
 
-    def plan_flights(self):  # plan flights menu action
-        self.main_app.db.plan_flights()  # database function to plan flights
+    @traced('menu.greatcircle')
+    def update_greatcircle(self):  # route distances from airport coordinates
+        changed = self.main_app.db.update_greatcircle()
+        self.main_app.set_status(f"Great circle distance updated on {changed} routes")
+        if self.main_app.selected_table == "routes":
+            self.show_table("routes")
+
+    @traced('menu.airports_in_range')
+    def airports_in_range(self):  # selected aircraft: airports it can reach; selected airport: alternates
+        tree = self.main_app.tree
+        selected = tree.tree.selection()
+        table = self.main_app.selected_table
+        if table not in ("aircraft", "airports") or not selected:
+            messagebox.showinfo(parent=self.main_app.root, title="No Row Selected",
+                                message="Select an aircraft or an airport first.")
+            return
+        db = self.main_app.db
+        if table == "aircraft":
+            reg_no = tree.tree.set(selected[0], "reg_no")
+            loc = db.execute("SELECT loc FROM aircraft WHERE reg_no = %s", (reg_no,), fetch='one')
+            loc = loc[0] if loc else None
+            reachable = db.reachable_airports(reg_no)
+            lines = "\n".join(f"{code}: {nm:,.0f} nm" for code, nm in reachable[:30])
+            more = f"\n... and {len(reachable) - 30} more" if len(reachable) > 30 else ""
+            text = (f"{reg_no} at {loc or 'no location'} can reach {len(reachable)} airports:\n\n{lines}{more}"
+                    if reachable else f"No airports in range of {reg_no} (it needs a location with coordinates).")
+        else:
+            loc = tree.tree.set(selected[0], "ICAO")
+            text = ""
+        alternates = db.nearest_airports(loc) if loc else []
+        if alternates:
+            text += f"\n\nNearest to {loc}:\n" + "\n".join(f"{code}: {nm:,.0f} nm" for code, nm in alternates)
+        messagebox.showinfo(parent=self.main_app.root, title="Airports in Range",
+                            message=text.strip() or f"{loc} has no coordinates.")
+
+    @traced('menu.route_search')
+    def route_search(self):  # connections between two airports, optionally within an aircraft's range
+        dialog = dialogs().DialogueBox(self.main_app.root, self.main_app, "Route Search")
+        dialog.route_search_dialog(self.main_app.db.route_search)
+
+    @traced('menu.fleet_reachability')
+    def fleet_reachability(self):  # how much of the network each active aircraft can reach
+        reach = self.main_app.db.fleet_reachability()
+        if not reach:
+            messagebox.showinfo("Fleet Reachability", "There are no active aircraft.")
+            return
+        counts = sorted((len(airports), reg_no) for reg_no, airports in reach.items())
+        lines = "\n".join(f"{reg_no}: {count} airports" for count, reg_no in counts[:15])
+        messagebox.showinfo("Fleet Reachability",
+                            f"Airports reachable within {C.route_hops} legs, {len(counts)} active aircraft:\n"
+                            f"average {sum(c for c, r in counts) / len(counts):.0f}, "
+                            f"most {counts[-1][0]}, fewest {counts[0][0]}\n\nLeast connected:\n{lines}")
+
+    @traced('menu.flight_costs')
+    def flight_costs(self):  # fuel cost estimate of the planned schedule, most expensive aircraft first
+        costs = self.main_app.db.flight_costs()
+        if not costs['flights']:
+            messagebox.showinfo("Planned Flight Costs", "There are no planned flights.")
+            return
+        tails = sorted(costs['per_tail'].items(), key=lambda item: item[1][1], reverse=True)
+        lines = "\n".join(f"{reg_no}: {flights} flights, {cost:,.0f}" for reg_no, (flights, cost) in tails[:15])
+        unknown = (f"\n{costs['unknown']} flights without a distance, aircraft or fuel price are not included."
+                   if costs['unknown'] else "")
+        messagebox.showinfo("Planned Flight Costs",
+                            f"{len(costs['flights'])} planned flights, estimated fuel cost {costs['total']:,.0f}"
+                            f"{unknown}\n\nMost expensive aircraft:\n{lines}")
+
+    @traced('menu.double_bookings')
+    def double_bookings(self):  # list aircraft flying two flights at once
+        found = self.main_app.db.double_bookings()
+        if not found:
+            messagebox.showinfo("Double Bookings", "No aircraft is booked on two flights at the same time.")
+            return
+        lines = "\n".join(f"{reg_no}: flights {first} and {second}, {start:%Y-%m-%d %H:%M} to {end:%H:%M}"
+                          for reg_no, first, second, start, end in found[:25])
+        more = f"\n... and {len(found) - 25} more" if len(found) > 25 else ""
+        messagebox.showwarning("Double Bookings",
+                               f"{len(found)} flights overlap another flight of the same aircraft:\n\n{lines}{more}")
+
+    @traced('menu.plan_flights')
+    def plan_flights(self, incremental=False):  # plan flights menu action
+        # incremental (Extend Plan): keep existing flights and only plan the days missing up to the horizon
+        settings = C.load_settings()
+        planned = self.main_app.db.plan_flights(  # database function to plan flights
+            settings.get('plan_days', C.plan_days), settings.get('turnaround_min', C.turnaround_min),
+            incremental=incremental, cost_weight=settings.get('cost_weight', C.cost_weight))
+        self.main_app.set_status(f"{planned} flights planned")
         # refresh flights table if currently viewing, else send to flights table
         self.show_table("flights")
 
+    @traced('menu.compare_plans')
+    def compare_plans(self):  # what-if planning, then commit the chosen scenario
+        settings = C.load_settings()
+        dialog = dialogs().DialogueBox(self.main_app.root, self.main_app, "Compare Plans")
+        chosen = dialog.plan_compare_dialog(
+            settings.get('plan_days', C.plan_days), settings.get('turnaround_min', C.turnaround_min),
+            settings.get('cost_weight', C.cost_weight),
+            lambda scenarios, incremental: self.plan_in_background(scenarios, incremental))
+        if chosen is None:
+            return
+        name, legs = chosen
+        planned = self.main_app.db.commit_plan(legs, f"committed {name} of a plan comparison")
+        skipped = f", {len(legs) - planned} left out (booked meanwhile)" if planned < len(legs) else ""
+        self.main_app.set_status(f"{name}: {planned} flights planned{skipped}")
+        self.show_table("flights")
+
+    def plan_in_background(self, scenarios, incremental):  # -> queue for planner.compare_into
+        import queue
+        import threading
+        import planner
+        jobs = self.main_app.db.compare_jobs(scenarios, incremental=incremental)  # reads stay on this thread
+        results = queue.Queue()
+        threading.Thread(target=planner.compare_into, args=(jobs, results),
+                         name='compare-plans', daemon=True).start()
+        return results
+
+    @traced('menu.clear_flights')
     def clear_flights(self):  # clear all flights menu action
         self.main_app.db.clear_all_flights()  # database function to clear all flights
         # refresh flights table if currently viewing, else send to flights table
         self.show_table("flights")
 
+    @traced('menu.filters')
     def open_filter_dialog(self):  # open filter dialog menu action
         # Use the currently selected table
         filter_values = {}
@@ -195,25 +450,29 @@ class MenuBar:
             messagebox.showwarning("No Table Selected",
                                    "Please view a table first.")
             return
-        dialog = dbox.DialogueBox(self.main_app.root, self.main_app, "Filters")
+        dialog = dialogs().DialogueBox(self.main_app.root, self.main_app, "Filters")
         filter_values = dialog.FilterDialog(
             table)  # get filter values from dialog
         self.main_app.selected_filters = filter_values
         # Fetch filtered data from the database
         if filter_values != None:  # if user didn't cancel
             if filter_values == 'clear':  # reset filters
-                rows = self.main_app.db.fetch_data(table, [], [])
-                self.main_app.tree.load_table(table, rows)
+                if not self.main_app.tree.apply_filters(table, [], []):
+                    self.load(table, [], [])
             else:  # apply filters
                 filterkeys = [i for i in filter_values.keys()
                               # only include non-empty filters for SQL
                               if filter_values[i]]
                 filtervalues = [filter_values[i]
                                 for i in filterkeys]  # corresponding values
-                rows = self.main_app.db.fetch_data(
-                    table, filterkeys, filtervalues)  # fetch new data from database
-                # load new data into treeview
-                self.main_app.tree.load_table(table, rows)
+                try:  # check values against the column types before anything runs
+                    build_all(filterkeys, filtervalues)
+                except FilterError as e:
+                    messagebox.showerror("Invalid Filter", str(e))
+                    return
+                # filter the rows on screen if they're the whole table, else fetch from database
+                if not self.main_app.tree.apply_filters(table, filterkeys, filtervalues):
+                    self.load(table, filterkeys, filtervalues)
 
     def usermenu(self):  # define user menu buttons and actions
         UserMenu = tkinter.Menu(self.menubar, tearoff=0)
@@ -224,22 +483,25 @@ class MenuBar:
                 UserMenu.add_command(label='Register', command=self.register)
                 UserMenu.add_command(label='Admin Panel',
                                      command=self.admin_panel)
+                UserMenu.add_command(label='Query Statistics',
+                                     command=self.query_stats)
             # general user options
             UserMenu.add_command(label='Profile', command=self.view_profile)
             UserMenu.add_command(label='Logout', command=self.logout)
         self.menubar.add_cascade(label="User", menu=UserMenu)
 
     def login(self):  # login menu action
-        login_dialog = dbox.DialogueBox(
+        login_dialog = dialogs().DialogueBox(
             self.main_app.root, self.main_app, "Login")
         login_dialog.create_session_dialog()
 
     def logout(self):  # logout menu action
         confirmation = messagebox.askyesno(
             "Confirm Logout", "Are you sure you want to logout?")
-        if confirmation:
+        if confirmation and self.main_app.tree.settle_edits():
             self.main_app.signed_in = False  # set signed in to false
             self.main_app.session = None  # set session to none
+            self.main_app.db.user = None  # later changes aren't attributed to this user
             self.main_app.tree.tree.delete(
                 *self.main_app.tree.tree.get_children())  # set treeview to empty
             for i in range(self.main_app.menubar.menubar.index("end")+1, -1, -1):  # remove all menus
@@ -248,21 +510,28 @@ class MenuBar:
             messagebox.showinfo("Logged Out", "You have been logged out.")
 
     def view_profile(self):  # view profile menu action
-        profile_dialog = dbox.DialogueBox(
+        profile_dialog = dialogs().DialogueBox(
             self.main_app.root, self.main_app, "Profile")
         profile_dialog.profile_dialog()
 
     def register(self):  # register menu action
-        register_dialog = dbox.DialogueBox(
+        register_dialog = dialogs().DialogueBox(
             self.main_app.root, self.main_app, "Register")
         register_dialog.register_dialog()
 
     def admin_panel(self):  # admin panel menu action
-        admin_dialog = dbox.DialogueBox(
+        admin_dialog = dialogs().DialogueBox(
             self.main_app.root, self.main_app, "Admin Panel")
         users_tree = TV.TreeViewer(admin_dialog.dialog, self.main_app)
         admin_dialog.admin_panel(users_tree)
 
+    def query_stats(self):  # slowest database statements, admin only
+        if self.main_app.session is None or not self.main_app.session.is_admin():
+            return
+        stats_dialog = dialogs().DialogueBox(
+            self.main_app.root, self.main_app, "Query Statistics")
+        stats_dialog.query_stats_dialog(self.main_app.db.stats)
+
     def menu(self):  # initialize all menus
         self.filemenu()
         self.editmenu()
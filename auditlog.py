@@ -0,0 +1,79 @@
+# imports
+import threading
+from collections import deque
+import constants as C
+from tracing import span
+
+# Audit trail of data changes (who changed what, from what, to what).
+# database queues an entry per changed cell/row when its transaction commits; a background
+# thread with its own connection appends them to the audit table in batches, so edits don't
+# wait for audit inserts. Loss is bounded: at most C.audit_flush_ms of entries if Flyts crashes,
+# and at most C.audit_max_pending entries are kept while the database can't be reached.
+
+insert_query = ("INSERT INTO audit (at, account_id, username, tbl, pk, op, col, old_value, new_value) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)")
+
+
+class AuditLog:
+    def __init__(self, connect):
+        self.connect = connect  # function returning a new database object, used only by the writer thread
+        self.queue = deque()  # entries waiting to be written, oldest first
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = True
+        self.written = 0
+        self.dropped = 0  # entries thrown away because the queue was full
+        self.error = None  # last write error, cleared once a batch is written again
+        self.thread = threading.Thread(target=self.run, name='audit-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, entries):  # called by database after a commit
+        with self.lock:
+            self.queue.extend(entries)
+            over = len(self.queue) - C.audit_max_pending
+            for x in range(over):
+                self.queue.popleft()
+            self.dropped += max(over, 0)
+            full = len(self.queue) >= C.audit_batch
+        if full:
+            self.wake.set()
+
+    def run(self):  # writer thread
+        db = None
+        while True:
+            self.wake.wait(C.audit_flush_ms / 1000)
+            self.wake.clear()
+            stopping = not self.running
+            while True:
+                with self.lock:
+                    batch = [self.queue.popleft() for x in range(min(C.audit_batch, len(self.queue)))]
+                if not batch:
+                    break
+                try:
+                    if db is None:
+                        db = self.connect()
+                    with span('audit.flush', 'db', entries=len(batch)):
+                        db.execute(insert_query, batch, many=True)
+                        db.mydb.commit()
+                    self.written += len(batch)
+                    self.error = None
+                except Exception as error:  # keep the batch and try again on the next tick
+                    self.error = error
+                    with self.lock:
+                        self.queue.extendleft(reversed(batch))
+                    if db is not None:
+                        try:
+                            db.signout()
+                        except Exception:
+                            pass
+                    db = None
+                    break
+            if stopping:
+                break
+        if db is not None:
+            db.signout()
+
+    def close(self, timeout=5):  # write what is left, then stop
+        self.running = False
+        self.wake.set()
+        self.thread.join(timeout)
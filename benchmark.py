@@ -0,0 +1,163 @@
+# imports
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import tkinter
+from types import SimpleNamespace
+from datetime import datetime
+import constants as C
+import databaselogic as dbl
+import datagen
+from csvlogic import CSVmanager
+
+# Scaling benchmark suite.
+# Loads a generated dataset into a separate database (C.bench_database, never the real one)
+# and times the same code paths the app uses: CSV import, fetch_data with filters,
+# plan_flights, export and TreeViewer.load_table. Results are written as JSON to C.BENCH_DIR.
+
+# filters from C.filterslist used for the fetch_data timings, with the value to filter on
+bench_filters = {
+    'aircraft': [(['aircraft_status'], ['ACTV']), (['range_min', 'capacity_max'], [3000, 200])],
+    'routes': [(['route_dep'], None), (['route_dist_max'], [1000])],
+    'flights': [(['assigned_aircraft'], None), (['dept_after'], ['2025-06-01 00:00:00'])],
+    'maintenance': [(['maint_status'], ['Pending'])],
+}
+fleet_sizes = [10, 100, 1000]  # number of ACTV aircraft given to plan_flights
+horizons = [1, 7, 14]  # days_ahead given to plan_flights
+plan_start = datetime(2025, 1, 1)  # plan_flights plans from here with the run's seed, so runs are comparable
+
+
+class Benchmark:
+    def __init__(self, db, scale, seed=0):
+        self.db = db
+        self.scale = scale
+        self.seed = seed
+        self.results = []
+
+    def timed(self, name, function, **params):  # run function once and record how long it took
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        rows = len(result) if isinstance(result, (list, tuple)) else None
+        self.results.append({'name': name, 'params': params, 'seconds': round(seconds, 6), 'rows': rows})
+        print(f'{name:<14} {json.dumps(params):<60} {seconds:10.4f}s')
+        return result
+
+    def reset_database(self):  # fresh, empty benchmark database
+        self.db.execute("DROP DATABASE IF EXISTS " + C.database)
+        self.db.createtables()
+
+    def bench_import(self, paths):
+        csvmgr = CSVmanager(',')
+        # parents before children so foreign keys resolve
+        for table in ['airports', 'aircraft', 'routes', 'flights', 'maintenance']:
+            def run():
+                data, tablename = csvmgr.loadcsv(paths[table])
+                for row in data[1:]:  # same loop as Flyts.importer
+                    self.db.insert_row(tablename, row)
+                return data[1:]
+            self.timed('import', run, table=table)
+
+    def bench_fetch(self, dataset):
+        for table, cases in bench_filters.items():
+            self.timed('fetch_data', lambda: self.db.fetch_data(table, [], []), table=table, filters=[])
+            for filters, values in cases:
+                if values is None:  # filter on a key that exists in the data
+                    column = C.filterslist[filters[0]]['column']
+                    values = [dataset[table][0][C.columns[C.tables.index(table)].index(column)]]
+                self.timed('fetch_data', lambda: self.db.fetch_data(table, filters, values),
+                           table=table, filters=filters)
+
+    def bench_plan(self, dataset):
+        regs = [row[0] for row in dataset['aircraft']]
+        for fleet in fleet_sizes:
+            if fleet > len(regs):
+                break
+            # exactly `fleet` aircraft are active
+            self.db.execute("UPDATE aircraft SET status='PRKD'")
+            for i in range(0, fleet, 500):
+                chunk = regs[i:min(i + 500, fleet)]
+                self.db.execute(
+                    f"UPDATE aircraft SET status='ACTV' WHERE reg_no IN ({','.join(['%s'] * len(chunk))})", chunk)
+            self.db.mydb.commit()
+            for days in horizons:
+                self.db.clear_all_flights()
+                self.timed('plan_flights', lambda: self.db.plan_flights(days_ahead=days, start=plan_start,
+                                                                        seed=self.seed),
+                           fleet=fleet, days_ahead=days)
+
+    def bench_export(self, folder):
+        csvmgr = CSVmanager(C.defdelimiter)
+        for table, columns in zip(C.tables, C.columns):
+            if table == 'accounts':
+                continue  # not exportable from the app
+            def run():
+                rows = self.db.fetch_data(table, [], [])
+                csvmgr.savecsv(os.path.join(folder, table + '.csv'), rows, columns)
+                return rows
+            self.timed('export', run, table=table)
+
+    def bench_treeview(self):
+        import Tableviewer as TV
+        root = tkinter.Tk()
+        root.withdraw()
+        # the attributes of Flyts that TreeViewer reads and writes
+        main_app = SimpleNamespace(root=root, selected_table=None, selected_rows=[],
+                                   editmode=tkinter.BooleanVar(root, value=False))
+        viewer = TV.TreeViewer(root, main_app)
+        for table in ['aircraft', 'routes', 'flights', 'maintenance']:
+            rows = self.db.fetch_data(table, [], [])
+            def run():
+                viewer.load_table(table, rows)
+                root.update_idletasks()  # include Tk's layout work
+                return rows
+            self.timed('load_table', run, table=table)
+        root.destroy()
+
+    def run(self, data_folder):
+        rows = datagen.scales[self.scale]
+        paths = datagen.write_dataset(data_folder, rows, self.seed)
+        dataset = datagen.generate(rows, self.seed)
+        self.reset_database()
+        self.bench_import(paths)
+        self.bench_fetch(dataset)
+        with tempfile.TemporaryDirectory() as folder:
+            self.bench_export(folder)
+        self.bench_treeview()
+        self.bench_plan(dataset)  # last, it changes aircraft statuses and flights
+
+    def save(self, folder=C.BENCH_DIR):
+        os.makedirs(folder, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(folder, f'bench-{self.scale}-{stamp}.json')
+        with open(path, 'w') as file:
+            json.dump({'scale': self.scale, 'rows': datagen.scales[self.scale], 'seed': self.seed,
+                       'started': stamp, 'python': platform.python_version(),
+                       'platform': platform.platform(), 'results': self.results}, file, indent=2)
+        return path
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Time Flyts operations on generated data')
+    parser.add_argument('scales', nargs='*', default=['1k'], choices=sorted(datagen.scales))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        s = C.load_settings()  # same connection details as the app
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(f'Run Flyts setup first: {e}')
+    C.database = C.bench_database  # createtables and USE work on the benchmark database
+    base = dbl.database(s['host'], s['user_db'], s['passwd_db'], s['charset'])
+    base.connection()
+    try:
+        for scale in args.scales:
+            bench = Benchmark(base, scale, args.seed)
+            bench.run(os.path.join(C.BASE_DIR, 'bench_data', scale))
+            print('Results saved to', bench.save())
+    finally:
+        base.signout()
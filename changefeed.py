@@ -0,0 +1,40 @@
+# imports
+import time
+import constants as C
+
+# Client side of the change log (see database.log_changes).
+# Every poll reads the change log rows after the last version seen and returns, per table,
+# the primary keys other clients touched, so the open view can refetch just those rows.
+# Versions come from AUTO_INCREMENT, so a transaction that commits late can leave a gap that
+# fills in later; gaps are re-read for a while (C.changelog_gap_s) before they are given up on.
+
+
+class ChangeFeed:
+    def __init__(self, db):
+        self.db = db
+        self.origin = db.connection_id()  # our own writes are already on screen
+        self.version = db.change_version()  # start from now, the views are loaded fresh
+        self.gaps = {}  # version not seen yet -> when it was first missed
+
+    def poll(self):  # -> {table: set of primary keys (as text), or None if the whole table changed}
+        since = min(self.gaps, default=self.version + 1) - 1
+        now = time.monotonic()
+        changes = {}
+        for version, table, pk, op, origin in self.db.changes_since(since):
+            if version <= self.version and version not in self.gaps:
+                continue  # already applied
+            self.gaps.pop(version, None)
+            if version - self.version <= C.changelog_batch:  # a huge jump is not a gap worth waiting for
+                for missing in range(self.version + 1, version):
+                    self.gaps[missing] = now
+            self.version = max(self.version, version)
+            if origin == self.origin:
+                continue
+            if op == 'reset' or changes.get(table, set()) is None:
+                changes[table] = None
+            else:
+                changes.setdefault(table, set()).add(pk)
+        for version, missed in list(self.gaps.items()):  # rolled back, or burnt by INSERT IGNORE
+            if now - missed > C.changelog_gap_s:
+                del self.gaps[version]
+        return changes
@@ -0,0 +1,85 @@
+# imports
+from bisect import bisect_left
+from datetime import timedelta
+
+# Double booking detection for aircraft.
+# TailIndex keeps one aircraft's flights as (dept, arrt, flight id) sorted by departure; a new or
+# moved flight only has to be compared with the flights starting up to one flight length before
+# it and the ones starting before it lands, both found by binary search.
+# sweep() finds every flight that overlaps an earlier one of the same aircraft, in one pass over
+# flights already ordered by aircraft and departure, for auditing the whole flights table.
+
+
+class TailIndex:
+    def __init__(self):
+        self.starts = []  # departure times, sorted
+        self.flights = []  # (dept, arrt, flight id), same order as starts
+        self.longest = timedelta(0)  # longest flight, bounds how far back an overlap can start
+
+    def __len__(self):
+        return len(self.flights)
+
+    def add(self, dept, arrt, flight):
+        i = bisect_left(self.starts, dept)
+        self.starts.insert(i, dept)
+        self.flights.insert(i, (dept, arrt, flight))
+        self.longest = max(self.longest, arrt - dept)
+
+    def remove(self, dept, flight):
+        i = bisect_left(self.starts, dept)
+        while i < len(self.flights) and self.starts[i] == dept:
+            if self.flights[i][2] == flight:
+                del self.starts[i], self.flights[i]
+                return True
+            i += 1
+        return False
+
+    def overlapping(self, dept, arrt, exclude=None, gap=timedelta(0)):
+        # flights of this aircraft that overlap [dept, arrt), keeping gap (turnaround) between flights
+        found = []
+        i = bisect_left(self.starts, dept - self.longest - gap)
+        while i < len(self.flights) and self.starts[i] < arrt + gap:
+            other_dept, other_arrt, flight = self.flights[i]
+            if flight != exclude and other_dept < arrt + gap and dept < other_arrt + gap:
+                found.append(flight)
+            i += 1
+        return found
+
+
+class ConflictIndex:  # TailIndex per aircraft
+    def __init__(self, flights=(), gap=timedelta(0)):
+        self.tails = {}
+        self.gap = gap
+        for flight, reg_no, dept, arrt in flights:
+            self.add(flight, reg_no, dept, arrt)
+
+    def add(self, flight, reg_no, dept, arrt):
+        if reg_no is not None and dept is not None and arrt is not None:
+            self.tails.setdefault(reg_no, TailIndex()).add(dept, arrt, flight)
+
+    def remove(self, flight, reg_no, dept):
+        tail = self.tails.get(reg_no)
+        return tail is not None and tail.remove(dept, flight)
+
+    def conflicts(self, reg_no, dept, arrt, exclude=None):  # flight ids the aircraft is already flying then
+        tail = self.tails.get(reg_no)
+        return tail.overlapping(dept, arrt, exclude, self.gap) if tail else []
+
+    def free(self, reg_no, dept, arrt):
+        return not self.conflicts(reg_no, dept, arrt)
+
+
+def sweep(flights, gap=timedelta(0)):
+    # flights: (flight id, reg_no, dept, arrt) ordered by reg_no, dept
+    # -> (reg_no, earlier flight id, flight id, overlap start, overlap end) for each flight that starts
+    #    before the aircraft is back from an earlier one (paired with the earlier one landing last)
+    reg_no, latest = None, None  # latest: (arrt, flight id) of the flight ending last so far
+    for flight, tail, dept, arrt in flights:
+        if dept is None or arrt is None:
+            continue
+        if tail != reg_no:
+            reg_no, latest = tail, None
+        if latest is not None and dept < latest[0] + gap:
+            yield reg_no, latest[1], flight, dept, min(arrt, latest[0])
+        if latest is None or arrt > latest[0]:
+            latest = (arrt, flight)
@@ -9,6 +9,14 @@ BASE_DIR = os.path.dirname(__file__)  # Folder where the project is located
 DB_PATH = os.path.join(BASE_DIR, "airlinedb.db")  # SQLite file path
 CSV_TEMPLATE_PATH = os.path.join(BASE_DIR, "template.csv")
 EXPORTS_DIR = os.path.join(BASE_DIR, "exports")  # Folder for exported files
+BENCH_DIR = os.path.join(BASE_DIR, "benchmarks")  # Folder for benchmark results (JSON)
+PLANNER_GOLDEN = os.path.join(BASE_DIR, "test_data", "planner_golden.json")  # Schedules plancheck expects
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, "slow_queries.log")  # Statements slower than slow_query_ms
+TRACE_DIR = os.path.join(BASE_DIR, "traces")  # Folder for exported trace files
+RESPONSIVENESS_DIR = os.path.join(BASE_DIR, "ui_reports")  # Folder for per-session UI latency reports
+CACHE_DIR = os.path.join(BASE_DIR, "cache")  # Precomputed data rebuilt when missing (distance matrices)
+STARTUP_LOG = os.path.join(BASE_DIR, "startup.log")  # One JSON line of cold start timings per launch
+SETTINGS_PATH = os.path.join(BASE_DIR, "settings.json")
 
 # default app settings
 defdelimiter = ' '
@@ -21,6 +29,34 @@ charset = 'utf8mb4'
 defaultsave = EXPORTS_DIR
 app_theme = 'vista'
 database = 'flyts_db'
+bench_database = 'flyts_bench'  # separate database used by benchmark.py
+slow_query_ms = 200  # default slow query threshold, can be overridden with 'slow_query_ms' in settings
+slow_query_log_bytes = 1_000_000  # rotate the slow query log at 1 MB
+slow_query_log_backups = 3  # number of rotated slow query logs kept
+trace_max_events = 200_000  # spans kept in memory for trace export
+heartbeat_ms = 50  # how often the UI monitor checks the Tk event loop
+stall_ms = 250  # event loop delays longer than this are recorded as stalls
+plan_days = 14  # planning horizon, can be changed in Settings > Planning
+turnaround_min = 45  # minimum minutes on the ground between two legs, also in Settings > Planning
+cost_weight = 0  # > 0: the planner prefers cheaper routes (see costing), also in Settings > Planning
+fuel_burn_kg_per_nm = 0.5  # fuel burn estimate: fixed part ...
+fuel_burn_kg_per_nm_seat = 0.03  # ... plus this much per seat
+fuel_price_unit_kg = 1000  # airports.fuel is the price of this many kg of fuel
+plan_scenarios = 3  # side by side scenarios in Plan > Compare Plans
+plan_poll_ms = 50  # how often Compare Plans looks for the finished scenarios
+plan_window_min = 180  # next leg is picked among routes leaving within this many minutes of the earliest one
+earth_radius_nm = 3440.065  # mean Earth radius, for great-circle distances
+distance_cache_keep = 3  # airport distance matrices kept in CACHE_DIR, newest first
+distance_matrix_max_airports = 5_000  # more airports: no matrix (100 MB at this size), distances computed per pair
+route_hops = 2  # legs searched by Route Search and fleet reachability
+route_search_max_legs = route_hops + 2  # most legs a route search may ask for, itineraries grow fast with it
+itinerary_max_wait_h = 24  # longest wait for a connecting leg
+itinerary_results = 20  # itineraries listed, quickest first
+alternates_count = 5  # nearest airports listed as alternates
+distance_block_rows = 256  # matrix rows computed per NumPy pass when it is (re)built
+max_flight_hours = 24  # no flight is longer, bounds double booking searches
+booking_columns = ('reg_no', 'dept', 'arrt', 'status')  # flights edits that can double book an aircraft
+conflict_scan_tails = 200  # aircraft per query when checking the whole flights table for double bookings
 defaultsettingslist = {'user': signed_in_user,
                        'pass': signed_in_passwd,
                        'user_db': user,
@@ -29,41 +65,57 @@ defaultsettingslist = {'user': signed_in_user,
                        'passwd_db': passwd,
                        'defaultsave': defaultsave,
                        'app_theme': app_theme,
-                       'database': database}
+                       'database': database,
+                       'plan_days': plan_days,
+                       'turnaround_min': turnaround_min,
+                       'cost_weight': cost_weight}
 
 supported_character_sets = ['utf8mb4', 'utf8',
                             'utf16', 'utf32', 'latin1', 'ucs2']
 
 
+# Parsed settings.json, reused until the file's modification time changes
+_settings_cache = {'mtime': None, 'settings': None}
+_themes_cache = None
+
+
 # Gets a dictionary of settings and saves them to settings.json
 def save_settings(settingsdict: dict):
     # Settings file path = BASE_DIR/settings.json
-    with open(os.path.join(BASE_DIR, "settings.json"), 'w') as settings:
+    with open(SETTINGS_PATH, 'w') as settings:
         json.dump(settingsdict, settings)  # Save settings dict as json to file
+    _settings_cache['mtime'] = None  # re-read on next load
 
 
 def load_settings():
-    if os.path.exists(os.path.join(BASE_DIR, "settings.json")):  # If settings file exists
+    try:
+        mtime = os.stat(SETTINGS_PATH).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError("Settings file not found.")
+    if _settings_cache['mtime'] != mtime:  # file changed (or first load), parse it again
         try:
-            with open(os.path.join(BASE_DIR, "settings.json"), 'r') as settings:
-                settingsdict = json.load(settings)  # Load settings from file
-                return settingsdict  # Return loaded settings
+            with open(SETTINGS_PATH, 'r') as settings:
+                _settings_cache['settings'] = json.load(settings)  # Load settings from file
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in settings file: {e}")
-    else:
-        raise FileNotFoundError("Settings file not found.")
+        _settings_cache['mtime'] = mtime
+    return dict(_settings_cache['settings'])  # copy, so callers can't change the cache
 
 
 def settings_exist():  # Returns True if settings file exists, False otherwise
-    return os.path.exists(os.path.join(BASE_DIR, "settings.json"))
+    return os.path.exists(SETTINGS_PATH)
 
 
 def get_supported_themes():  # Returns a list of supported ttk themes on the current OS
-    temp_root = tk.Tk()  # Temporary root to get themes
-    style = ttk.Style(temp_root)  # style object
-    themes = style.theme_names()  # Get list of supported themes
-    temp_root.destroy()  # Destroy temporary root
-    return themes
+    global _themes_cache
+    if _themes_cache is None:
+        if tk._default_root is not None:  # reuse the app's root instead of creating another one
+            _themes_cache = ttk.Style(tk._default_root).theme_names()
+        else:
+            temp_root = tk.Tk()  # Temporary root to get themes
+            _themes_cache = ttk.Style(temp_root).theme_names()  # Get list of supported themes
+            temp_root.destroy()  # Destroy temporary root
+    return _themes_cache
 
 
 # Table creation queries
@@ -88,7 +140,9 @@ airportstable = """CREATE TABLE IF NOT EXISTS airports (
   IATA CHAR(3),
   name VARCHAR(100) NOT NULL,
   city VARCHAR(100),
-  fuel DECIMAL(10,2) NOT NULL DEFAULT 0.00
+  fuel DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+  lat DECIMAL(9,6),
+  lon DECIMAL(9,6)
 )"""
 
 routestable = """CREATE TABLE IF NOT EXISTS routes (
@@ -144,10 +198,84 @@ accountstable = """CREATE TABLE IF NOT EXISTS accounts (
 )"""
 # key is index for faster searches on the username column
 # AUTO_INCREMENT for unique IDs
+
+# One row per write, so other clients can fetch only what changed since their last version
+# pk NULL means many rows of the table changed at once (op 'reset'), origin is the writer's CONNECTION_ID()
+changelogtable = """CREATE TABLE IF NOT EXISTS changelog (
+  version BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  tbl VARCHAR(20) NOT NULL,
+  pk VARCHAR(64),
+  op ENUM('insert','update','delete','reset') NOT NULL,
+  origin BIGINT UNSIGNED,
+  changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_changelog_changed_at (changed_at)
+)"""
+
+# Who changed what, appended in batches by auditlog.AuditLog and never updated
+# (col is set for cell updates, old/new values are text, rows as JSON)
+audittable = """CREATE TABLE IF NOT EXISTS audit (
+  audit_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  at DATETIME(3) NOT NULL,
+  account_id INT,
+  username VARCHAR(64),
+  tbl VARCHAR(20) NOT NULL,
+  pk VARCHAR(64),
+  op ENUM('insert','update','delete','reset') NOT NULL,
+  col VARCHAR(64),
+  old_value TEXT,
+  new_value TEXT,
+  KEY idx_audit_at (at),
+  KEY idx_audit_row (tbl, pk)
+)"""
 # Create referenced tables first (airports must exist before aircraft which
 # has a FK to airports). Order matters for MySQL foreign key creation.
 tablecreator = [airportstable, aircrafttable, routestable,
-                flightstable, maintenancetable, accountstable]
+                flightstable, maintenancetable, accountstable, changelogtable, audittable]
+
+# Extra single-column indexes so ORDER BY on the commonly sorted columns can read an index
+# instead of sorting the whole table. Created by database.ensure_indexes when missing.
+# (foreign key columns such as routes.dep or flights.flight already have an index)
+indexes = {'idx_aircraft_model': ('aircraft', 'model'),
+           'idx_aircraft_status': ('aircraft', 'status'),
+           'idx_aircraft_range': ('aircraft', 'range_nm'),
+           'idx_aircraft_hours': ('aircraft', 'hours_flown'),
+           'idx_aircraft_age': ('aircraft', 'age'),
+           'idx_airports_name': ('airports', 'name'),
+           'idx_airports_fuel': ('airports', 'fuel'),
+           'idx_routes_dist': ('routes', 'dist'),
+           'idx_routes_gcd': ('routes', 'greatcircledist'),
+           'idx_flights_arrt': ('flights', 'arrt'),
+           'idx_flights_status': ('flights', 'status'),
+           'idx_flights_reg_dept': ('flights', 'reg_no, dept'),  # an aircraft's flights around a time
+           'idx_flights_reg_status_dept': ('flights', 'reg_no, status, dept'),  # last flight of each aircraft
+           'idx_maintenance_status': ('maintenance', 'status')}
+
+# Columns added after the first release, added by database.ensure_columns to older databases
+added_columns = {('airports', 'lat'): 'DECIMAL(9,6)',
+                 ('airports', 'lon'): 'DECIMAL(9,6)'}
+# Numeric columns that may be NULL: a blank value (Add Row, CSV import) is stored as NULL, not as 0
+nullable_numbers = {'aircraft': ('msn', 'capacity', 'range_nm', 'age'),
+                    'airports': ('lat', 'lon'),
+                    'routes': ('dist', 'greatcircledist', 'time')}
+
+# Tables with more rows than this are sorted by the server and loaded one page at a time
+server_sort_threshold = 50_000
+page_size = 2_000  # rows per page when a table is loaded in pages
+bulk_chunk_rows = 1_000  # primary keys per IN (...) list in bulk deletes and updates
+
+# Change log polling (see changefeed)
+poll_ms = 2_000  # how often each client asks for other clients' changes
+changelog_batch = 5_000  # change log rows read per poll
+changelog_gap_s = 30  # how long to wait for a skipped version (a transaction still committing)
+changelog_keep_days = 7  # older change log rows are deleted at startup
+
+# Audit log writer (see auditlog)
+audit_flush_ms = 1_000  # queued audit entries are written at least this often
+audit_batch = 500  # entries per INSERT
+audit_max_pending = 50_000  # entries kept while the database can't be reached, oldest dropped first
+# Child tables whose rows the database changes through ON DELETE/UPDATE CASCADE or SET NULL
+cascades = {'airports': ['aircraft', 'routes', 'flights'], 'routes': ['flights'],
+            'aircraft': ['flights', 'maintenance']}
 
 primarykeys = {"aircraft": "reg_no", "airports": "ICAO",
                "routes": "flight", "flights": "flightnumber", "maintenance": "record_id", "accounts": "account_id"}
@@ -155,7 +283,8 @@ primarykeys = {"aircraft": "reg_no", "airports": "ICAO",
 # List of columns in each table
 aircraft_columns = ['reg_no', 'model', 'engine', 'msn', 'capacity',
                     'range_nm', 'status', 'loc', 'hours_flown', 'age', 'last_maintenance']
-airports_columns = ['ICAO', 'IATA', 'name', 'city', 'fuel']
+airports_columns = ['ICAO', 'IATA', 'name', 'city', 'fuel', 'lat', 'lon']
+airports_columns_nocoords = airports_columns[:5]  # airports CSVs from before coordinates, still importable
 routes_columns = ['flight', 'dep', 'arr', 'dist',
                   'greatcircledist', 'time', 'dept', 'arrt']
 flights_columns = ['flightnumber', 'flight',
@@ -168,12 +297,23 @@ accounts_columns_auto = ["username", "passwd",
                          "role", "standing", "creation_date", "last_login"]
 columns = [aircraft_columns, airports_columns,
            routes_columns, flights_columns, maintenance_columns, accounts_columns]
+tables = ['aircraft', 'airports', 'routes', 'flights', 'maintenance', 'accounts']  # same order as columns
+
+# Column projection for the grid: hidden columns are never fetched for viewing,
+# lazy (wide/TEXT) columns are fetched as a short preview and in full only when a cell is opened
+hidden_columns = {'accounts': ['passwd']}
+lazy_columns = {'maintenance': ['descr']}
+preview_chars = 60  # characters of a lazy column fetched for the grid
+
+
+def view_columns(table):  # columns the grid shows for a table
+    return [c for c in columns[tables.index(table)] if c not in hidden_columns.get(table, [])]
 
 
 # Titles for each column in each table
 aircraft_titles = ["Registration", "Aircraft Model", "Engine", "MSN", "Capacity",
                    "Range(NM)", "Status", "Location", "Hours Flown", "Age(Years)", "Last Maintenance"]
-airports_titles = ["ICAO code", "IATA code", "Name", "City", "Fuel Cost"]
+airports_titles = ["ICAO code", "IATA code", "Name", "City", "Fuel Cost", "Latitude", "Longitude"]
 routes_titles = ["Flight", "From", "To",
                  "Distance (NM)", "Great Circle Distance (NM)", "Time (min)", "Departure Time", "Arrival Time"]
 flights_titles = ["Flight No.", "Flight", "Registration",
@@ -207,6 +347,8 @@ column_widths = {  # some columns are wider than others so they need different w
                  'name': 120,  # Name
                  'city': 200,  # City
                  'fuel': 120,  # Fuel Cost
+                 'lat': 90,  # latitude
+                 'lon': 90,  # longitude
 
     # routes table
                  'flight': 120,  # flight
@@ -261,7 +403,9 @@ dtypes = {
         ('entry',),                            # iata
         ('entry',),                            # name
         ('entry',),                            # city
-        ('spinbox', (0, 1000000))              # fuel (stored units)
+        ('spinbox', (0, 1000000)),             # fuel (stored units)
+        ('entry',),                            # lat (degrees, north positive)
+        ('entry',)                             # lon (degrees, east positive)
     ],
 
     'routes': [
@@ -303,19 +447,49 @@ dtypes = {
     ]
 }
 
+# SQL type of every column, used to check filter values before they are sent to the server
+# int, decimal, text, enum, date, datetime or time (MySQL TIME, returned as timedelta)
+column_types = {
+    'aircraft': {'reg_no': 'text', 'model': 'text', 'engine': 'text', 'msn': 'int', 'capacity': 'int',
+                 'range_nm': 'int', 'status': 'enum', 'loc': 'text', 'hours_flown': 'int', 'age': 'decimal',
+                 'last_maintenance': 'datetime'},
+    'airports': {'ICAO': 'text', 'IATA': 'text', 'name': 'text', 'city': 'text', 'fuel': 'decimal',
+                 'lat': 'decimal', 'lon': 'decimal'},
+    'routes': {'flight': 'text', 'dep': 'text', 'arr': 'text', 'dist': 'decimal', 'greatcircledist': 'decimal',
+               'time': 'int', 'dept': 'time', 'arrt': 'time'},
+    'flights': {'flightnumber': 'int', 'flight': 'text', 'reg_no': 'text', 'dept': 'datetime',
+                'arrt': 'datetime', 'status': 'enum', 'dep': 'text', 'arr': 'text'},
+    'maintenance': {'record_id': 'int', 'reg_no': 'text', 'date': 'datetime', 'descr': 'text', 'status': 'enum'},
+    'accounts': {'account_id': 'int', 'username': 'text', 'passwd': 'text', 'role': 'enum', 'standing': 'enum',
+                 'creation_date': 'date', 'last_login': 'datetime'}
+}
+
+# Allowed values of the ENUM columns (same as the table definitions above)
+enum_values = {
+    ('aircraft', 'status'): ('ACTV', 'MAINT', 'PRKD', 'GRND'),
+    ('flights', 'status'): ('Planned', 'In-Flight', 'Completed', 'Cancelled'),
+    ('maintenance', 'status'): ('Pending', 'Completed'),
+    ('accounts', 'role'): ('ADMIN', 'STAFF', 'GUEST'),
+    ('accounts', 'standing'): ('ACTV', 'SUSPD')
+}
+
 # The filterslist dictionary contains filter configurations for each filterable field across different tables.
 # Each filter configuration includes the table name, column name, operation, input type, title, and additional options if applicable.
 # Format: 'filter_name': {'table': 'table_name', 'column': 'column_name', 'op': 'operator', 'type': 'input_type', 'title': 'Display Title', 'options': (optional, for dropdowns)}
+# Operators: '=', '>=', '<=', '<', '>', 'between' (input type 'range', two values),
+# 'in' (input type 'list', comma separated values) and 'prefix' (starts with, LIKE 'x%')
 filterslist = {
     # Aircraft Filters
     "aircraft": {"table": "aircraft", "column": "reg_no", "op": "=", 'type': 'text', 'title': 'Aircraft'},
     "aircraft_model": {"table": "aircraft", "column": "model", "op": "=", 'type': 'text', 'title': 'Aircraft Model'},
+    "aircraft_model_prefix": {"table": "aircraft", "column": "model", "op": "prefix", 'type': 'text', 'title': 'Model Starts With'},
     "aircraft_engine": {"table": "aircraft", "column": "engine", "op": "=", 'type': 'text', 'title': 'Aircraft Engine'},
-    "aircraft_msn": {"table": "aircraft", "column": "msn", "op": "=", 'type': 'text', 'title': 'Aircraft MSN'},
+    "aircraft_msn": {"table": "aircraft", "column": "msn", "op": "=", 'type': 'num', 'title': 'Aircraft MSN'},
     "capacity_min": {"table": "aircraft", "column": "capacity", "op": ">=", 'type': 'num', 'title': 'Minimum Capacity'},
     "capacity_max": {"table": "aircraft", "column": "capacity", "op": "<=", 'type': 'num', 'title': 'Maximum Capacity'},
     "aircraft_status": {"table": "aircraft", "column": "status", "op": "=", 'type': 'dropdown', 'title': 'Aircraft Status', 'options': ('ACTV', 'MAINT', 'PRKD', 'GRND')},
     "current_location": {"table": "aircraft", "column": "loc", "op": "=", 'type': 'text', 'title': 'Current Location'},
+    "current_location_in": {"table": "aircraft", "column": "loc", "op": "in", 'type': 'list', 'title': 'Located At (comma separated)'},
     "hours_flown_min": {"table": "aircraft", "column": "hours_flown", "op": ">=", 'type': 'num', 'title': 'Minimum Hours Flown'},
     "hours_flown_max": {"table": "aircraft", "column": "hours_flown", "op": "<=", 'type': 'num', 'title': 'Maximum Hours Flown'},
     "range_min": {"table": "aircraft", "column": "range_nm", "op": ">=", 'type': 'num', 'title': 'Minimum Range'},
@@ -331,33 +505,39 @@ filterslist = {
     "fuel_cost_max": {"table": "airports", "column": "fuel", "op": "<=", 'type': 'num', 'title': 'Maximum Fuel Cost'},
 
     # Flight Filters
-    "flight_id": {"table": "flights", "column": "flightnumber", "op": "=", 'type': 'text', 'title': 'Flight ID'},
+    "flight_id": {"table": "flights", "column": "flightnumber", "op": "=", 'type': 'num', 'title': 'Flight ID'},
     "flight_no": {"table": "flights", "column": "flight", "op": "=", 'type': 'text', 'title': 'Flight No.'},
     "assigned_aircraft": {"table": "flights", "column": "reg_no", "op": "=", 'type': 'text', 'title': 'Assigned Aircraft'},
-    "dept_after": {"table": "flights", "column": "dept", "op": ">=", 'type': 'num', 'title': 'Departure After'},
-    "dept_before": {"table": "flights", "column": "dept", "op": "<=", 'type': 'num', 'title': 'Departure Before'},
-    "flight_status": {"table": "flights", "column": "status", "op": "=", 'type': 'dropdown', 'title': 'Flight Status', 'options': ('On-Time', 'Delayed', 'Cancelled')},
-    "dep_airport": {"table": "routes", "column": "dep", "op": "=", 'type': 'text', 'title': 'Departure Airport'},
-    "arr_airport": {"table": "routes", "column": "arr", "op": "=", 'type': 'text', 'title': 'Arrival Airport'},
+    "dept_after": {"table": "flights", "column": "dept", "op": ">=", 'type': 'date', 'title': 'Departure After (YYYY-MM-DD HH:MM)'},
+    "dept_before": {"table": "flights", "column": "dept", "op": "<=", 'type': 'date', 'title': 'Departure Before (YYYY-MM-DD HH:MM)'},
+    "dept_between": {"table": "flights", "column": "dept", "op": "between", 'type': 'range', 'title': 'Departure Between'},
+    "flight_status": {"table": "flights", "column": "status", "op": "=", 'type': 'dropdown', 'title': 'Flight Status', 'options': ('Planned', 'In-Flight', 'Completed', 'Cancelled')},
+    "dep_airport": {"table": "flights", "column": "dep", "op": "=", 'type': 'text', 'title': 'Departure Airport'},
+    "dep_airport_in": {"table": "flights", "column": "dep", "op": "in", 'type': 'list', 'title': 'Departure Airports (comma separated)'},
+    "arr_airport": {"table": "flights", "column": "arr", "op": "=", 'type': 'text', 'title': 'Arrival Airport'},
 
 
     # Route Filters
     "route_flight": {"table": "routes", "column": "flight", "op": "=", 'type': 'text', 'title': 'Flight'},
+    "route_flight_prefix": {"table": "routes", "column": "flight", "op": "prefix", 'type': 'text', 'title': 'Flight Starts With'},
     "route_dep": {"table": "routes", "column": "dep", "op": "=", 'type': 'text', 'title': 'Departure Airport'},
+    "route_dep_in": {"table": "routes", "column": "dep", "op": "in", 'type': 'list', 'title': 'Departure Airports (comma separated)'},
     "route_arr": {"table": "routes", "column": "arr", "op": "=", 'type': 'text', 'title': 'Arrival Airport'},
+    "route_arr_in": {"table": "routes", "column": "arr", "op": "in", 'type': 'list', 'title': 'Arrival Airports (comma separated)'},
     "route_dist_min": {"table": "routes", "column": "dist", "op": ">=", 'type': 'num', 'title': 'Minimium Distance'},
     "route_dist_max": {"table": "routes", "column": "dist", "op": "<=", 'type': 'num', 'title': 'Maximum Distance'},
-    "route_great_circle_dist_min": {"table": "routes", "column": "greatcircledist", "op": "=", 'type': 'num', 'title': 'Great Circle Distance'},
+    "route_great_circle_dist_min": {"table": "routes", "column": "greatcircledist", "op": ">=", 'type': 'num', 'title': 'Minimum Great Circle Distance'},
     "route_great_circle_dist_max": {"table": "routes", "column": "greatcircledist", "op": "<=", 'type': 'num', 'title': 'Maximum Great Circle Distance'},
     "route_time_max": {"table": "routes", "column": "time", "op": "<=", 'type': 'num', 'title': 'Maximum Time'},
 
     # Maintenance Filters
-    "maint_record_id": {"table": "maintenance", "column": "record_id", "op": "=", 'type': 'text', 'title': 'Record ID'},
+    "maint_record_id": {"table": "maintenance", "column": "record_id", "op": "=", 'type': 'num', 'title': 'Record ID'},
     "maint_registration": {"table": "maintenance", "column": "reg_no", "op": "=", 'type': 'text', 'title': 'Registration'},
-    "maint_date": {"table": "maintenance", "column": "date", "op": "=", 'type': 'text', 'title': 'Date'},
+    "maint_date": {"table": "maintenance", "column": "date", "op": "=", 'type': 'date', 'title': 'Date (YYYY-MM-DD)'},
     "maint_description": {"table": "maintenance", "column": "descr", "op": "=", 'type': 'text', 'title': 'Description'},
     "maint_status": {"table": "maintenance", "column": "status", "op": "=", 'type': 'dropdown', 'title': 'Aircraft Status', 'options': ('Pending', 'Completed')},
-    "maint_after": {"table": "maintenance", "column": "date", "op": ">=", 'type': 'text', 'title': 'Maintenance After'},
-    "maint_before": {"table": "maintenance", "column": "date", "op": "<=", 'type': 'text', 'title': 'Maintenance Before'},
+    "maint_after": {"table": "maintenance", "column": "date", "op": ">=", 'type': 'date', 'title': 'Maintenance After (YYYY-MM-DD)'},
+    "maint_before": {"table": "maintenance", "column": "date", "op": "<=", 'type': 'date', 'title': 'Maintenance Before (YYYY-MM-DD)'},
+    "maint_between": {"table": "maintenance", "column": "date", "op": "between", 'type': 'range', 'title': 'Maintenance Between'},
     "maint_aircraft": {"table": "maintenance", "column": "reg_no", "op": "=", 'type': 'text', 'title': 'Aircraft'}
 }
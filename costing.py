@@ -0,0 +1,81 @@
+# imports
+import constants as C
+
+# Fuel cost estimates for flights and routes.
+# cost = distance (nm) x fuel burn (kg per nm, grows with the aircraft's seats) x fuel price at the
+# departure airport (airports.fuel, per C.fuel_price_unit_kg kg). The whole schedule is costed in
+# one pass over NumPy arrays (per flight, then summed per tail); anything unknown (no distance,
+# no price) gives NaN and is counted, not guessed. Without NumPy the same formula runs in a loop.
+# route_weights/CheaperChoice turn the same estimate into the planner's choice of route:
+# a cheaper route is proportionally more likely to be picked, instead of a uniform random choice.
+
+
+def fuel_cost(dist, capacity, price):  # sequences -> cost per position (NaN where unknown)
+    try:
+        import numpy as np
+    except ImportError:
+        return [fuel_cost_one(d, c, p) for d, c, p in zip(dist, capacity, price)]
+    dist, capacity, price = (np.array(x, dtype=np.float64) for x in (dist, capacity, price))  # None -> NaN
+    burn = C.fuel_burn_kg_per_nm + C.fuel_burn_kg_per_nm_seat * capacity
+    return dist * burn * price / C.fuel_price_unit_kg
+
+
+def fuel_cost_one(dist, capacity, price):
+    if dist is None or capacity is None or price is None:
+        return float('nan')
+    burn = C.fuel_burn_kg_per_nm + C.fuel_burn_kg_per_nm_seat * float(capacity)
+    return float(dist) * burn * float(price) / C.fuel_price_unit_kg
+
+
+def schedule_costs(rows):
+    # rows: [(flightnumber, reg_no, dist, capacity, fuel price)]
+    # -> {'costs': cost per row, 'per_tail': {reg_no: (flights, cost)}, 'total': cost, 'unknown': rows not costed}
+    if not rows:
+        return {'costs': [], 'per_tail': {}, 'total': 0.0, 'unknown': 0}
+    numbers, tails, dist, capacity, price = zip(*rows)
+    costs = fuel_cost(dist, capacity, price)
+    try:
+        import numpy as np
+    except ImportError:
+        per_tail = {}
+        for reg_no, cost in zip(tails, costs):
+            flights, total = per_tail.get(reg_no, (0, 0.0))
+            per_tail[reg_no] = (flights + 1, total + (0.0 if cost != cost else cost))
+        known = [cost for cost in costs if cost == cost]
+        return {'costs': costs, 'per_tail': per_tail, 'total': sum(known), 'unknown': len(costs) - len(known)}
+    known = ~np.isnan(costs)
+    index = {}  # reg_no -> position in the per tail sums
+    which = np.array([index.setdefault(reg_no, len(index)) for reg_no in tails])
+    regs = list(index)
+    flights = np.bincount(which, minlength=len(regs))
+    totals = np.bincount(which, weights=np.where(known, costs, 0.0), minlength=len(regs))
+    return {'costs': costs,
+            'per_tail': {reg_no: (int(n), float(total)) for reg_no, n, total in zip(regs, flights, totals)},
+            'total': float(totals.sum()),
+            'unknown': int((~known).sum())}
+
+
+def route_weights(routes, prices, weight=C.cost_weight):
+    # routes: [(flight, dep, arr, dist, greatcircledist, dept, arrt)]; prices: {ICAO: fuel price}
+    # -> {flight: choice weight}, (average cost / route cost) ** weight; unknown costs weigh 1
+    # The aircraft's own burn is the same for every route it could take, so it doesn't change the odds.
+    if not routes:
+        return {}
+    flights = [route[0] for route in routes]
+    costs = fuel_cost([route[3] or route[4] for route in routes], [0] * len(routes),
+                      [prices.get(route[1]) for route in routes])
+    known = [cost for cost in costs if cost == cost and cost > 0]
+    if not known:
+        return {}
+    average = sum(known) / len(known)
+    return {flight: (average / cost) ** weight for flight, cost in zip(flights, costs)
+            if cost == cost and cost > 0}
+
+
+class CheaperChoice:  # choose() for planner.plan, picklable so scenarios can run in worker processes
+    def __init__(self, weights, rng):
+        self.weights = weights
+        self.rng = rng
+
+    def __call__(self, candidates, reg_no):
+        return self.rng.choices(candidates, [self.weights.get(route.flight, 1.0) for route in candidates])[0]
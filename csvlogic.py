@@ -1,6 +1,7 @@
 # imports
 import csv
 import constants as C
+from tracing import span
 
 
 class CSVmanager:
@@ -9,7 +10,7 @@ class CSVmanager:
 
     def loadcsv(self, filename):
         # Read CSV with a tolerant mode (strip headers, case-insensitive match)
-        with open(filename, 'r', newline='', encoding='utf-8') as file:
+        with span('csv.parse', 'csv'), open(filename, 'r', newline='', encoding='utf-8') as file:
             reader = csv.reader(file, delimiter=self.delimiter)
             data = list(reader)
 
@@ -26,6 +27,10 @@ class CSVmanager:
             tablename = 'aircraft'
         elif cols_match(C.airports_columns):
             tablename = 'airports'
+        elif cols_match(C.airports_columns_nocoords):  # older export, coordinates left empty
+            tablename = 'airports'
+            missing = len(C.airports_columns) - len(header)
+            data = [C.airports_columns] + [row + [None] * missing for row in data[1:]]
         elif cols_match(C.routes_columns):
             tablename = 'routes'
         elif cols_match(C.flights_columns):
@@ -38,7 +43,7 @@ class CSVmanager:
         return data, tablename
 
     def savecsv(self, filename, rows, columns):
-        with open(filename, 'w') as file:
+        with span('csv.write', 'csv', rows=len(rows)), open(filename, 'w') as file:
             writer = csv.writer(
                 file, delimiter=',')  # write CSV file
             writer.writerow(columns)  # write header
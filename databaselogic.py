@@ -1,15 +1,35 @@
 # imports
 import mysql.connector
 import constants as C
+import filterexpr
 import hashlib
+import json
+import time
 from datetime import datetime, timedelta
-from random import choice
+from querylog import QueryStats, statement_shape
+from tracing import span
+from auditlog import AuditLog
+import planner
+import conflicts
+import geodesy
+import distmatrix
+import spatial
+import routegraph
+import costing
 
 
 class database:
-    def __init__(self, host=C.host, user=C.user, passwd=C.passwd, charset=C.charset):
+    def __init__(self, host=C.host, user=C.user, passwd=C.passwd, charset=C.charset, slow_query_ms=C.slow_query_ms):
         # self.mydb = sqlite3.connect(self.db_path) for SQlite only
         self.cursor = None
+        self.stats = QueryStats(slow_query_ms)  # per-statement timings and slow query log
+        self.params = (host, user, passwd, charset, slow_query_ms)  # to open more connections like this one
+        self.user = None  # UserAccount logged in, recorded in the audit log
+        self.auditor = None  # AuditLog writer, see start_audit
+        self.audit_entries = []  # audit entries of the open transaction, handed over on commit
+        self.distances = None  # distmatrix.DistanceMatrix of the airports, see distance_matrix
+        self.graph = None  # routegraph.RouteGraph of the routes, see route_graph
+        self.spatial = (None, None)  # (content hash, spatial.AirportIndex) of the airports, see airport_index
         self.mydb = mysql.connector.connect(
             host=host,
             user=user,
@@ -22,25 +42,74 @@ class database:
             # self.mydb.execute("PRAGMA foreign_keys = ON") for SQLite only
             self.cursor = self.mydb.cursor()
 
+    # Every SQL statement goes through here so it can be timed.
+    # fetch: None (returns nothing), 'one' (fetchone) or 'all' (fetchall)
+    # many: run executemany with a list of parameter tuples
+    def execute(self, query, params=(), fetch=None, many=False):
+        start = time.perf_counter()
+        with span('sql', 'db', statement=statement_shape(query)):
+            with span('sql.execute', 'db'):
+                if many:
+                    self.cursor.executemany(query, params)
+                else:
+                    self.cursor.execute(query, params)
+            with span('sql.fetch', 'db') as fetch_span:
+                if fetch == 'all':
+                    result = self.cursor.fetchall()
+                    rows = len(result)
+                elif fetch == 'one':
+                    result = self.cursor.fetchone()
+                    rows = 0 if result is None else 1
+                else:
+                    result = None
+                    rows = self.cursor.rowcount
+                fetch_span.args['rows'] = rows
+        self.stats.record(query, time.perf_counter() - start, rows)
+        return result
+
     def is_db(self):
-        self.cursor.execute("SHOW DATABASES LIKE %s",
-                            (C.database,))
-        result = self.cursor.fetchone()
-        if result:
-            result2 = self.cursor.fetchone()
-        return result is not None and result2 is not None
+        result = self.execute("SHOW DATABASES LIKE %s",
+                              (C.database,), fetch='all')
+        return len(result) >= 2
 
     def accounts_exist(self):
-        self.cursor.execute("SELECT COUNT(*) FROM accounts")
-        result = self.cursor.fetchone()
+        result = self.execute("SELECT COUNT(*) FROM accounts", fetch='one')
         return result[0] > 0
 
     def createtables(self):
-        self.cursor.execute("CREATE DATABASE IF NOT EXISTS " +
-                            C.database)
-        self.cursor.execute("USE " + C.database)
+        self.execute("CREATE DATABASE IF NOT EXISTS " +
+                     C.database)
+        self.execute("USE " + C.database)
         for i in C.tablecreator:
-            self.cursor.execute(i)
+            self.execute(i)
+        self.ensure_schema()
+
+    def ensure_schema(self):  # bring a database created by an older version up to date
+        self.execute(C.changelogtable)
+        self.execute(C.audittable)
+        self.ensure_columns()
+        self.ensure_indexes()
+        self.execute("DELETE FROM changelog WHERE changed_at < NOW() - INTERVAL %s DAY",
+                     (C.changelog_keep_days,))
+        self.mydb.commit()
+
+    def ensure_columns(self):  # add any column from C.added_columns that an older database is missing
+        existing = self.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()",
+            fetch='all')
+        existing = {(table.lower(), column.lower()) for table, column in existing}
+        for (table, column), definition in C.added_columns.items():
+            if (table.lower(), column.lower()) not in existing:
+                self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def ensure_indexes(self):  # add any index from C.indexes that an older database is missing
+        existing = self.execute(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()",
+            fetch='all')
+        existing = {row[0] for row in existing}
+        for name, (table, column) in C.indexes.items():
+            if name not in existing:
+                self.execute(f"CREATE INDEX {name} ON {table} ({column})")
 
     def insert_row(self, table, values):
         # Map table names to their column definitions
@@ -56,128 +125,524 @@ class database:
             raise ValueError(f"Unknown table: {table}")
 
         columns = table_columns[table]
+        blank_null = C.nullable_numbers.get(table, ())
+        values = [None if column in blank_null and isinstance(value, str) and not value.strip() else value
+                  for column, value in zip(columns, values)]
         placeholders = ",".join("%s" for x in columns)
         query = f"INSERT IGNORE INTO {table} ({','.join(columns)}) VALUES ({placeholders})"
         # INSERT IGNORE for MySQL
 
-        self.cursor.execute(query, values)
-        self.mydb.commit()
-
-    def update_cell(self, table, column, newvalue, keyvalue):
+        self.execute(query, values)
+        if self.cursor.rowcount > 0:  # not skipped by IGNORE
+            pk = C.primarykeys[table]
+            given = values[columns.index(pk)] if pk in columns else None
+            key = self.cursor.lastrowid if given in (None, '') else given
+            self.log_changes(table, 'insert', [key])
+            self.audit(table, 'insert', [key], new=[dict(zip(columns, values))])
+        self.commit()
+
+    # old values (optional) are what the caller last saw, they only go to the audit log
+    def update_cell(self, table, column, newvalue, keyvalue, oldvalue=None):
         # 'UPDATE TABLE SET COLUMN = NEWVALUE WHERE PRIMARYKEY = KEYVALUE'
         query = f'UPDATE {table} SET {column} = %s where {C.primarykeys[table]} = %s'
-        self.cursor.execute(query, (newvalue, keyvalue))
-        self.mydb.commit()
+        self.execute(query, (newvalue, keyvalue))
+        self.log_changes(table, 'update', [keyvalue])
+        self.audit(table, 'update', [keyvalue], column, [oldvalue], [newvalue])
+        self.commit()
 
     def update_cell_pk(self, table, pk_column, newvalue, old_pk_value):  # For primary keys ONLY
         query = f'UPDATE {table} SET {pk_column} = %s WHERE {pk_column} = %s'
-        self.cursor.execute(query, (newvalue, old_pk_value))
-        self.mydb.commit()
+        self.execute(query, (newvalue, old_pk_value))
+        self.log_rekey(table, [(old_pk_value, newvalue)])
+        self.audit(table, 'update', [old_pk_value], pk_column, [old_pk_value], [newvalue])
+        self.commit()
 
-    def delete_row(self, table, keyvalue):  # delete row based on primary key value
+    def delete_row(self, table, keyvalue, oldrow=None):  # delete row based on primary key value
         query = f"DELETE FROM {table} WHERE {C.primarykeys[table]} = %s"
-        self.cursor.execute(query, (keyvalue,))
+        self.execute(query, (keyvalue,))
+        self.log_changes(table, 'delete', [keyvalue])
+        self.audit(table, 'delete', [keyvalue], old=[oldrow])
+        self.commit()
+
+    def commit(self):  # commit, then pass the transaction's audit entries to the writer thread
         self.mydb.commit()
+        if self.audit_entries:
+            self.auditor.submit(self.audit_entries)
+            self.audit_entries = []
+
+    def rollback(self):
+        self.mydb.rollback()
+        self.audit_entries = []
+
+    # Audit log: who changed what. One entry per key, with a column for cell updates;
+    # old/new are lists matching keyvalues (a value, a {column: value} row dict, or None if unknown).
+    def audit(self, table, op, keyvalues, column=None, old=None, new=None):
+        if self.auditor is None:
+            return
+        hidden = C.hidden_columns.get(table, [])  # never copy password hashes into the log
+
+        def text(value):
+            if value is None:
+                return None
+            if column in hidden:
+                return '***'
+            if isinstance(value, dict):
+                value = json.dumps({k: '***' if k in hidden else v for k, v in value.items()}, default=str)
+            return str(value)
+        at = datetime.now()
+        account_id, username = (self.user.account_id, self.user.username) if self.user else (None, None)
+        keyvalues = list(keyvalues)
+        old = old or [None] * len(keyvalues)
+        new = new or [None] * len(keyvalues)
+        self.audit_entries += [(at, account_id, username, table, None if k is None else str(k), op, column,
+                                text(o), text(n)) for k, o, n in zip(keyvalues, old, new)]
+
+    def start_audit(self, schema):  # audit entries are written in the background on a second connection
+        def connect():
+            db = database(*self.params)
+            db.connection()
+            db.execute("USE " + schema)
+            return db
+        self.auditor = AuditLog(connect)
+
+    # Change log: every write also records what it changed, in the same transaction,
+    # so other clients can pick up just those rows (see changefeed).
+    def log_changes(self, table, op, keyvalues=(None,)):  # op 'reset' (key None): reload the whole table
+        keyvalues = list(keyvalues)
+        if not keyvalues:
+            return
+        if table == 'routes':
+            self.graph = None  # rebuilt from the new routes when next asked for
+        self.execute("INSERT INTO changelog (tbl, pk, op, origin) VALUES (%s, %s, %s, CONNECTION_ID())",
+                     [(table, None if k is None else str(k), op) for k in keyvalues], many=True)
+        if op == 'delete':  # rows in other tables went with them (or lost their reference)
+            for child in C.cascades.get(table, []):
+                self.log_changes(child, 'reset')
+
+    def log_rekey(self, table, changes):  # primary keys changed: [(old key, new key)]
+        self.log_changes(table, 'delete', [old for old, new in changes])
+        self.log_changes(table, 'insert', [new for old, new in changes])
+
+    def connection_id(self):
+        return self.execute("SELECT CONNECTION_ID()", fetch='one')[0]
+
+    def change_version(self):  # latest change log version
+        return self.execute("SELECT COALESCE(MAX(version), 0) FROM changelog", fetch='one')[0]
+
+    def changes_since(self, version, limit=C.changelog_batch):  # -> [(version, table, pk, op, origin)]
+        if not self.audit_entries:  # nothing written and not yet committed: end the read snapshot, or rows
+            self.mydb.rollback()  # committed since stay invisible; rollback, so it can never commit anything
+        return self.execute("SELECT version, tbl, pk, op, origin FROM changelog WHERE version > %s "
+                            "ORDER BY version LIMIT %s", (version, int(limit)), fetch='all')
+
+    def fetch_rows(self, table, keyvalues, filters, valuelist, columns=None):
+        # rows with these primary keys that also pass the filters
+        keyvalues = list(keyvalues)
+        constraints, values = self.filter_table(filters, valuelist)
+        rows = []
+        for start in range(0, len(keyvalues), C.bulk_chunk_rows):
+            chunk = keyvalues[start:start + C.bulk_chunk_rows]
+            query = (f"SELECT {self.select_list(table, columns)} FROM {table} "
+                     f"WHERE {C.primarykeys[table]} IN ({','.join(['%s'] * len(chunk))}){constraints}")
+            rows += self.execute(query, (*chunk, *values), fetch='all')
+        return rows
+
+    # Bulk changes to many rows picked by primary key, as WHERE pk IN (...) statements of at most
+    # C.bulk_chunk_rows keys each, all in one transaction. Returns the number of rows changed.
+    def delete_rows(self, table, keyvalues, oldrows=None):
+        keyvalues = list(keyvalues)
+        self.audit(table, 'delete', keyvalues, old=oldrows)
+        return self.bulk(f"DELETE FROM {table}", (), table, keyvalues)
+
+    def update_rows(self, table, column, newvalue, keyvalues, oldvalues=None):
+        keyvalues = list(keyvalues)
+        self.audit(table, 'update', keyvalues, column, oldvalues, [newvalue] * len(keyvalues))
+        return self.bulk(f"UPDATE {table} SET {column} = %s", (newvalue,), table, keyvalues)
+
+    def bulk(self, statement, params, table, keyvalues):
+        keyvalues = list(keyvalues)
+        changed = 0
+        try:
+            for start in range(0, len(keyvalues), C.bulk_chunk_rows):
+                chunk = keyvalues[start:start + C.bulk_chunk_rows]
+                query = f"{statement} WHERE {C.primarykeys[table]} IN ({','.join(['%s'] * len(chunk))})"
+                self.execute(query, (*params, *chunk))
+                changed += self.cursor.rowcount
+            self.log_changes(table, 'delete' if statement.startswith("DELETE") else 'update', keyvalues)
+            self.commit()
+        except Exception:
+            self.rollback()  # all or nothing
+            raise
+        return changed
+
+    def apply_edits(self, table, rows):
+        # Buffered cell edits, written in one transaction.
+        # rows: {row id: (primary key, {column: (value when loaded, new value)})}
+        # A row is only written if none of its edited cells changed in the database since it was
+        # loaded; returns {row id: reason} for the rows that weren't written.
+        pk = C.primarykeys[table]
+        columns = sorted({column for key, changes in rows.values() for column in changes})
+        keys = [key for key, changes in rows.values()]
+        conflicts = {}
+        try:
+            current = {}
+            for start in range(0, len(keys), C.bulk_chunk_rows):  # lock the rows while checking them
+                chunk = keys[start:start + C.bulk_chunk_rows]
+                result = self.execute(f"SELECT {pk}, {','.join(columns)} FROM {table} "
+                                      f"WHERE {pk} IN ({','.join(['%s'] * len(chunk))}) FOR UPDATE",
+                                      chunk, fetch='all')
+                current.update({str(r[0]): dict(zip(columns, r[1:])) for r in result})
+            groups = {}  # edited columns -> parameter rows, one executemany each
+            for row_id, (key, changes) in rows.items():
+                stored = current.get(str(key))
+                if stored is None:
+                    conflicts[row_id] = "row was deleted"
+                    continue
+                changed = [c for c, (old, new) in changes.items() if not same_value(stored[c], old)]
+                if changed:
+                    conflicts[row_id] = f"{', '.join(changed)} changed to {', '.join(str(stored[c]) for c in changed)}"
+                    continue
+                edited = tuple(sorted(changes))
+                groups.setdefault(edited, []).append((*(changes[c][1] for c in edited), key))
+            for edited, params in groups.items():
+                self.execute(f"UPDATE {table} SET {', '.join(f'{c} = %s' for c in edited)} WHERE {pk} = %s",
+                             params, many=True)
+                if pk in edited:
+                    self.log_rekey(table, [(p[-1], p[edited.index(pk)]) for p in params])
+                else:
+                    self.log_changes(table, 'update', [p[-1] for p in params])
+            for row_id, (key, changes) in rows.items():
+                if row_id not in conflicts:
+                    for column, (old, new) in changes.items():
+                        self.audit(table, 'update', [key], column, [old], [new])
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return conflicts
 
     def filter_table(self, filters, valuelist):
         # Creates a list of filters that contain pieces of the SQL queries
         # Returns [AND (TABLE.COLUMN) OPERATOR (USERSPECIFIEDVALUE)] for each constraint
-        constraints = ""
-        values = []
-        for i in range(len(filters)):
-            column = C.filterslist[filters[i]]["column"]
-            operator = C.filterslist[filters[i]]["op"]
-            constraints += f" AND {column} {operator} %s"
-            values.append(valuelist[i])
-        return constraints, values
-
-    def fetch_data(self, table, filters, valuelist):
+        # Values are checked and converted to the column's type first (filterexpr.FilterError if they don't fit)
+        return filterexpr.to_sql(filterexpr.build_all(filters, valuelist))
+
+    def select_list(self, table, columns):  # SELECT clause for a column projection (None = every column)
+        if columns is None:
+            return "*"
+        table_columns = C.columns[C.tables.index(table)]
+        selected = []
+        for column in columns:
+            if column not in table_columns:
+                raise ValueError(f"Unknown column: {column}")
+            if column in C.lazy_columns.get(table, []):  # only a preview, full text from fetch_cell
+                selected.append(f"LEFT({column}, {C.preview_chars}) AS {column}")
+            else:
+                selected.append(column)
+        return ", ".join(selected)
+
+    def fetch_data(self, table, filters, valuelist, columns=None):
         constraints, values = self.filter_table(filters, valuelist)
-        query = f"SELECT * FROM {table} WHERE 1=1{constraints}"
-        self.cursor.execute(query, values)
-        rows = self.cursor.fetchall()
+        query = f"SELECT {self.select_list(table, columns)} FROM {table} WHERE 1=1{constraints}"
+        rows = self.execute(query, values, fetch='all')
         return rows
 
-    def plan_flights(self, days_ahead=14):
-        # Get the location of each aircraft
-        self.cursor.execute(
-            "SELECT reg_no, loc FROM aircraft WHERE status='ACTV'")
-        aircraft_locations = dict(self.cursor.fetchall())
-
-        # Get the range of each aircraft
-        self.cursor.execute(
-            "SELECT reg_no, range_nm FROM aircraft WHERE status='ACTV'")
-        aircraft_ranges = dict(self.cursor.fetchall())
-
-        next_positions = aircraft_locations.copy()
-        used_routes = set()
-        for day in range(days_ahead):
-            base_date = datetime.now().date() + timedelta(days=day)
-            # For each aircraft, find potential routes it can take based on its current location and range
-            for reg_no, current_loc in next_positions.items():
-                potential_aircraft_assignments_query = (
-                    """
-                    SELECT flight, dep, arr, dept, arrt 
-                    FROM routes 
-                    WHERE dep=%s AND dist<%s 
-                    ORDER BY greatcircledist ASC
-                    """
-                )
-                self.cursor.execute(
-                    potential_aircraft_assignments_query, (current_loc, aircraft_ranges.get(reg_no, 0)))
-                routes = self.cursor.fetchall()
-
-                if not routes:
-                    continue  # No assignments possible for this aircraft
-                # Filter out used routes
-                potential_assignments = [assignment for assignment in routes if (
-                    assignment[0], base_date) not in used_routes]
-                if not potential_assignments:
-                    continue  # No assignments possible for this aircraft
-
-                flight, dep, arr, dept, arrt = choice(
-                    potential_assignments)  # Unpacking results
-
-                # Safely parse times — skip route if any time is missing
-                if not dept or not arrt:
-                    continue
+    def fetch_cell(self, table, column, keyvalue):  # full value of one cell (for lazy columns)
+        if column not in C.columns[C.tables.index(table)]:
+            raise ValueError(f"Unknown column: {column}")
+        row = self.execute(f"SELECT {column} FROM {table} WHERE {C.primarykeys[table]} = %s",
+                           (keyvalue,), fetch='one')
+        return None if row is None else row[0]
 
-                # Try to parse dept/arrt into datetimes if they are strings
-                try:
-                    dept_time = datetime.combine(
-                        base_date, datetime.strptime(str(dept), "%H:%M:%S").time())
-                    arr_time = datetime.combine(
-                        base_date, datetime.strptime(str(arrt), "%H:%M:%S").time())
-                    # If flight is overnight, adjust arrival time
-                except ValueError:
-                    continue
-                if arr_time <= dept_time:
-                    arr_time += timedelta(days=1)
-
-                # Insert the new flight into the flights table
-                insert_flight_query = (
-                    '''
-                    INSERT INTO flights (flight, reg_no, dept, arrt, status, dep, arr) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    '''
-                )
-                # Use a status value that matches the flights.status ENUM in constants
-                # flights.status ENUM: ('Planned','In-Flight','Completed','Cancelled')
-                self.cursor.execute(
-                    insert_flight_query, (flight, reg_no,
-                                          dept_time, arr_time, "Planned", dep, arr)
-                )
-                # Update the aircraft's next location
-                next_positions[reg_no] = arr
-                # Mark this route as used
-                used_routes.add((flight, base_date))
-        self.mydb.commit()
+    def count_rows(self, table, filters, valuelist):
+        constraints, values = self.filter_table(filters, valuelist)
+        return self.execute(f"SELECT COUNT(*) FROM {table} WHERE 1=1{constraints}", values, fetch='one')[0]
+
+    # One page of rows in ORDER BY column, primary key order (keyset pagination).
+    # after is the (column value, primary key) of the last row of the previous page, or None for the first page.
+    def fetch_page(self, table, filters, valuelist, order_by, descending=False, after=None, limit=C.page_size,
+                   columns=None):
+        if order_by not in C.columns[C.tables.index(table)]:
+            raise ValueError(f"Unknown column: {order_by}")
+        pk = C.primarykeys[table]
+        constraints, values = self.filter_table(filters, valuelist)
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            last, last_pk = after
+            if order_by == pk:
+                constraints += f" AND {pk} {'<' if descending else '>'} %s"
+                values.append(last_pk)
+            elif last is None:  # MySQL sorts NULLs first when ascending, last when descending
+                constraints += (f" AND {order_by} IS NULL AND {pk} < %s" if descending else
+                                f" AND ({order_by} IS NOT NULL OR {pk} > %s)")
+                values.append(last_pk)
+            else:
+                op = '<' if descending else '>'
+                constraints += f" AND ({order_by} {op} %s OR ({order_by} = %s AND {pk} {op} %s)"
+                constraints += f" OR {order_by} IS NULL)" if descending else ")"
+                values += [last, last, last_pk]
+        order = f"{order_by} {direction}" if order_by == pk else f"{order_by} {direction}, {pk} {direction}"
+        query = (f"SELECT {self.select_list(table, columns)} FROM {table} WHERE 1=1{constraints} "
+                 f"ORDER BY {order} LIMIT {int(limit)}")
+        return self.execute(query, values, fetch='all')
+
+    def plan_flights(self, days_ahead=C.plan_days, turnaround_min=None, start=None, incremental=False,
+                     dry_run=False, seed=None, cost_weight=None):
+        # plan every active aircraft for the next days_ahead days (see planner), returns flights added
+        # incremental: keep the flights already planned, continue each aircraft from its last planned
+        # arrival and only fill the part of the horizon that isn't planned yet
+        # dry_run: return the planned legs instead of writing them
+        # start and seed: plan from that moment with a seeded choice of routes, for repeatable runs
+        # cost_weight: how strongly cheaper routes are preferred (see costing), 0 for none
+        scenario = {'days': days_ahead, 'turnaround_min': turnaround_min, 'seed': seed,
+                    'cost_weight': C.cost_weight if cost_weight is None else cost_weight}
+        legs, summary = self.compare_plans([scenario], start, incremental)[0]
+        if dry_run:
+            return legs
+        self.insert_flights(legs, f"{'extended plan to' if incremental else 'planned'} {days_ahead} days")
+        return len(legs)
+
+    def compare_plans(self, scenarios, start=None, incremental=False, workers=None):
+        # what-if planning: plan each scenario (see planner.run_scenario) in its own process from the
+        # same inputs, writing nothing -> [(legs, summary)] in scenario order; see commit_plan
+        return planner.compare(self.compare_jobs(scenarios, start, incremental), workers)
+
+    def compare_jobs(self, scenarios, start=None, incremental=False):  # -> planner.compare jobs, one per scenario
+        # everything read from the database is in the jobs, so they can be planned away from this connection
+        start = start or datetime.now().replace(second=0, microsecond=0)
+        aircraft = self.execute(
+            "SELECT reg_no, loc, range_nm, status, capacity FROM aircraft ORDER BY reg_no", fetch='all')
+        routes = self.execute(
+            "SELECT flight, dep, arr, dist, greatcircledist, dept, arrt FROM routes", fetch='all')
+        if any(not route[3] for route in routes):  # range checks need a distance, fall back to great circle
+            distances = self.distance_matrix()
+            routes = [route if route[3] else (route[0], route[1], route[2],
+                                              distances.distance(route[1], route[2]) or route[4], *route[4:])
+                      for route in routes]
+        days = max(scenario.get('days', C.plan_days) for scenario in scenarios)
+        booked = self.booked_flights(start, start + timedelta(days=days))  # never double book
+        reachable = self.airport_index().reachable  # routes beyond an aircraft's range are pruned first
+        prices = dict(self.execute("SELECT ICAO, fuel FROM airports", fetch='all'))
+        positions = {}  # planned positions per turnaround
+        jobs = []
+        for scenario in scenarios:
+            turnaround_min = scenario.get('turnaround_min')
+            turnaround_min = C.turnaround_min if turnaround_min is None else turnaround_min
+            if incremental and turnaround_min not in positions:
+                positions[turnaround_min] = self.planned_positions(start, turnaround_min)
+            starts, used = positions.get(turnaround_min, ({}, set()))
+            jobs.append(({**scenario, 'turnaround_min': turnaround_min},
+                         aircraft, routes, start, starts, used, booked.free, reachable, prices))
+        return jobs
+
+    def commit_plan(self, legs, description):  # write a dry-run plan, returns flights added
+        # flights booked by someone else since the dry run win, clashing legs are left out
+        if legs:
+            booked = self.booked_flights(min(leg[2] for leg in legs),
+                                         max(leg[2] for leg in legs) + timedelta(seconds=1))
+            legs = [leg for leg in legs if booked.free(leg[1], leg[2], leg[3])]
+        self.insert_flights(legs, description)
+        return len(legs)
+
+    def planned_positions(self, start, turnaround_min):
+        # -> ({reg_no: (ready time, airport)} after each aircraft's last planned flight,
+        #     {(flight, date)} of routes already flown from start's day on)
+        # cancelled flights don't move an aircraft (same as booked_flights). MAX(dept) per reg_no is taken
+        # once per other status: with status = constant, the (reg_no, status, dept) index gives it in one
+        # entry per aircraft, while status <> 'Cancelled' would read every flight
+        live = [status for status in C.enum_values[('flights', 'status')] if status != 'Cancelled']
+        latest = " UNION ALL ".join(
+            "SELECT reg_no, MAX(dept) AS dept FROM flights WHERE status = %s GROUP BY reg_no" for status in live)
+        last = self.execute(
+            "SELECT f.reg_no, f.arrt, f.arr FROM flights f "
+            f"JOIN (SELECT reg_no, MAX(dept) AS dept FROM ({latest}) s GROUP BY reg_no) l "
+            "ON f.reg_no = l.reg_no AND f.dept = l.dept WHERE f.status <> 'Cancelled'", live, fetch='all')
+        turnaround = timedelta(minutes=turnaround_min)
+        starts = {reg_no: (arrt + turnaround, arr) for reg_no, arrt, arr in last
+                  if arrt is not None and arr is not None}
+        used = set(self.execute("SELECT flight, DATE(dept) FROM flights WHERE dept >= %s AND status <> 'Cancelled'",
+                                (datetime.combine(start.date(), datetime.min.time()),), fetch='all'))
+        return starts, used
+
+    # Double bookings: an aircraft can't fly two flights at once (cancelled flights don't count).
+    # Searches only go back C.max_flight_hours from a departure, which keeps them on the
+    # (reg_no, dept) index.
+    def booked_flights(self, start, end):  # conflicts.ConflictIndex of the flights between start and end
+        rows = self.execute(
+            "SELECT flightnumber, reg_no, dept, arrt FROM flights "
+            "WHERE dept >= %s AND dept < %s AND status <> 'Cancelled'",
+            (start - timedelta(hours=C.max_flight_hours), end), fetch='all')
+        return conflicts.ConflictIndex(rows)
+
+    def flight_conflicts(self, flights):  # flights about to be saved, checked against the others and each other
+        # flights: [(flightnumber or None if new, reg_no, dept, arrt)]
+        # -> [(flightnumber, reg_no, overlapping flightnumber, its dept, its arrt)]
+        if not flights:
+            return []
+        edited = {str(number) for number, reg_no, dept, arrt in flights if number not in (None, '')}
+        regs = sorted({reg_no for number, reg_no, dept, arrt in flights})
+        low = min(dept for number, reg_no, dept, arrt in flights) - timedelta(hours=C.max_flight_hours)
+        high = max(arrt for number, reg_no, dept, arrt in flights)
+        booked = conflicts.ConflictIndex()
+        known = {}  # flight id in booked -> (flightnumber, dept, arrt)
+        for start in range(0, len(regs), C.bulk_chunk_rows):
+            chunk = regs[start:start + C.bulk_chunk_rows]
+            rows = self.execute(
+                f"SELECT flightnumber, reg_no, dept, arrt FROM flights WHERE reg_no IN "
+                f"({','.join(['%s'] * len(chunk))}) AND dept > %s AND dept < %s AND status <> 'Cancelled'",
+                chunk + [low, high], fetch='all')
+            for number, reg_no, dept, arrt in rows:
+                if str(number) not in edited:  # the edited flights are checked with their new values
+                    booked.add(number, reg_no, dept, arrt)
+                    known[number] = (number, dept, arrt)
+        found = []
+        for i, (number, reg_no, dept, arrt) in enumerate(flights):
+            for other in sorted(booked.conflicts(reg_no, dept, arrt), key=lambda other: known[other][1]):
+                found.append((number, reg_no) + known[other])
+            booked.add(('edited', i), reg_no, dept, arrt)  # later ones in the list are checked against it
+            known['edited', i] = (number or 'new', dept, arrt)
+        return found
+
+    def double_bookings(self):  # every overlap in flights, one sweep per batch of aircraft
+        # -> [(reg_no, flightnumber, overlapping flightnumber, overlap start, overlap end)]
+        regs = [r[0] for r in self.execute(
+            "SELECT DISTINCT reg_no FROM flights WHERE reg_no IS NOT NULL ORDER BY reg_no", fetch='all')]
+        found = []
+        with span('flights.double_bookings', 'db', aircraft=len(regs)):
+            for start in range(0, len(regs), C.conflict_scan_tails):
+                chunk = regs[start:start + C.conflict_scan_tails]
+                rows = self.execute(
+                    f"SELECT flightnumber, reg_no, dept, arrt FROM flights WHERE reg_no IN "
+                    f"({','.join(['%s'] * len(chunk))}) AND status <> 'Cancelled' ORDER BY reg_no, dept",
+                    chunk, fetch='all')
+                found += conflicts.sweep(rows)
+        return found
+
+    def insert_flights(self, legs, description):  # bulk insert of planned flights, one transaction
+        # legs: [(flight, reg_no, dept, arrt, status, dep, arr)]
+        query = "INSERT INTO flights (flight, reg_no, dept, arrt, status, dep, arr) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        try:
+            with span('flights.insert', 'db', rows=len(legs)):
+                for start in range(0, len(legs), C.bulk_chunk_rows):
+                    self.execute(query, legs[start:start + C.bulk_chunk_rows], many=True)
+            self.log_changes('flights', 'reset')
+            self.audit('flights', 'reset', [None], new=[f"{description}: {len(legs)} flights"])
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+    def distance_matrix(self, build=True):  # distmatrix.DistanceMatrix of the airports as they are now
+        # build=False never builds a missing matrix (for the UI thread), distances are then computed per pair
+        airports = self.execute("SELECT ICAO, lat, lon FROM airports", fetch='all')
+        if self.distances is None or self.distances.key != distmatrix.content_hash(airports):
+            if not build:
+                return distmatrix.DistanceMatrix(airports, build=False)
+            self.distances = distmatrix.DistanceMatrix(airports)
+        return self.distances
+
+    def airport_index(self):  # spatial.AirportIndex of the airports as they are now
+        airports = self.execute("SELECT ICAO, lat, lon FROM airports", fetch='all')
+        key = distmatrix.content_hash(airports)
+        if self.spatial[0] != key:
+            self.spatial = (key, spatial.AirportIndex(airports))
+        return self.spatial[1]
+
+    def reachable_airports(self, reg_no):  # -> [(ICAO, nm)] the aircraft can fly to from where it is, nearest first
+        found = self.execute("SELECT loc, range_nm FROM aircraft WHERE reg_no = %s", (reg_no,), fetch='one')
+        index = self.airport_index()
+        if found is None or index.coords.get(found[0]) is None or found[1] is None:
+            return []  # unknown aircraft, no location or its airport has no coordinates
+        loc, range_nm = found
+        return [(code, nm) for code, nm in index.within(*index.coords[loc], float(range_nm)) if code != loc]
+
+    def nearest_airports(self, icao, k=C.alternates_count):  # -> [(ICAO, nm)] of the k closest other airports
+        index = self.airport_index()
+        where = index.coords.get(icao)
+        return [] if where is None else index.nearest(*where, k, exclude={icao})
+
+    def route_graph(self):  # routegraph.RouteGraph of the routes, built once and dropped on route writes
+        if self.graph is None:
+            self.graph = routegraph.RouteGraph(self.execute(
+                "SELECT flight, dep, arr, dist, greatcircledist, dept, arrt FROM routes", fetch='all'))
+        return self.graph
+
+    def route_search(self, dep, arr, reg_no=None, max_legs=C.route_hops):
+        # -> (shortest path (nm, [Leg]) or None, itineraries), within the aircraft's range if reg_no is given
+        range_nm = None
+        if reg_no:
+            found = self.execute("SELECT range_nm FROM aircraft WHERE reg_no = %s", (reg_no,), fetch='one')
+            if found is None:
+                raise ValueError(f"Unknown aircraft: {reg_no}")
+            range_nm = None if found[0] is None else float(found[0])
+        graph = self.route_graph()
+        with span('routes.search', 'graph', legs=max_legs):
+            return graph.shortest_path(dep, arr, range_nm), graph.itineraries(dep, arr, max_legs, range_nm)
+
+    def fleet_reachability(self, hops=C.route_hops):  # -> {reg_no: airports within hops legs} of the active fleet
+        aircraft = self.execute(
+            "SELECT reg_no, loc, range_nm FROM aircraft WHERE status='ACTV' ORDER BY reg_no", fetch='all')
+        with span('routes.fleet_reachability', 'graph', aircraft=len(aircraft), hops=hops):
+            return self.route_graph().fleet_reachability(aircraft, hops)
+
+    def flight_costs(self, statuses=('Planned',)):  # fuel cost estimate of every flight, see costing
+        # -> costing.schedule_costs result, with 'flights': [flightnumber] in the order of 'costs'
+        rows = self.execute(
+            "SELECT f.flightnumber, f.reg_no, COALESCE(NULLIF(r.dist, 0), r.greatcircledist), a.capacity, p.fuel "
+            "FROM flights f LEFT JOIN routes r ON r.flight = f.flight "
+            "LEFT JOIN aircraft a ON a.reg_no = f.reg_no LEFT JOIN airports p ON p.ICAO = f.dep "
+            f"WHERE f.status IN ({','.join(['%s'] * len(statuses))})", statuses, fetch='all')
+        with span('flights.costs', 'costing', rows=len(rows)):
+            result = costing.schedule_costs(rows)
+        result['flights'] = [row[0] for row in rows]
+        return result
+
+    def update_greatcircle(self):  # fill in or correct routes.greatcircledist from airport coordinates
+        # -> number of routes changed; routes with an airport that has no coordinates are left as they are
+        rows = self.execute(
+            "SELECT r.flight, r.greatcircledist, a.lat, a.lon, b.lat, b.lon FROM routes r "
+            "JOIN airports a ON a.ICAO = r.dep JOIN airports b ON b.ICAO = r.arr "
+            "WHERE a.lat IS NOT NULL AND a.lon IS NOT NULL AND b.lat IS NOT NULL AND b.lon IS NOT NULL",
+            fetch='all')
+        if not rows:
+            return 0
+        flights, stored, lat1, lon1, lat2, lon2 = zip(*rows)
+        with span('routes.greatcircle', 'geo', routes=len(rows)):
+            distances = geodesy.haversine(lat1, lon1, lat2, lon2)
+        changed = [(flight, round(float(new), 2), old) for flight, old, new in zip(flights, stored, distances)
+                   if old is None or abs(float(old) - float(new)) >= 0.005]
+        if not changed:
+            return 0
+        keys = [flight for flight, new, old in changed]
+        try:  # the new values go to a temporary table, then one UPDATE joins them in
+            self.execute("CREATE TEMPORARY TABLE IF NOT EXISTS greatcircle_new "
+                         "(flight VARCHAR(6) NOT NULL PRIMARY KEY, dist DECIMAL(9,2))")
+            self.execute("DELETE FROM greatcircle_new")
+            for start in range(0, len(changed), C.bulk_chunk_rows):
+                self.execute("INSERT INTO greatcircle_new (flight, dist) VALUES (%s, %s)",
+                             [(flight, new) for flight, new, old in changed[start:start + C.bulk_chunk_rows]],
+                             many=True)
+            self.execute("UPDATE routes r JOIN greatcircle_new n ON n.flight = r.flight "
+                         "SET r.greatcircledist = n.dist")
+            if len(changed) > C.changelog_batch:  # clients reload routes instead of refetching each one
+                self.log_changes('routes', 'reset')
+            else:
+                self.log_changes('routes', 'update', keys)
+            self.audit('routes', 'update', keys, 'greatcircledist',
+                       [old for flight, new, old in changed], [new for flight, new, old in changed])
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return len(changed)
 
     def clear_all_flights(self):
         # Use TRUNCATE on MySQL to remove rows and reset AUTO_INCREMENT
-        self.cursor.execute("TRUNCATE TABLE flights")
+        self.execute("TRUNCATE TABLE flights")
         # DELETE FROM sqlite_sequence WHERE name='flights'; for SQlite
-        self.mydb.commit()
+        self.log_changes('flights', 'reset')
+        self.audit('flights', 'reset', [None], new=["all flights deleted"])
+        self.commit()
 
     # account management functions
 
@@ -191,12 +656,12 @@ class database:
     # takes username and password, returns UserAccount object if successful, else None
     def login_user(self, username, password):
         hashed_password = hash_password(password)
-        self.cursor.execute(
-            "SELECT * FROM accounts WHERE username = %s AND passwd = %s", (username, hashed_password))
-        result = self.cursor.fetchone()
+        result = self.execute(
+            "SELECT * FROM accounts WHERE username = %s AND passwd = %s", (username, hashed_password), fetch='one')
         if result:
             user = UserAccount(self, *result)
             if user.is_active():
+                self.user = user
                 self.update_cell('accounts', 'last_login',
                                  datetime.now(), user.account_id)
                 return user
@@ -213,12 +678,18 @@ class database:
         self.update_cell('accounts', 'passwd', hashed_password, id)
 
     def signout(self):  # From database connection
+        if self.auditor is not None:
+            self.auditor.close()  # write the audit entries still queued
         if self.mydb:
             self.mydb.close()
 
 # Helper function to hash passwords
 
 
+def same_value(stored, loaded):  # database value vs the value shown (may be the text typed in)
+    return stored == loaded or (stored is not None and loaded is not None and str(stored) == str(loaded))
+
+
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -0,0 +1,128 @@
+# imports
+import os
+import csv
+import random
+import string
+from datetime import datetime, timedelta
+import constants as C
+import geodesy
+
+# Synthetic data generator for scaling tests.
+# Produces airports, aircraft, routes, flights and maintenance CSVs whose headers match
+# the column lists in constants, so they can be imported through CSVmanager like real data.
+# Every key referenced by one table (loc, dep, arr, reg_no, flight) exists in the table it points to.
+# Route distances follow from the airports' coordinates, placed in one region so most routes are flyable.
+
+# preset dataset sizes (number of flights rows, the other tables are scaled from it)
+scales = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+models = [('A320-251N', 'CFM LEAP-1A26', 180, 3500), ('A321-251NX', 'CFM LEAP-1A32', 244, 4000),
+          ('737 MAX 8', 'CFM LEAP-1B27', 189, 3550), ('ATR 72-600', 'PW127M', 72, 825),
+          ('A350-900', 'RR Trent XWB-84', 316, 8100), ('787-9', 'GEnx-1B74', 296, 7565),
+          ('Q400', 'PW150A', 78, 1100)]
+latitudes, longitudes = (5, 40), (65, 100)  # airports are placed in this region, degrees
+maintenance_jobs = ['Fuel pump replacement', 'A-check', 'C-check', 'Tyre change',
+                    'Brake inspection', 'APU overhaul', 'Cabin refit', 'Avionics software update']
+
+
+def table_sizes(rows):  # number of rows per table for a given flights row count
+    return {'airports': max(20, min(rows // 50, 26 ** 4)),  # ICAO codes are 4 letters
+            'aircraft': max(10, rows // 20),
+            'routes': max(20, rows // 4),
+            'flights': rows,
+            'maintenance': max(5, rows // 10)}
+
+
+def _codes(rng, count, length, alphabet=string.ascii_uppercase):  # unique random codes
+    codes = set()
+    while len(codes) < count:
+        codes.add(''.join(rng.choice(alphabet) for x in range(length)))
+    return sorted(codes)
+
+
+def generate(rows, seed=0, start=datetime(2025, 1, 1)):
+    # Returns {table_name: list of row tuples}; the same rows/seed always give the same data
+    rng = random.Random(seed)
+    sizes = table_sizes(rows)
+
+    icao = _codes(rng, sizes['airports'], 4)
+    iata = _codes(rng, sizes['airports'], 3)[:len(icao)] if sizes['airports'] <= 26 ** 3 else [''] * len(icao)
+    airports = [(icao[i], iata[i], f'Airport {icao[i]}', f'City {i}',
+                 round(rng.uniform(100000, 600000), 2)) for i in range(len(icao))]
+    places = random.Random(f'{seed}-coordinates')  # own stream, the other tables stay as they were
+    airports = [airport + (round(places.uniform(*latitudes), 6), round(places.uniform(*longitudes), 6))
+                for airport in airports]
+    coords = {airport[0]: airport[-2:] for airport in airports}
+
+    regs = ['VT-' + r for r in _codes(rng, sizes['aircraft'], 5,
+                                       string.ascii_uppercase + string.digits)]
+    aircraft = []
+    for i, reg in enumerate(regs):
+        model, engine, capacity, range_nm = rng.choice(models)
+        aircraft.append((reg, model, engine, 10000 + i, capacity, range_nm,
+                         rng.choices(('ACTV', 'MAINT', 'PRKD', 'GRND'), (85, 8, 5, 2))[0],
+                         rng.choice(icao), rng.randint(0, 60000), round(rng.uniform(0, 25), 2),
+                         (start - timedelta(days=rng.randint(1, 700))).strftime('%Y-%m-%d %H:%M:%S')))
+
+    # flight codes are 2 letters + 4 digits (VARCHAR(6)), drawn without repeats
+    flight_codes = [string.ascii_uppercase[n // 234000] + string.ascii_uppercase[n // 9000 % 26] +
+                    str(1000 + n % 9000) for n in rng.sample(range(26 * 26 * 9000), sizes['routes'])]
+    routes = []
+    for code in flight_codes:
+        dep, arr = rng.sample(icao, 2)
+        gcd = round(geodesy.haversine_one(*coords[dep], *coords[arr]), 2)
+        dist = max(1, round(gcd * rng.uniform(1.02, 1.15)))  # flown distance, a bit longer than great circle
+        minutes = 30 + dist * 60 // 450  # roughly 450 knots plus taxi
+        dept = timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+        arrt = (dept + timedelta(minutes=minutes)) % timedelta(days=1)
+        routes.append((code, dep, arr, dist, gcd, minutes, _clock(dept), _clock(arrt)))
+
+    flights = []
+    for i in range(sizes['flights']):
+        code, dep, arr, dist, gcd, minutes, dept, arrt = rng.choice(routes)
+        day = start + timedelta(days=rng.randint(0, 364))
+        dept_dt = datetime.combine(day.date(), datetime.strptime(dept, '%H:%M:%S').time())
+        flights.append((i + 1, code, rng.choice(regs), dept_dt.strftime('%Y-%m-%d %H:%M:%S'),
+                        (dept_dt + timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S'),
+                        rng.choices(('Planned', 'In-Flight', 'Completed', 'Cancelled'), (60, 5, 30, 5))[0],
+                        dep, arr))
+
+    maintenance = [(i + 1, rng.choice(regs),
+                    (start + timedelta(days=rng.randint(-365, 365))).strftime('%Y-%m-%d %H:%M:%S'),
+                    rng.choice(maintenance_jobs), rng.choice(('Pending', 'Completed')))
+                   for i in range(sizes['maintenance'])]
+
+    return {'airports': airports, 'aircraft': aircraft, 'routes': routes,
+            'flights': flights, 'maintenance': maintenance}
+
+
+def _clock(delta):  # timedelta since midnight -> 'HH:MM:SS'
+    seconds = int(delta.total_seconds())
+    return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+def write_dataset(folder, rows, seed=0):
+    # Writes one CSV per table into folder and returns {table_name: file path}
+    table_columns = {'airports': C.airports_columns, 'aircraft': C.aircraft_columns,
+                     'routes': C.routes_columns, 'flights': C.flights_columns,
+                     'maintenance': C.maintenance_columns}
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for table, data in generate(rows, seed).items():
+        paths[table] = os.path.join(folder, f'{table}.csv')
+        with open(paths[table], 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file, delimiter=',')
+            writer.writerow(table_columns[table])  # header, same as the export format
+            writer.writerows(data)
+    return paths
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate synthetic Flyts datasets')
+    parser.add_argument('scale', choices=sorted(scales), help='dataset size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=os.path.join(C.BASE_DIR, 'bench_data'))
+    args = parser.parse_args()
+    for table, path in write_dataset(os.path.join(args.out, args.scale), scales[args.scale], args.seed).items():
+        print(f'{table}: {path}')
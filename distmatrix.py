@@ -0,0 +1,131 @@
+# imports
+import os
+import json
+import hashlib
+import constants as C
+import geodesy
+from tracing import span
+
+# Airport to airport great-circle distances, precomputed.
+# The N x N matrix (float32 nautical miles, NaN where an airport has no coordinates) is saved
+# in C.CACHE_DIR as distances-<hash>.npy and opened memory-mapped, so it costs no load time and
+# every lookup is one array read. <hash> is a hash of the airports' codes and coordinates, so a
+# stale matrix is never used. When airports are added, removed or moved, the newest matrix on
+# disk is reused: only the rows and columns of the changed airports are recomputed.
+# Without NumPy, with more than C.distance_matrix_max_airports airports (the matrix grows with the
+# square), or when asked not to build a missing matrix, each distance is computed when asked for.
+
+
+def content_hash(airports):  # airports: [(ICAO, lat, lon)]
+    digest = hashlib.sha256()
+    for code, lat, lon in sorted(airports, key=lambda a: a[0]):
+        digest.update(f'{code}|{lat}|{lon}\n'.encode())
+    return digest.hexdigest()[:16]
+
+
+def coordinates(lat, lon):
+    return None if lat is None or lon is None else (float(lat), float(lon))
+
+
+class DistanceMatrix:
+    def __init__(self, airports, folder=C.CACHE_DIR, build=True):  # build=False: only use a matrix already on disk
+        airports = sorted(airports, key=lambda a: a[0])
+        self.key = content_hash(airports)
+        self.codes = [code for code, lat, lon in airports]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.coords = [coordinates(lat, lon) for code, lat, lon in airports]
+        self.folder = folder
+        self.matrix = None
+        if len(self.codes) > C.distance_matrix_max_airports:
+            return
+        try:
+            import numpy
+        except ImportError:
+            return
+        if build or os.path.exists(self.path(self.key, 'npy')):
+            self.matrix = self.load_matrix(numpy)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def distance(self, dep, arr):  # nautical miles between two airports, None if either has no coordinates
+        i, j = self.index.get(dep), self.index.get(arr)
+        if i is None or j is None:
+            return None
+        if self.matrix is not None:
+            value = float(self.matrix[i, j])
+            return None if value != value else value  # NaN: no coordinates
+        if self.coords[i] is None or self.coords[j] is None:
+            return None
+        return geodesy.haversine_one(*self.coords[i], *self.coords[j])
+
+    def path(self, key, extension):
+        return os.path.join(self.folder, f'distances-{key}.{extension}')
+
+    def load_matrix(self, np):  # memory-map the matrix for these airports, building it first if needed
+        if os.path.exists(self.path(self.key, 'npy')):
+            return np.load(self.path(self.key, 'npy'), mmap_mode='r')
+        os.makedirs(self.folder, exist_ok=True)
+        n = len(self.codes)
+        coords = np.array([c if c is not None else (np.nan, np.nan) for c in self.coords],
+                          dtype=np.float64).reshape(n, 2)
+        with span('distances.build', 'geo', airports=n):
+            matrix = np.lib.format.open_memmap(self.path(self.key + '.tmp', 'npy'), mode='w+',
+                                               dtype=np.float32, shape=(n, n))
+            changed = np.ones(n, dtype=bool)  # airports whose distances must be computed
+            previous = self.previous()
+            if previous is not None:
+                old_codes, old_coords, old_matrix = previous
+                old_index = {code: i for i, code in enumerate(old_codes)}
+                kept = [(i, old_index[code]) for i, code in enumerate(self.codes)
+                        if code in old_index and old_coords[old_index[code]] == self.coords[i]]
+                if kept:
+                    new_rows, old_rows = (np.array(x) for x in zip(*kept))
+                    for at in range(0, len(kept), C.distance_block_rows):  # a block of rows in memory at a time
+                        rows = slice(at, at + C.distance_block_rows)
+                        matrix[new_rows[rows, None], new_rows] = old_matrix[old_rows[rows]][:, old_rows]
+                    changed[new_rows] = False
+            todo = np.flatnonzero(changed)  # rows and columns of the new or moved airports
+            for start in range(0, len(todo), C.distance_block_rows):
+                rows = todo[start:start + C.distance_block_rows]
+                block = geodesy.haversine(coords[rows, 0, None], coords[rows, 1, None],
+                                          coords[None, :, 0], coords[None, :, 1])
+                matrix[rows, :] = block
+                matrix[:, rows] = block.T
+            matrix.flush()
+            del matrix
+        with open(self.path(self.key + '.tmp', 'json'), 'w') as file:
+            json.dump({'codes': self.codes, 'coords': self.coords}, file)
+        os.replace(self.path(self.key + '.tmp', 'json'), self.path(self.key, 'json'))
+        os.replace(self.path(self.key + '.tmp', 'npy'), self.path(self.key, 'npy'))
+        self.prune()
+        return np.load(self.path(self.key, 'npy'), mmap_mode='r')
+
+    def previous(self):  # newest other matrix on disk -> (codes, coords, matrix) or None
+        import numpy as np
+        found = [name for name in os.listdir(self.folder)
+                 if name.startswith('distances-') and name.endswith('.json') and '.tmp' not in name]
+        found.sort(key=lambda name: os.path.getmtime(os.path.join(self.folder, name)), reverse=True)
+        for name in found:
+            key = name[len('distances-'):-len('.json')]
+            try:
+                with open(self.path(key, 'json')) as file:
+                    saved = json.load(file)
+                matrix = np.load(self.path(key, 'npy'), mmap_mode='r')
+            except (OSError, ValueError):
+                continue  # half written or removed meanwhile
+            coords = [tuple(c) if c is not None else None for c in saved['coords']]
+            if matrix.shape == (len(saved['codes']),) * 2:
+                return saved['codes'], coords, matrix
+        return None
+
+    def prune(self):  # keep only the newest C.distance_cache_keep matrices
+        names = sorted((name for name in os.listdir(self.folder)
+                        if name.startswith('distances-') and name.endswith('.npy') and '.tmp' not in name),
+                       key=lambda name: os.path.getmtime(os.path.join(self.folder, name)), reverse=True)
+        for name in names[C.distance_cache_keep:]:
+            for extension in ('npy', 'json'):
+                try:
+                    os.remove(self.path(name[len('distances-'):-len('.npy')], extension))
+                except OSError:
+                    pass  # still mapped elsewhere (Windows) or already gone
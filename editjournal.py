@@ -0,0 +1,64 @@
+# Write-behind buffer for cell edits.
+# While buffering, edits are only recorded here (and shown in the grid); they can be undone and
+# redone, and are sent to the database together when the user saves (database.apply_edits).
+
+
+class Edit:
+    def __init__(self, item, key, column, old, new):
+        self.item = item  # Treeview item id of the row
+        self.key = key  # primary key of the row in the database (before any buffered edit)
+        self.column = column
+        self.old = old
+        self.new = new
+
+
+class EditJournal:
+    def __init__(self):
+        self.done = []  # edits in the order they were made
+        self.undone = []  # edits undone, most recent last, for redo
+        self.keys = {}  # item -> primary key of the row in the database
+
+    def __len__(self):
+        return len(self.done)
+
+    def record(self, item, current_key, column, old, new):
+        # current_key: primary key shown in the grid, may itself be a buffered edit
+        key = self.keys.setdefault(item, current_key)
+        self.done.append(Edit(item, key, column, old, new))
+        self.undone.clear()
+
+    def undo(self):  # -> the edit to revert in the grid, or None
+        if not self.done:
+            return None
+        edit = self.done.pop()
+        self.undone.append(edit)
+        return edit
+
+    def redo(self):  # -> the edit to apply again, or None
+        if not self.undone:
+            return None
+        edit = self.undone.pop()
+        self.done.append(edit)
+        return edit
+
+    def pending(self):  # -> {item: (key, {column: (value in database, new value)})}
+        rows = {}
+        for edit in self.done:
+            key, changes = rows.setdefault(edit.item, (edit.key, {}))
+            first = changes[edit.column][0] if edit.column in changes else edit.old
+            changes[edit.column] = (first, edit.new)
+        for key, changes in rows.values():  # columns edited back to where they started
+            for column, (old, new) in list(changes.items()):
+                if old == new or (old is not None and new is not None and str(old) == str(new)):
+                    del changes[column]
+        return {item: row for item, row in rows.items() if row[1]}
+
+    def saved(self, items):  # rows written to the database, forget their edits
+        items = set(items)
+        self.done = [e for e in self.done if e.item not in items]
+        self.undone = [e for e in self.undone if e.item not in items]
+        for item in items:
+            self.keys.pop(item, None)
+
+    def clear(self):
+        self.done, self.undone, self.keys = [], [], {}
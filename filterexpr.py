@@ -0,0 +1,144 @@
+# imports
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import constants as C
+
+# Typed filter expressions.
+# Each filter from C.filterslist plus the value the user typed becomes one or more Conditions.
+# Values are checked against the column's type (C.column_types) and converted before anything
+# is sent to the server. Conditions become index-friendly SQL (plain comparisons, BETWEEN,
+# IN-lists and LIKE 'prefix%') and can also be evaluated in memory by localfilter.
+
+datetime_formats = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M')
+
+
+class FilterError(ValueError):  # value doesn't fit the column, message is shown to the user
+    pass
+
+
+class Condition:
+    def __init__(self, table, column, op, value):
+        self.table = table
+        self.column = column
+        self.op = op  # '=', '>=', '<=', '<', '>', 'between', 'in' or 'prefix'
+        self.value = value  # typed value; (low, high) for between, tuple for in, str for prefix
+
+    def sql(self):  # -> (SQL fragment, parameters)
+        if self.op == 'between':
+            return f"{self.column} BETWEEN %s AND %s", list(self.value)
+        if self.op == 'in':
+            return f"{self.column} IN ({','.join(['%s'] * len(self.value))})", list(self.value)
+        if self.op == 'prefix':
+            escaped = self.value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            return f"{self.column} LIKE %s", [escaped + '%']
+        return f"{self.column} {self.op} %s", [self.value]
+
+
+def parse_value(table, column, text):  # user input -> Python value of the column's type
+    ctype = C.column_types[table][column]
+    text = str(text).strip()
+    if text == '':
+        raise FilterError(f"Enter a value for {column}")
+    if ctype == 'int':
+        try:
+            return int(text)
+        except ValueError:
+            raise FilterError(f"{column} must be a whole number, not '{text}'")
+    if ctype == 'decimal':
+        try:
+            return Decimal(text)
+        except InvalidOperation:
+            raise FilterError(f"{column} must be a number, not '{text}'")
+    if ctype == 'datetime':
+        for fmt in datetime_formats:
+            try:
+                return datetime.strptime(text, fmt)
+            except ValueError:
+                pass
+        try:  # a plain date stays a date, build() turns it into the right range of the day
+            return date.fromisoformat(text)
+        except ValueError:
+            raise FilterError(f"{column} must be YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS], not '{text}'")
+    if ctype == 'date':
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            raise FilterError(f"{column} must be YYYY-MM-DD, not '{text}'")
+    if ctype == 'time':
+        parts = text.split(':')
+        try:
+            hours, minutes, seconds = (int(p) for p in (parts + ['0'])[:3])
+        except ValueError:
+            raise FilterError(f"{column} must be HH:MM[:SS], not '{text}'")
+        if len(parts) not in (2, 3) or not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+            raise FilterError(f"{column} must be HH:MM[:SS], not '{text}'")
+        return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+    if ctype == 'enum':
+        for option in C.enum_values[(table, column)]:
+            if option.casefold() == text.casefold():
+                return option
+        raise FilterError(f"{column} must be one of {', '.join(C.enum_values[(table, column)])}")
+    return text
+
+
+def build(key, raw):  # one filter and its input -> list of Conditions
+    spec = C.filterslist[key]
+    table, column, op = spec['table'], spec['column'], spec['op']
+    if op == 'in':
+        items = raw if isinstance(raw, (list, tuple)) else str(raw).split(',')
+        values = tuple(dict.fromkeys(parse_value(table, column, i) for i in items if str(i).strip()))
+        if not values:
+            raise FilterError(f"Enter at least one value for {spec['title']}")
+        return [Condition(table, column, 'in', values)]
+    if op == 'prefix':
+        if C.column_types[table][column] != 'text':
+            raise FilterError(f"{spec['title']} only works on text columns")
+        return [Condition(table, column, 'prefix', parse_value(table, column, raw))]
+    if op == 'between':
+        low, high = raw if isinstance(raw, (list, tuple)) else (str(raw).split(',') + [''])[:2]
+        conditions = []
+        if str(low).strip():
+            conditions += _compare(table, column, '>=', parse_value(table, column, low))
+        if str(high).strip():
+            conditions += _compare(table, column, '<=', parse_value(table, column, high))
+        if not conditions:
+            raise FilterError(f"Enter a range for {spec['title']}")
+        if len(conditions) == 2 and conditions[0].op == '>=' and conditions[1].op == '<=':
+            if conditions[0].value > conditions[1].value:
+                raise FilterError(f"{spec['title']}: the start is after the end")
+            return [Condition(table, column, 'between', (conditions[0].value, conditions[1].value))]
+        return conditions
+    return _compare(table, column, op, parse_value(table, column, raw))
+
+
+def _compare(table, column, op, value):
+    # A plain date on a DATETIME column means the whole day: '= day' becomes [day, next day),
+    # '<= day' includes the day and '> day' starts the next day. Both sides stay index ranges.
+    if C.column_types[table][column] == 'datetime' and not isinstance(value, datetime):
+        start = datetime.combine(value, datetime.min.time())
+        end = start + timedelta(days=1)
+        if op == '=':
+            return [Condition(table, column, '>=', start), Condition(table, column, '<', end)]
+        if op == '<=':
+            return [Condition(table, column, '<', end)]
+        if op == '>':
+            return [Condition(table, column, '>=', end)]
+        return [Condition(table, column, op, start)]
+    return [Condition(table, column, op, value)]
+
+
+def build_all(filterkeys, filtervalues):  # -> list of Conditions, FilterError on the first bad value
+    conditions = []
+    for key, raw in zip(filterkeys, filtervalues):
+        conditions += build(key, raw)
+    return conditions
+
+
+def to_sql(conditions):  # -> (" AND ..." constraints, parameter list)
+    constraints = ""
+    values = []
+    for condition in conditions:
+        fragment, params = condition.sql()
+        constraints += " AND " + fragment
+        values += params
+    return constraints, values
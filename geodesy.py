@@ -0,0 +1,24 @@
+# imports
+import math
+import constants as C
+
+# Great-circle distances between airports, from their latitude and longitude.
+# haversine() takes whole columns of coordinates and works on them as NumPy arrays, so a
+# million routes take about a second; NumPy is imported on first use, and when it isn't
+# installed the same formula runs as a plain Python loop.
+
+
+def haversine(lat1, lon1, lat2, lon2):  # sequences of degrees -> nautical miles, one per position
+    try:
+        import numpy as np
+    except ImportError:
+        return [haversine_one(*points) for points in zip(lat1, lon1, lat2, lon2)]
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * C.earth_radius_nm * np.arcsin(np.sqrt(np.minimum(a, 1.0)))  # rounding can push a past 1
+
+
+def haversine_one(lat1, lon1, lat2, lon2):  # degrees -> nautical miles
+    lat1, lon1, lat2, lon2 = (math.radians(float(x)) for x in (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * C.earth_radius_nm * math.asin(math.sqrt(min(a, 1.0)))
@@ -0,0 +1,59 @@
+# imports
+import operator
+import filterexpr
+
+# Client-side filter engine.
+# Compiles filter Conditions (see filterexpr) into predicates and runs them over the ColumnStore
+# (see rowstore) holding the rows already loaded in the Treeview, so changing filters on a fully loaded table needs
+# no new SELECT. Comparisons follow MySQL: NULL never matches and text compares case-insensitively.
+# Anything that can't be evaluated the same way as the server raises ValueError, and the
+# caller falls back to SQL.
+
+ops = {'=': operator.eq, '>=': operator.ge, '<=': operator.le, '<': operator.lt, '>': operator.gt}
+
+
+def _text(cell):  # how the server's case-insensitive collation sees a text cell
+    return str(cell).casefold().rstrip()
+
+
+def predicate(condition):  # function(cell) -> bool for one Condition
+    value = condition.value
+    if condition.op == 'prefix':
+        prefix = value.casefold()
+        return lambda cell: cell is not None and _text(cell).startswith(prefix)
+    text = isinstance(value, str) or (isinstance(value, tuple) and value and isinstance(value[0], str))
+    if condition.op == 'in':
+        if text:
+            wanted = {_text(v) for v in value}
+            return lambda cell: cell is not None and _text(cell) in wanted
+        wanted = set(value)
+        return lambda cell: cell is not None and cell in wanted
+    if condition.op == 'between':
+        low, high = (_text(v) for v in value) if text else value
+        if text:
+            return lambda cell: cell is not None and low <= _text(cell) <= high
+        return lambda cell: cell is not None and low <= cell <= high
+    compare = ops[condition.op]
+    if text:
+        target = _text(value)
+        return lambda cell: cell is not None and compare(_text(cell), target)
+    return lambda cell: cell is not None and compare(cell, value)
+
+
+def compile_filters(table_columns, filterkeys, filtervalues):
+    # -> [(column index, predicate)]; raises ValueError (FilterError) for bad values
+    compiled = []
+    for condition in filterexpr.build_all(filterkeys, filtervalues):
+        if condition.column not in table_columns:
+            raise ValueError(f"Column {condition.column} isn't loaded")
+        compiled.append((table_columns.index(condition.column), predicate(condition)))
+    return compiled
+
+
+def evaluate(compiled, store):  # row indexes passing every filter
+    matching = range(len(store))
+    for col_index, test in compiled:
+        matching = store.filter(col_index, test, matching)
+        if not matching:
+            break
+    return set(matching)
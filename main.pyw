@@ -7,21 +7,48 @@ aircraft_fleet/
             -Dialogueboxes.py   # Custom dialog boxes for input
             -Tableviewer.py      # Treeview table display and editing
             -constants.py         # Column names, mappings, menu configs
+            -datagen.py           # Seeded synthetic datasets for scaling tests
+            -benchmark.py         # Timing suite for imports, queries, planning and rendering
+            -querylog.py          # Per-statement query timings and slow query log
+            -tracing.py           # Nested timing spans exported as Chrome trace JSON
+            -responsiveness.py    # Tk event loop stall monitor and UI latency report
+            -searchindex.py       # Prefix word index behind the quick search box
+            -localfilter.py       # Filters evaluated against rows already on screen
+            -filterexpr.py        # Typed filter conditions compiled to index-friendly SQL
+            -rowstore.py          # Compact typed column storage for the loaded rows
+            -editjournal.py       # Buffered cell edits with undo/redo
+            -changefeed.py        # Polls the change log for other clients' writes
+            -auditlog.py          # Background writer for the audit trail of data changes
+            -planner.py           # Event-driven multi-leg flight planning engine
+            -conflicts.py         # Interval index for aircraft double bookings
+            -plancheck.py         # Golden output check of the planner's schedules
+            -geodesy.py           # Vectorized great-circle distances from airport coordinates
+            -distmatrix.py        # Memory-mapped airport distance matrix cached on disk
+            -spatial.py           # k-d tree of airports for range and nearest queries
+            -routegraph.py        # Route network graph: shortest paths, itineraries, reachability
+            -costing.py           # Vectorized fuel cost estimates and cheaper-route weighting
  => Total: 7 files, ~1500 lines of code
 '''
 # imports
-import databaselogic as dbl
-import Dialogueboxes as dbox
+import time
+started = time.perf_counter()  # cold start timer, before anything else is imported
 import constants as C
-import UI
 import tkinter
 from tkinter import messagebox
+import threading
+import queue
+import json
 import sys
 import os
+# databaselogic (mysql.connector), Dialogueboxes and csvlogic are imported when first needed
+
+base = None  # database object, set once connected
 
 
 def setup():
     global base
+    import databaselogic as dbl
+    import Dialogueboxes as dbox
     setup_root = tkinter.Tk()  # temporary root for dialog
     setup_root.withdraw()  # Hides the root window, since we only want the dialog
     
@@ -100,36 +127,85 @@ def setup():
     setup_root.destroy()  # Close dialog root
 
 
-# Main program starts here
-if not C.settings_exist():  # If no settings file exists, run setup
-    setup()
-else:
+def connect(s, db, results):  # runs on a background thread while the window is already showing
+    try:
+        if db is None:  # not already connected by setup()
+            import databaselogic as dbl
+            # Create database object
+            db = dbl.database(s['host'], s['user_db'],
+                              s['passwd_db'], s['charset'],
+                              s.get('slow_query_ms', C.slow_query_ms))
+            db.connection()  # Connect to database
+            db.execute("USE " + s['database'])  # Use specified database
+            db.ensure_schema()  # databases created by older versions lack the change log and sort indexes
+        if db.auditor is None:
+            db.start_audit(s['database'])  # changes are audited from here on
+        username = s.get('user')  # Load saved username
+        passwd = s.get('pass')  # Load saved password
+        session = None if username is None or passwd is None else db.login_user(username, passwd)
+        results.put((db, session, None))
+    except Exception as e:
+        results.put((db, None, e))
+
+
+def connected(results, painted_ms):  # polls for the background connection on the Tk thread
+    global base
+    try:
+        db, session, error = results.get_nowait()
+    except queue.Empty:
+        root.after(20, connected, results, painted_ms)
+        return
+    base = db
+    if error is not None:
+        messagebox.showerror(
+            parent=root,
+            title="Database Connection Error",
+            message=f"Could not connect to database.\n\nError: {error}")
+        root.destroy()
+        return
+    appinstance.attach(db, session)
+    ready_ms = (time.perf_counter() - started) * 1000
+    appinstance.set_status(f"Connected to {s['host']}  |  window shown in {painted_ms:.0f} ms, "
+                           f"ready in {ready_ms:.0f} ms")
+    try:  # keep a history of cold start times
+        with open(C.STARTUP_LOG, 'a') as log:
+            log.write(json.dumps({'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                  'window_ms': round(painted_ms, 1), 'ready_ms': round(ready_ms, 1)}) + '\n')
+    except OSError:
+        pass
+
+
+# Main program starts here (only when run, planning worker processes import this file too)
+if __name__ == '__main__':
+    if not C.settings_exist():  # If no settings file exists, run setup
+        setup()
     try:
         s = C.load_settings()  # Load settings from file
-        # Create database object
-        base = dbl.database(s['host'], s['user_db'],
-                            s['passwd_db'], s['charset'])
-        base.connection()  # Connect to database
-        base.cursor.execute("USE " + s['database'])  # Use specified database
+        for key in ('host', 'user_db', 'passwd_db', 'charset', 'database'):
+            s[key]  # all connection settings must be present
     except (KeyError, FileNotFoundError, ValueError) as e:
-        os.remove(os.path.join(C.BASE_DIR, "settings.json"))
+        os.remove(C.SETTINGS_PATH)
         messagebox.showerror(
             title="Settings Load Error",
             message=f"Could not load settings file. It may be corrupted.\n\nError: {e}")
         setup()
         sys.exit()
-    except Exception as e:
-        messagebox.showerror(
-            title="Database Connection Error",
-            message=f"Could not connect to database.\n\nError: {e}")
-        sys.exit()
-root = tkinter.Tk()  # Create main app root
-try:
-    s= C.load_settings()  # Load settings from file
-    username = s.get('user')  # Load saved username
-    passwd = s.get('pass')  # Load saved password
-    appinstance = UI.Flyts(root, base, user=username,
-                           passwd=passwd)  # Run actual GUI
-    root.mainloop()  # Start tkinter event loop
-finally:
-    base.signout()  # After app closes, close database connection
+
+    root = tkinter.Tk()  # Create main app root
+    import UI
+    try:
+        appinstance = UI.Flyts(root)  # Run actual GUI, menus are added once connected
+        appinstance.set_status("Connecting to database...")
+        root.update()  # paint the window before connecting
+        painted_ms = (time.perf_counter() - started) * 1000
+        results = queue.Queue()
+        threading.Thread(target=connect, args=(s, base, results),
+                         name='connect', daemon=True).start()
+        root.after(20, connected, results, painted_ms)
+        root.mainloop()  # Start tkinter event loop
+    finally:
+        if 'appinstance' in globals():  # save this session's UI latency report
+            appinstance.monitor.stop()
+            appinstance.monitor.save_report()
+        if base is not None:
+            base.signout()  # After app closes, close database connection
@@ -0,0 +1,86 @@
+# imports
+import json
+import random
+import sys
+import time
+from datetime import datetime
+import constants as C
+import datagen
+import planner
+import conflicts
+import spatial
+
+# Golden output check for the flight planner.
+# Plans fixed generated datasets with a fixed seed and start, and compares each schedule's
+# fingerprint with the one stored in C.PLANNER_GOLDEN. Run it after changing the planner:
+# a faster engine must still give exactly the same schedules. If a change is meant to plan
+# differently, review the new schedules and store them with --update.
+# Needs no database, the inputs come straight from datagen.
+# Cases marked reachable prune routes with spatial.AirportIndex like database.compare_plans does;
+# pruning must not change the schedule, so they match the same case without it.
+
+# (flights rows of the dataset, seed, days, turnaround minutes, prune with reachable)
+cases = [(1_000, 0, 7, 45, False), (1_000, 1, 14, 30, False), (20_000, 0, 7, 45, False),
+         (20_000, 2, 3, 90, False), (20_000, 0, 7, 45, True)]
+start = datetime(2025, 3, 1)  # inside the year of generated flights, so some slots are booked
+
+
+def inputs(rows, seed):  # -> (aircraft, routes, booked flights, airport index), as compare_plans has them
+    dataset = datagen.generate(rows, seed)
+    a, r, f, p = C.aircraft_columns, C.routes_columns, C.flights_columns, C.airports_columns
+    aircraft = [(row[a.index('reg_no')], row[a.index('loc')], row[a.index('range_nm')])
+                for row in dataset['aircraft'] if row[a.index('status')] == 'ACTV']
+    routes = [tuple(row[r.index(column)] for column in ('flight', 'dep', 'arr', 'dist', 'greatcircledist',
+                                                          'dept', 'arrt')) for row in dataset['routes']]
+    booked = conflicts.ConflictIndex(
+        (row[f.index('flightnumber')], row[f.index('reg_no')],
+         datetime.fromisoformat(row[f.index('dept')]), datetime.fromisoformat(row[f.index('arrt')]))
+        for row in dataset['flights'] if row[f.index('status')] != 'Cancelled')
+    index = spatial.AirportIndex((row[p.index('ICAO')], row[p.index('lat')], row[p.index('lon')])
+                                 for row in dataset['airports'])
+    return aircraft, routes, booked, index
+
+
+def case_name(rows, seed, days, turnaround_min, pruned=False):
+    return f'rows={rows} seed={seed} days={days} turnaround={turnaround_min}' + (' reachable' if pruned else '')
+
+
+def run():  # -> {case name: {'flights': n, 'fingerprint': hash}}, printing the timings
+    results = {}
+    for rows, seed, days, turnaround_min, pruned in cases:
+        aircraft, routes, booked, index = inputs(rows, seed)
+        began = time.perf_counter()
+        legs = planner.plan(aircraft, routes, start, days, turnaround_min, rng=random.Random(seed),
+                            free=booked.free, reachable=index.reachable if pruned else None)
+        seconds = time.perf_counter() - began
+        name = case_name(rows, seed, days, turnaround_min, pruned)
+        results[name] = {'flights': len(legs), 'fingerprint': planner.fingerprint(legs)}
+        print(f'{name:<55} {len(legs):>7} flights {seconds:8.3f}s')
+    return results
+
+
+def check(path=C.PLANNER_GOLDEN):  # -> list of differences from the stored schedules, empty if none
+    with open(path) as file:
+        golden = json.load(file)
+    results = run()
+    differences = []
+    for name, expected in golden.items():
+        got = results.get(name)
+        if got != expected:
+            differences.append(f'{name}: expected {expected}, got {got}')
+    return differences
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Check that the planner still gives the stored schedules')
+    parser.add_argument('--update', action='store_true', help='store the current schedules as the golden ones')
+    args = parser.parse_args()
+    if args.update:
+        with open(C.PLANNER_GOLDEN, 'w') as file:
+            json.dump(run(), file, indent=2)
+        print('Golden schedules saved to', C.PLANNER_GOLDEN)
+        sys.exit()
+    differences = check()
+    print('\n'.join(differences) or 'All schedules match the golden output')
+    sys.exit(1 if differences else 0)
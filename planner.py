@@ -0,0 +1,250 @@
+# imports
+import hashlib
+import heapq
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+import constants as C
+import costing
+from tracing import span
+
+# Flight planning engine.
+# Each active aircraft is an event "available at airport X at time T" in a priority queue.
+# The earliest event is taken, the aircraft flies one of the routes leaving X after T plus the
+# minimum turnaround (routes fly at their dept/arrt time of day, each route at most once a day),
+# and a new event is queued for its arrival airport. So aircraft chain as many legs a day as the
+# timetable allows, until the horizon ends. Pure Python on plain tuples, no database access:
+# database.plan_flights loads the inputs and writes the result.
+
+day_seconds = 24 * 60 * 60
+
+
+class Route:
+    __slots__ = ('flight', 'dep', 'arr', 'dist', 'gcd', 'dept', 'arrt')
+
+    def __init__(self, flight, dep, arr, dist, gcd, dept, arrt):
+        self.flight = flight
+        self.dep = dep
+        self.arr = arr
+        self.dist = dist
+        self.gcd = gcd
+        self.dept = dept  # departure, seconds after midnight
+        self.arrt = arrt  # arrival, seconds after midnight (smaller than dept for overnight flights)
+
+
+def clock_seconds(value):  # MySQL TIME (timedelta), datetime.time or 'HH:MM[:SS]' -> seconds after midnight
+    if value is None or value == '':
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) % day_seconds
+    if isinstance(value, time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    parts = [int(p) for p in str(value).split(':')]
+    return (parts + [0, 0])[0] * 3600 + (parts + [0, 0])[1] * 60 + (parts + [0, 0, 0])[2]
+
+
+def timetable(routes):  # route rows -> {dep airport: [Route] sorted by departure time}
+    by_dep = {}
+    for flight, dep, arr, dist, gcd, dept, arrt in routes:
+        dept, arrt = clock_seconds(dept), clock_seconds(arrt)
+        if dept is None or arrt is None:
+            continue  # not scheduled
+        if not dist:
+            continue  # no distance, the range check can't pass (database.compare_plans fills in great circles)
+        by_dep.setdefault(dep, []).append(Route(flight, dep, arr, float(dist or 0), float(gcd or 0), dept, arrt))
+    for leaving in by_dep.values():
+        leaving.sort(key=lambda r: (r.dept, r.gcd, r.flight))
+    return by_dep
+
+
+def leg_times(day, route):  # departure and arrival of a route flown on day (midnight)
+    dept = day + timedelta(seconds=route.dept)
+    arrt = day + timedelta(seconds=route.arrt)
+    if arrt <= dept:  # overnight flight
+        arrt += timedelta(days=1)
+    return dept, arrt
+
+
+def plan(aircraft, routes, start, days, turnaround_min=None, window_min=None, rng=None, choose=None,
+         starts=None, used=None, free=None, reachable=None):
+    # aircraft: [(reg_no, loc, range_nm)]; routes: [(flight, dep, arr, dist, greatcircledist, dept, arrt)]
+    # start: first moment a flight may leave; days: length of the horizon
+    # turnaround_min: minimum minutes on the ground between legs
+    # window_min: the next leg is picked among the routes leaving within this many minutes of the
+    #   first one the aircraft can make (keeps aircraft busy instead of waiting for a late departure)
+    # choose(candidates, reg_no) -> Route; default picks at random (rng, a random.Random of its own:
+    #   the same inputs, start and seeded rng always give the same schedule)
+    # starts: {reg_no: (ready datetime, airport)} overriding start/loc, e.g. after already planned flights
+    # used: set of (flight, date) already flown, each route flies at most once a day
+    # free(reg_no, dept, arrt) -> False if the aircraft is already booked then (see conflicts.ConflictIndex)
+    # reachable(airport, range_nm) -> airports within range, or None if unknown (see spatial.AirportIndex);
+    #   routes to other airports are skipped before anything else is looked at, unless their recorded
+    #   distance is in range (the distance test decides, coordinates only rule routes out earlier)
+    # Returns [(flight, reg_no, dept, arrt, 'Planned', dep, arr)] sorted by departure.
+    turnaround = timedelta(minutes=C.turnaround_min if turnaround_min is None else turnaround_min)
+    window = (C.plan_window_min if window_min is None else window_min) * 60
+    rng = rng or random.Random()
+    choose = choose or (lambda candidates, reg_no: rng.choice(candidates))
+    by_dep = routes if isinstance(routes, dict) else timetable(routes)
+    departures = {dep: [r.dept for r in leaving] for dep, leaving in by_dep.items()}
+    end = start + timedelta(days=days)
+    used = set() if used is None else set(used)
+    pruned = {}  # (airport, range_nm) -> (routes, departure times) left after reachable()
+    starts = starts or {}
+    legs = []
+
+    with span('planner.plan', 'planner', aircraft=len(aircraft), days=days):
+        events = []  # (ready time, order, reg_no, airport, range)
+        for order, (reg_no, loc, range_nm) in enumerate(aircraft):
+            ready, airport = starts.get(reg_no, (start, loc))
+            if airport is not None:
+                events.append((max(ready, start), order, reg_no, airport, float(range_nm or 0)))
+        heapq.heapify(events)
+
+        while events:
+            ready, order, reg_no, airport, range_nm = heapq.heappop(events)
+            leaving, times = by_dep.get(airport), departures.get(airport)
+            if leaving and reachable:  # only the routes to airports within range, worked out once
+                if (airport, range_nm) not in pruned:
+                    far = any(r.dist > range_nm for r in leaving)  # else there is nothing to rule out
+                    allowed = reachable(airport, range_nm) if far else None
+                    kept = leaving if allowed is None else \
+                        [r for r in leaving if r.arr in allowed or r.dist <= range_nm]
+                    pruned[airport, range_nm] = (kept, [r.dept for r in kept])
+                leaving, times = pruned[airport, range_nm]
+            if not leaving or ready >= end:
+                continue
+            day = datetime.combine(ready.date(), time())
+            offset = int((ready - day).total_seconds())
+            found = None
+            while day < end and found is None:  # first day with a route this aircraft can take
+                i = bisect_left(times, offset)
+                candidates = []
+                for route in leaving[i:]:
+                    if candidates and route.dept > candidates[0].dept + window:
+                        break
+                    if route.dist <= range_nm and (route.flight, day.date()) not in used \
+                            and day + timedelta(seconds=route.dept) < end \
+                            and (free is None or free(reg_no, *leg_times(day, route))):
+                        candidates.append(route)
+                if candidates:
+                    found = choose(candidates, reg_no)
+                else:
+                    day, offset = day + timedelta(days=1), 0
+            if found is None:
+                continue  # nothing more this horizon
+            dept, arrt = leg_times(day, found)
+            used.add((found.flight, day.date()))
+            legs.append((found.flight, reg_no, dept, arrt, 'Planned', found.dep, found.arr))
+            heapq.heappush(events, (arrt + turnaround, order, reg_no, found.arr, range_nm))
+
+    legs.sort(key=lambda leg: (leg[2], leg[1]))
+    return legs
+
+
+# What-if planning: scenarios are planned side by side without touching the database.
+# A scenario is a dict of plan() settings: name, days, turnaround_min, window_min and statuses
+# (which aircraft statuses take part, e.g. ('ACTV', 'MAINT') to see the fleet with the aircraft in
+# maintenance back). Scenarios are independent, so each runs in its own process. The processes
+# are spawned, not forked: the app has a MySQL connection and threads of its own that a fork
+# would copy. compare_into runs the comparison on a thread, so the Tk event loop keeps going.
+
+def summarize(legs, aircraft, routes):  # side by side figures of a planned schedule
+    # aircraft: the [(reg_no, loc, range_nm)] the scenario planned with
+    per_tail = dict.fromkeys((a[0] for a in aircraft), 0)
+    for leg in legs:
+        per_tail[leg[1]] = per_tail.get(leg[1], 0) + 1
+    counts = sorted(per_tail.values())
+    scheduled = {r[0]: float(r[3] or 0) for r in routes if r[5] is not None and r[6] is not None}
+    flown = {leg[0] for leg in legs}
+    return {'flights': len(legs),
+            'aircraft': len(per_tail),
+            'idle': sorted(reg_no for reg_no, count in per_tail.items() if count == 0),
+            'per_tail': per_tail,
+            'per_tail_min': counts[0] if counts else 0,
+            'per_tail_mean': len(legs) / len(counts) if counts else 0,
+            'per_tail_max': counts[-1] if counts else 0,
+            'routes_flown': len(flown),
+            'routes_scheduled': len(scheduled),
+            'coverage': len(flown) / len(scheduled) if scheduled else 0,
+            'distance_nm': sum(scheduled.get(leg[0], 0) for leg in legs)}
+
+
+def fingerprint(legs):  # short hash of a schedule, equal for identical schedules
+    digest = hashlib.sha256()
+    for leg in legs:
+        digest.update(repr(tuple(str(x) for x in leg)).encode())
+    return digest.hexdigest()[:16]
+
+
+def run_scenario(job):  # one scenario, in a worker process -> (legs, summary)
+    # aircraft: [(reg_no, loc, range_nm, status, capacity)]; prices: {ICAO: fuel price}
+    scenario, aircraft, routes, start, starts, used, free, reachable, prices = job
+    statuses = scenario.get('statuses', ('ACTV',))
+    fleet = [(reg_no, loc, range_nm) for reg_no, loc, range_nm, status, capacity in aircraft if status in statuses]
+    seed = scenario.get('seed')
+    rng = random.Random() if seed is None else random.Random(seed)
+    choose = None  # uniform random among the candidates
+    if scenario.get('cost_weight'):  # cheaper routes are picked more often
+        choose = costing.CheaperChoice(costing.route_weights(routes, prices, scenario['cost_weight']), rng)
+    legs = plan(fleet, routes, start, scenario.get('days', C.plan_days), scenario.get('turnaround_min'),
+                scenario.get('window_min'), rng=rng, choose=choose,
+                starts=starts, used=used, free=free, reachable=reachable)
+    summary = summarize(legs, fleet, routes)
+    distances = {route[0]: route[3] or route[4] for route in routes}
+    capacities = {a[0]: a[4] for a in aircraft}
+    summary['fuel_cost'] = costing.schedule_costs(
+        [(None, leg[1], distances.get(leg[0]), capacities.get(leg[1]), prices.get(leg[5])) for leg in legs])['total']
+    return legs, summary
+
+
+def compare(jobs, workers=None):  # [job for run_scenario] -> [(legs, summary)] in the same order
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [run_scenario(job) for job in jobs]
+    with span('planner.compare', 'planner', scenarios=len(jobs), workers=workers):
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return list(pool.map(run_scenario, jobs))
+
+
+def compare_into(jobs, results, workers=None):  # thread target: puts (compare() result, None) or (None, error)
+    try:
+        results.put((compare(jobs, workers), None))
+    except Exception as e:
+        results.put((None, e))
+
+
+if __name__ == '__main__':  # e.g. a daily job: python planner.py  (plans only the newly missing day)
+    import argparse
+    import sys
+    import databaselogic as dbl
+    parser = argparse.ArgumentParser(description='Extend the flight plan of the active fleet')
+    parser.add_argument('--days', type=int, help='horizon in days (default: from settings)')
+    parser.add_argument('--turnaround', type=int, help='minimum turnaround in minutes (default: from settings)')
+    parser.add_argument('--full', action='store_true', help='plan the whole horizon, ignoring planned flights')
+    parser.add_argument('--seed', type=int, help='seed the choice of routes, for repeatable runs')
+    parser.add_argument('--start', type=datetime.fromisoformat,
+                        help="plan from this moment instead of now, e.g. '2025-01-01 00:00'")
+    parser.add_argument('--cost-weight', type=float, help='prefer cheaper routes, 0 for none (default: from settings)')
+    args = parser.parse_args()
+
+    try:
+        s = C.load_settings()  # same connection details as the app
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(f'Run Flyts setup first: {e}')
+    base = dbl.database(s['host'], s['user_db'], s['passwd_db'], s['charset'])
+    base.connection()
+    try:
+        base.execute("USE " + s['database'])
+        base.ensure_schema()
+        planned = base.plan_flights(args.days or s.get('plan_days', C.plan_days),
+                                    s.get('turnaround_min', C.turnaround_min) if args.turnaround is None
+                                    else args.turnaround, args.start, incremental=not args.full, seed=args.seed,
+                                    cost_weight=s.get('cost_weight', C.cost_weight) if args.cost_weight is None
+                                    else args.cost_weight)
+        print(f'{planned} flights planned')
+    finally:
+        base.signout()
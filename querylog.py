@@ -0,0 +1,86 @@
+# imports
+import re
+import logging
+from logging.handlers import RotatingFileHandler
+import constants as C
+
+# Query timing for the database layer.
+# database.execute reports every statement here; statements are grouped by their shape
+# (the SQL with literals and IN-lists replaced by ?) so no values are ever kept or logged.
+
+# histogram bucket upper bounds in milliseconds, the last bucket catches everything slower
+buckets_ms = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+_literals = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|\b\d+(?:\.\d+)?\b")
+_in_lists = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_spaces = re.compile(r"\s+")
+
+
+def statement_shape(query):  # 'SELECT * FROM x WHERE a = 5' -> 'SELECT * FROM x WHERE a = ?'
+    shape = query.replace('%s', '?')
+    shape = _literals.sub('?', shape)
+    shape = _in_lists.sub('(?,...)', shape)  # IN (%s,%s,%s) and IN (?,?) share one entry
+    return _spaces.sub(' ', shape).strip()
+
+
+class StatementStats:  # running totals for one statement shape
+    def __init__(self, shape):
+        self.shape = shape
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * len(buckets_ms)
+
+    def add(self, ms, rows):
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += max(rows or 0, 0)  # rowcount is -1 when the driver doesn't know
+        for i, bound in enumerate(buckets_ms):
+            if ms <= bound:
+                self.histogram[i] += 1
+                break
+
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def percentile_ms(self, p):  # upper bound of the bucket holding the p-th percentile
+        target = self.calls * p / 100
+        seen = 0
+        for bound, count in zip(buckets_ms, self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats:
+    def __init__(self, threshold_ms=C.slow_query_ms, log_path=C.SLOW_QUERY_LOG):
+        self.threshold_ms = threshold_ms  # statements slower than this go to the slow query log
+        self.statements = {}  # shape -> StatementStats
+        self.log = logging.getLogger('flyts.slowquery')
+        if log_path and not self.log.handlers:
+            # rotate when the file gets too big, keep a few old files
+            handler = RotatingFileHandler(log_path, maxBytes=C.slow_query_log_bytes,
+                                          backupCount=C.slow_query_log_backups, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.log.addHandler(handler)
+            self.log.setLevel(logging.INFO)
+            self.log.propagate = False
+
+    def record(self, query, seconds, rows):
+        shape = statement_shape(query)
+        ms = seconds * 1000
+        if shape not in self.statements:
+            self.statements[shape] = StatementStats(shape)
+        self.statements[shape].add(ms, rows)
+        if ms >= self.threshold_ms:
+            self.log.info('%.1f ms rows=%s %s', ms, rows, shape)
+
+    def top(self, n=20, key='total'):  # worst statements by total, mean or max time
+        sort_keys = {'total': lambda s: s.total_ms, 'mean': StatementStats.mean_ms, 'max': lambda s: s.max_ms}
+        return sorted(self.statements.values(), key=sort_keys[key], reverse=True)[:n]
+
+    def reset(self):
+        self.statements = {}
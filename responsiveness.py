@@ -0,0 +1,86 @@
+# imports
+import os
+import sys
+import json
+import time
+import threading
+import traceback
+from array import array
+import constants as C
+
+# Tk event loop responsiveness monitor.
+# A heartbeat is scheduled with root.after every interval_ms; how late it fires is how long
+# the main thread was busy (a blocked event loop means a frozen window). A watchdog thread
+# notices when the heartbeat is overdue and grabs the main thread's Python stack at that
+# moment, so each stall is recorded together with the code that caused it.
+
+
+class UIMonitor:
+    def __init__(self, root, interval_ms=C.heartbeat_ms, stall_ms=C.stall_ms):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.stall = stall_ms / 1000
+        self.lateness = array('d')  # ms late for every heartbeat this session
+        self.stalls = []  # [{'start', 'ms', 'stack'}]
+        self.started = time.time()
+        self.main_thread = threading.get_ident()
+        self.lock = threading.Lock()
+        self.expected = None  # when the next heartbeat should fire (perf_counter)
+        self.stack = None  # stack captured by the watchdog during the current stall
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.expected = time.perf_counter() + self.interval
+        self.root.after(int(self.interval * 1000), self.beat)
+        threading.Thread(target=self.watchdog, name='ui-watchdog', daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def beat(self):  # runs on the Tk main thread
+        now = time.perf_counter()
+        late = max(now - self.expected, 0.0)
+        self.lateness.append(late * 1000)
+        with self.lock:
+            if late >= self.stall:
+                self.stalls.append({'start': round(time.time() - late, 3),  # wall clock time
+                                    'ms': round(late * 1000, 1), 'stack': self.stack})
+            self.stack = None
+            self.expected = now + self.interval
+        if self.running:
+            self.root.after(int(self.interval * 1000), self.beat)
+
+    def watchdog(self):  # runs on its own thread, samples the main thread while it's stuck
+        while self.running:
+            time.sleep(self.stall / 2)
+            with self.lock:
+                overdue = time.perf_counter() - self.expected
+                if overdue >= self.stall and self.stack is None:
+                    frame = sys._current_frames().get(self.main_thread)
+                    if frame is not None:
+                        self.stack = traceback.format_stack(frame)
+
+    def percentile(self, p):
+        if not self.lateness:
+            return 0.0
+        ordered = sorted(self.lateness)
+        return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+    def report(self):  # summary of this session's UI latency
+        return {'session_start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+                'duration_s': round(time.time() - self.started, 1),
+                'heartbeat_ms': self.interval * 1000, 'stall_threshold_ms': self.stall * 1000,
+                'heartbeats': len(self.lateness),
+                'latency_ms': {f'p{p}': round(self.percentile(p), 1) for p in (50, 90, 95, 99)} |
+                              {'max': round(max(self.lateness, default=0.0), 1)},
+                'stall_count': len(self.stalls),
+                'stalled_s': round(sum(s['ms'] for s in self.stalls) / 1000, 2),
+                'worst_stalls': sorted(self.stalls, key=lambda s: s['ms'], reverse=True)[:20]}
+
+    def save_report(self, folder=C.RESPONSIVENESS_DIR):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, time.strftime('ui-%Y%m%d-%H%M%S.json', time.localtime(self.started)))
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+        return path
@@ -0,0 +1,195 @@
+# imports
+import heapq
+import constants as C
+from planner import clock_seconds, day_seconds
+
+# The route network as a graph: airports are nodes, every route is an edge dep -> arr.
+# Built once from the routes table (database.route_graph caches it and drops it on route writes).
+# Answers, for an aircraft's range_nm (only legs it can fly):
+#   shortest_path  - fewest nautical miles from one airport to another (Dijkstra)
+#   itineraries    - timetabled connections with at least the turnaround between legs
+#   reachable      - airports within k legs
+#   fleet_reachability - the same for every aircraft at once, with the adjacency as packed bit
+#                    rows (NumPy, n x n/8 bytes), or with Python ints as bitsets when NumPy isn't installed
+
+
+class Leg:
+    __slots__ = ('flight', 'dep', 'arr', 'dist', 'dept', 'arrt')
+
+    def __init__(self, flight, dep, arr, dist, dept, arrt):
+        self.flight = flight
+        self.dep = dep
+        self.arr = arr
+        self.dist = dist
+        self.dept = dept  # departure, seconds after midnight, None if not timetabled
+        self.arrt = arrt  # arrival, seconds after midnight
+
+    def duration(self):  # seconds in the air (overnight legs land the next day)
+        return (self.arrt - self.dept) % day_seconds or day_seconds
+
+
+class RouteGraph:
+    def __init__(self, routes):  # routes: [(flight, dep, arr, dist, greatcircledist, dept, arrt)]
+        self.edges = {}  # dep -> [Leg] shortest first
+        self.into = {}  # arr -> [Leg], for the legs needed to get somewhere
+        airports = set()
+        for flight, dep, arr, dist, gcd, dept, arrt in routes:
+            dist = float(dist or gcd or 0)  # no distance at all: shown as a 0 nm leg, in any range
+            dept, arrt = clock_seconds(dept), clock_seconds(arrt)
+            if dept is None or arrt is None:
+                dept = arrt = None
+            leg = Leg(flight, dep, arr, dist, dept, arrt)
+            self.edges.setdefault(dep, []).append(leg)
+            self.into.setdefault(arr, []).append(leg)
+            airports.update((dep, arr))
+        for legs in self.edges.values():
+            legs.sort(key=lambda leg: (leg.dist, leg.flight))
+        self.airports = sorted(airports)
+        self.index = {code: i for i, code in enumerate(self.airports)}
+        self.masks = {}  # range_nm -> adjacency bitsets, see adjacency()
+
+    def __len__(self):
+        return len(self.airports)
+
+    def legs_from(self, airport, range_nm=None):
+        return [leg for leg in self.edges.get(airport, ())
+                if range_nm is None or leg.dist <= range_nm]
+
+    def shortest_path(self, dep, arr, range_nm=None):  # -> (nm, [Leg]) or None if unreachable
+        best = {dep: 0.0}
+        previous = {}
+        queue = [(0.0, dep)]
+        while queue:
+            nm, airport = heapq.heappop(queue)
+            if airport == arr:
+                path = []
+                while airport != dep:
+                    path.append(previous[airport])
+                    airport = previous[airport].dep
+                return nm, path[::-1]
+            if nm > best[airport]:
+                continue  # stale entry
+            for leg in self.legs_from(airport, range_nm):
+                total = nm + leg.dist
+                if total < best.get(leg.arr, float('inf')):
+                    best[leg.arr] = total
+                    previous[leg.arr] = leg
+                    heapq.heappush(queue, (total, leg.arr))
+        return None
+
+    def legs_to(self, arr, max_legs, range_nm=None):  # {airport: fewest legs from it to arr}, up to max_legs
+        found = {arr: 0}
+        frontier = [arr]
+        for hops in range(1, max_legs + 1):
+            step = []
+            for airport in frontier:
+                for leg in self.into.get(airport, ()):
+                    if leg.dep not in found and leg.dept is not None and (range_nm is None or leg.dist <= range_nm):
+                        found[leg.dep] = hops
+                        step.append(leg.dep)
+            frontier = step
+        return found
+
+    def itineraries(self, dep, arr, max_legs=2, range_nm=None, turnaround_min=None, limit=None):
+        # timetabled connections dep -> arr of at most max_legs legs, every leg flown daily
+        # -> [(elapsed seconds, [(Leg, departure, arrival)])] quickest first; departure and arrival are
+        #    seconds from midnight of the first leg's day
+        turnaround = (C.turnaround_min if turnaround_min is None else turnaround_min) * 60
+        max_wait = C.itinerary_max_wait_h * 3600
+        limit = limit or C.itinerary_results
+        remaining = self.legs_to(arr, max_legs, range_nm)  # airports that can't get to arr in time are skipped
+        found = []
+
+        def extend(airport, ready, path, visited):
+            for leg in self.legs_from(airport, range_nm):
+                if leg.dept is None or leg.arr in visited \
+                        or remaining.get(leg.arr, max_legs + 1) > max_legs - len(path) - 1:
+                    continue
+                if path:  # next daily departure after the turnaround
+                    departure = ready + (leg.dept - ready) % day_seconds
+                    if departure - path[-1][2] > max_wait:
+                        continue
+                else:
+                    departure = leg.dept
+                arrival = departure + leg.duration()
+                step = path + [(leg, departure, arrival)]
+                if leg.arr == arr:
+                    found.append((arrival - step[0][1], step))
+                elif len(step) < max_legs:
+                    extend(leg.arr, arrival + turnaround, step, visited | {leg.arr})
+
+        extend(dep, 0, [], {dep})
+        found.sort(key=lambda itinerary: (itinerary[0], [leg.flight for leg, d, a in itinerary[1]]))
+        return found[:limit]
+
+    def adjacency(self, range_nm):  # [bitset of airports one leg away] per airport index, for range_nm
+        key = None if range_nm is None else float(range_nm)
+        if key not in self.masks:
+            masks = [0] * len(self.airports)
+            for dep, legs in self.edges.items():
+                i = self.index[dep]
+                for leg in legs:
+                    if key is None or leg.dist <= key:
+                        masks[i] |= 1 << self.index[leg.arr]
+            self.masks[key] = masks
+        return self.masks[key]
+
+    def reachable(self, dep, hops, range_nm=None):  # airports within hops legs of dep (not dep itself)
+        if dep not in self.index:
+            return set()
+        masks = self.adjacency(range_nm)
+        seen = frontier = 1 << self.index[dep]
+        for x in range(hops):
+            step = 0
+            while frontier:
+                low = frontier & -frontier  # lowest set bit
+                step |= masks[low.bit_length() - 1]
+                frontier ^= low
+            frontier = step & ~seen
+            seen |= step
+            if not frontier:
+                break
+        seen &= ~(1 << self.index[dep])
+        return {self.airports[i] for i in range(len(self.airports)) if seen >> i & 1}
+
+    def fleet_reachability(self, aircraft, hops):
+        # aircraft: [(reg_no, loc, range_nm)] -> {reg_no: set of airports within hops legs}
+        # aircraft are grouped by range and by airport, each airport is expanded once per range:
+        # the next hop is the OR of the packed adjacency rows of the airports just reached
+        try:
+            import numpy as np
+        except ImportError:
+            return {reg_no: self.reachable(loc, hops, range_nm) for reg_no, loc, range_nm in aircraft}
+        n = len(self.airports)
+        groups = {}
+        for reg_no, loc, range_nm in aircraft:
+            if loc in self.index:
+                groups.setdefault(None if range_nm is None else float(range_nm), []).append((reg_no, loc))
+        result = {reg_no: set() for reg_no, loc, range_nm in aircraft}
+        codes = np.array(self.airports, dtype=object)
+        for range_nm, members in groups.items():
+            adjacency = np.zeros((n, (n + 7) // 8), dtype=np.uint8)  # bit j of row i: a leg from i to j
+            row = np.zeros(n, dtype=bool)
+            for dep, legs in self.edges.items():
+                row[:] = False
+                row[[self.index[leg.arr] for leg in legs if range_nm is None or leg.dist <= range_nm]] = True
+                adjacency[self.index[dep]] = np.packbits(row)
+            rows = {}
+            for start in {self.index[loc] for reg_no, loc in members}:  # one search per airport, not per aircraft
+                seen = np.zeros(n, dtype=bool)
+                seen[start] = True
+                frontier = np.array([start])
+                for x in range(hops):
+                    step = np.zeros(adjacency.shape[1], dtype=np.uint8)
+                    for at in range(0, len(frontier), C.distance_block_rows):  # bounded memory per pass
+                        step |= np.bitwise_or.reduce(adjacency[frontier[at:at + C.distance_block_rows]], axis=0)
+                    new = np.unpackbits(step, count=n).astype(bool) & ~seen
+                    if not new.any():
+                        break
+                    seen |= new
+                    frontier = np.flatnonzero(new)
+                seen[start] = False
+                rows[start] = set(codes[seen])
+            for reg_no, loc in members:
+                result[reg_no] = set(rows[self.index[loc]])
+        return result
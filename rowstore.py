@@ -0,0 +1,248 @@
+# imports
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import constants as C
+
+# Compact in-memory table for the rows loaded into the Treeview.
+# Each column is kept in a typed array instead of one Python object per cell:
+# integers, fixed point decimals, datetimes (microseconds since 1970), dates and times are
+# 8 byte array entries, and text/ENUM columns are dictionary encoded (4 byte code per cell,
+# each distinct string stored once), so status/dep/arr columns cost almost nothing.
+# A column that receives a value its array can't hold (e.g. text typed into a number cell)
+# quietly becomes a plain list.
+
+EPOCH = datetime(1970, 1, 1)
+chunk_rows = 4096  # rows decoded at a time when iterating
+
+
+def sort_key(value):  # type-aware sort key; numbers, times and text each sort naturally, empty cells last
+    if value is None or value == '':
+        return (3, 0)
+    if isinstance(value, (int, float, Decimal)):
+        return (0, value)
+    if isinstance(value, datetime):
+        return (1, value.timestamp())
+    if isinstance(value, date):
+        return (1, datetime.combine(value, datetime.min.time()).timestamp())
+    if isinstance(value, timedelta):  # MySQL TIME columns
+        return (1, value.total_seconds())
+    return (2, str(value).casefold())
+
+
+class ObjectColumn:  # fallback, one Python object per cell
+    def __init__(self, values=()):
+        self.values = list(values)
+
+    def extend(self, values):
+        self.values.extend(values)
+
+    def get(self, i):
+        return self.values[i]
+
+    def set(self, i, value):
+        self.values[i] = value
+
+    def slice(self, start, end):
+        return self.values[start:end]
+
+    def sort_order(self):
+        keys = [sort_key(v) for v in self.values]
+        return sorted(range(len(keys)), key=keys.__getitem__)
+
+    def filter(self, test, candidates):
+        values = self.values
+        return [i for i in candidates if test(values[i])]
+
+
+class NumberColumn:  # typed array plus a NULL mask
+    def __init__(self, typecode, encode, decode):
+        self.data = array(typecode)
+        self.nulls = bytearray()
+        self.encode = encode  # Python value -> array item, raises TypeError/ValueError if it doesn't fit
+        self.decode = decode
+
+    def extend(self, values):
+        encoded = [0 if v is None else self.encode(v) for v in values]  # fails before changing anything
+        self.data.extend(encoded)
+        self.nulls.extend(v is None for v in values)
+
+    def get(self, i):
+        return None if self.nulls[i] else self.decode(self.data[i])
+
+    def set(self, i, value):
+        encoded = 0 if value is None else self.encode(value)
+        self.data[i] = encoded
+        self.nulls[i] = value is None
+
+    def slice(self, start, end):
+        decode = self.decode
+        return [None if null else decode(v) for v, null in zip(self.data[start:end], self.nulls[start:end])]
+
+    def sort_order(self):  # ascending, NULLs last; compares the raw array items
+        data = self.data
+        present = [i for i, null in enumerate(self.nulls) if not null]
+        present.sort(key=data.__getitem__)
+        return present + [i for i, null in enumerate(self.nulls) if null]
+
+    def filter(self, test, candidates):
+        return [i for i in candidates if test(self.get(i))]
+
+
+class DecimalColumn(NumberColumn):  # DECIMAL(x, s) stored as integers scaled by 10**s
+    def __init__(self):
+        super().__init__('q', self.encode_decimal, self.decode_decimal)
+        self.scale = None  # taken from the first value, MySQL returns every value with the column's scale
+
+    def encode_decimal(self, value):
+        if not isinstance(value, (Decimal, int)) or isinstance(value, bool):
+            raise TypeError(value)
+        if self.scale is None:
+            self.scale = max(-Decimal(value).as_tuple().exponent, 0)
+        scaled = Decimal(value).scaleb(self.scale)
+        if scaled != scaled.to_integral_value():
+            raise ValueError(value)  # more decimal places than the column has
+        return int(scaled)
+
+    def decode_decimal(self, item):
+        return Decimal(item).scaleb(-self.scale)
+
+
+class DictColumn:  # dictionary encoded text: codes array + list of distinct values
+    def __init__(self):
+        self.codes = array('I')
+        self.values = [None]  # code 0 is NULL
+        self.lookup = {None: 0}
+
+    def code(self, value):
+        if not isinstance(value, str) and value is not None:
+            raise TypeError(value)
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def extend(self, values):
+        self.codes.extend([self.code(v) for v in values])
+
+    def get(self, i):
+        return self.values[self.codes[i]]
+
+    def set(self, i, value):
+        self.codes[i] = self.code(value)
+
+    def slice(self, start, end):
+        values = self.values
+        return [values[c] for c in self.codes[start:end]]
+
+    def sort_order(self):  # sort the distinct values once, then bucket the rows by code
+        ranked = sorted(range(len(self.values)), key=lambda c: sort_key(self.values[c]))
+        buckets = [[] for x in self.values]
+        for i, c in enumerate(self.codes):
+            buckets[c].append(i)
+        return [i for c in ranked for i in buckets[c]]
+
+    def filter(self, test, candidates):  # test each distinct value once instead of every cell
+        passing = bytearray(test(v) for v in self.values)
+        codes = self.codes
+        return [i for i in candidates if passing[codes[i]]]
+
+
+def _int(value):
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError(value)
+    return value
+
+
+def _datetime(value):
+    if not isinstance(value, datetime) or value.tzinfo is not None:
+        raise TypeError(value)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _date(value):
+    if not isinstance(value, date) or isinstance(value, datetime):
+        raise TypeError(value)
+    return value.toordinal()
+
+
+def _time(value):
+    if not isinstance(value, timedelta):
+        raise TypeError(value)
+    return value // timedelta(microseconds=1)
+
+
+def make_column(ctype):  # empty column for a C.column_types type
+    if ctype == 'int':
+        return NumberColumn('q', _int, int)
+    if ctype == 'decimal':
+        return DecimalColumn()
+    if ctype == 'datetime':
+        return NumberColumn('q', _datetime, lambda v: EPOCH + timedelta(microseconds=v))
+    if ctype == 'date':
+        return NumberColumn('q', _date, date.fromordinal)
+    if ctype == 'time':
+        return NumberColumn('q', _time, lambda v: timedelta(microseconds=v))
+    if ctype in ('text', 'enum'):
+        return DictColumn()
+    return ObjectColumn()
+
+
+class ColumnStore:
+    def __init__(self, table, columns, rows=()):
+        self.table = table
+        self.columns = list(columns)
+        types = C.column_types.get(table, {})
+        self.data = [make_column(types.get(c)) for c in self.columns]
+        self.count = 0
+        self.extend(rows)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):  # one row as a tuple
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return tuple(column.get(i) for column in self.data)
+
+    def __iter__(self):  # rows as tuples, decoded a chunk at a time
+        for start in range(0, self.count, chunk_rows):
+            end = min(start + chunk_rows, self.count)
+            yield from zip(*[column.slice(start, end) for column in self.data])
+
+    def _demote(self, j):  # column j becomes a plain list
+        self.data[j] = ObjectColumn(self.data[j].slice(0, self.count))
+
+    def extend(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        for j, values in enumerate(zip(*rows)):
+            try:
+                self.data[j].extend(values)
+            except (TypeError, ValueError):
+                self._demote(j)
+                self.data[j].extend(values)
+        self.count += len(rows)
+
+    def get(self, i, j):
+        return self.data[j].get(i)
+
+    def set(self, i, j, value):
+        try:
+            self.data[j].set(i, value)
+        except (TypeError, ValueError):
+            self._demote(j)
+            self.data[j].set(i, value)
+
+    def column(self, j):  # every value of column j
+        return self.data[j].slice(0, self.count)
+
+    def sort_order(self, j):  # row indexes sorted ascending by column j, empty cells last
+        return self.data[j].sort_order()
+
+    def filter(self, j, test, candidates):  # candidates whose column j value passes test
+        return self.data[j].filter(test, candidates)
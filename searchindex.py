@@ -0,0 +1,62 @@
+# imports
+import re
+from bisect import bisect_left
+
+# Inverted index over the cells of the loaded rows, for the quick search box.
+# Every cell is split into lowercase words; each word points to the rows containing it.
+# A search word matches every indexed word it is a prefix of, found by binary search
+# in the sorted word list, so a keystroke only touches the matching rows.
+
+_words = re.compile(r"[^\W_]+")  # letters and digits, so 'VT-ANI' -> 'vt', 'ani' and '2025-06-01' -> '2025', '06', '01'
+
+
+def words(value):
+    return _words.findall(str(value).casefold()) if value is not None else []
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = {}  # word -> set of row indexes
+        self.vocabulary = []  # sorted words, rebuilt lazily after changes
+        self.dirty = False
+
+    def add(self, rows, start=0):  # index rows, numbered from start
+        for idx, row in enumerate(rows, start=start):
+            for word in {w for value in row for w in words(value)}:
+                if word not in self.postings:
+                    self.postings[word] = set()
+                    self.dirty = True
+                self.postings[word].add(idx)
+
+    def remove(self, idx, row):  # forget a row (deleted, or about to be re-added after an edit)
+        for word in {w for value in row for w in words(value)}:
+            rows = self.postings.get(word)
+            if rows is not None:
+                rows.discard(idx)
+
+    def replace(self, idx, old_row, new_row):
+        self.remove(idx, old_row)
+        self.add([new_row], idx)
+
+    def prefix_matches(self, prefix):  # rows with any word starting with prefix
+        if self.dirty:
+            self.vocabulary = sorted(self.postings)
+            self.dirty = False
+        i = bisect_left(self.vocabulary, prefix)
+        found = set()
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            found |= self.postings[self.vocabulary[i]]
+            i += 1
+        return found
+
+    def search(self, text):  # rows matching every word typed, None when nothing was typed
+        query = words(text)
+        if not query:
+            return None
+        # narrowest word first, so the intersection stays small
+        result = None
+        for candidates in sorted((self.prefix_matches(w) for w in set(query)), key=len):
+            result = candidates if result is None else result & candidates
+            if not result:
+                break
+        return result
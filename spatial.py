@@ -0,0 +1,103 @@
+# imports
+import heapq
+import math
+import constants as C
+
+# Spatial index over airport coordinates, for "which airports are within X nm" and
+# "which are the k nearest" without scanning every airport.
+# Airports are points on the unit sphere (x, y, z) in a k-d tree. The straight-line (chord)
+# distance between two points grows with their great-circle distance, so both queries can
+# prune on chord distance and convert only the answers to nautical miles.
+# Airports without coordinates are not in the tree, they are listed in `unplaced`.
+
+
+def unit_vector(lat, lon):
+    lat, lon = math.radians(float(lat)), math.radians(float(lon))
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def chord(nm):  # great-circle distance -> straight-line distance on the unit sphere
+    return 2 * math.sin(min(nm / C.earth_radius_nm, math.pi) / 2)
+
+
+def arc_nm(chord_length):  # the other way round
+    return 2 * math.asin(min(chord_length / 2, 1.0)) * C.earth_radius_nm
+
+
+class AirportIndex:
+    def __init__(self, airports):  # airports: [(ICAO, lat, lon)]
+        self.points = {}  # ICAO -> unit vector
+        self.coords = {}  # ICAO -> (lat, lon)
+        self.unplaced = set()  # airports without coordinates
+        for code, lat, lon in airports:
+            if lat is None or lon is None:
+                self.unplaced.add(code)
+            else:
+                self.points[code] = unit_vector(lat, lon)
+                self.coords[code] = (float(lat), float(lon))
+        # tree nodes are (point, code, axis, left, right), built by median splits
+        self.root = self.build(sorted(self.points.items()), 0)
+        self.ranges = {}  # (airport, range_nm) -> reachable set, see reachable()
+
+    def __len__(self):
+        return len(self.points)
+
+    def build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[1][axis])
+        middle = len(items) // 2
+        code, point = items[middle]
+        return (point, code, axis, self.build(items[:middle], depth + 1), self.build(items[middle + 1:], depth + 1))
+
+    def within(self, lat, lon, radius_nm):  # -> [(ICAO, nm)] within radius_nm, nearest first
+        target, limit = unit_vector(lat, lon), chord(radius_nm)
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, code, axis, left, right = node
+            d = math.dist(point, target)
+            if d <= limit:
+                found.append((d, code))
+            offset = target[axis] - point[axis]
+            stack.append(left if offset < 0 else right)
+            if abs(offset) <= limit:  # the circle crosses the splitting plane
+                stack.append(right if offset < 0 else left)
+        return [(code, arc_nm(d)) for d, code in sorted(found)]
+
+    def nearest(self, lat, lon, k, exclude=()):  # -> [(ICAO, nm)] of the k nearest airports, nearest first
+        if k <= 0:
+            return []
+        target = unit_vector(lat, lon)
+        best = []  # max-heap of (-distance, code), at most k entries
+        stack = [(self.root, 0.0)]  # (node, distance to the plane that separates it from the target)
+        while stack:
+            node, gap = stack.pop()
+            if node is None or (len(best) == k and gap >= -best[0][0]):
+                continue  # can't hold anything closer than the k found so far
+            point, code, axis, left, right = node
+            if code not in exclude:
+                d = math.dist(point, target)
+                if len(best) < k:
+                    heapq.heappush(best, (-d, code))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, code))
+            offset = target[axis] - point[axis]
+            near, far = (left, right) if offset < 0 else (right, left)
+            stack.append((far, max(gap, abs(offset))))
+            stack.append((near, gap))  # searched first, it tightens the bound for the far side
+        return [(code, arc_nm(-d)) for d, code in sorted(best, reverse=True)]
+
+    def reachable(self, code, range_nm):
+        # airports an aircraft at code can fly to on range_nm, or None if code has no coordinates
+        # (airports without coordinates can't be ruled out, so they count as reachable)
+        key = (code, range_nm)
+        if key not in self.ranges:
+            where = self.coords.get(code)
+            self.ranges[key] = None if where is None else \
+                {found for found, nm in self.within(*where, range_nm)} | self.unplaced
+        return self.ranges[key]
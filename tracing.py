@@ -0,0 +1,68 @@
+# imports
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+import constants as C
+
+# Lightweight tracing.
+# Code is wrapped in nested spans (with span('name'): ...) and each finished span is kept
+# as a Chrome trace event, so a saved trace opens in chrome://tracing, Perfetto or speedscope
+# and shows menu action -> SQL -> fetch -> Treeview rendering as a flame graph.
+
+_events = deque(maxlen=C.trace_max_events)  # oldest spans are dropped first
+_start = time.perf_counter()
+_pid = os.getpid()
+enabled = True
+
+
+class span:
+    def __init__(self, name, category='app', **args):
+        self.name = name
+        self.category = category
+        self.args = args  # extra details shown in the viewer, never row values
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if enabled:
+            end = time.perf_counter()
+            if exc_type is not None:
+                self.args['error'] = exc_type.__name__
+            _events.append({'name': self.name, 'cat': self.category, 'ph': 'X',
+                            'ts': round((self.begin - _start) * 1e6, 1),  # microseconds
+                            'dur': round((end - self.begin) * 1e6, 1),
+                            'pid': _pid, 'tid': threading.get_ident(), 'args': self.args})
+        return False  # never swallow exceptions
+
+
+def traced(name, category='app'):  # decorator version of span
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def export(path=None):  # save collected spans as a Chrome trace-event JSON file
+    if path is None:
+        os.makedirs(C.TRACE_DIR, exist_ok=True)
+        path = os.path.join(C.TRACE_DIR, time.strftime('trace-%Y%m%d-%H%M%S.json'))
+    events = list(_events)
+    # thread names make the viewer label the Tk main thread
+    for thread in threading.enumerate():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': _pid, 'tid': thread.ident,
+                       'args': {'name': thread.name}})
+    with open(path, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+    return path
+
+
+def clear():
+    _events.clear()